@@ -0,0 +1,169 @@
+# Created for Thynk: Always Ask Y
+# Admission control and load shedding per endpoint class
+
+import asyncio
+import math
+import os
+import time
+from typing import Any, Dict, Optional
+
+from metrics import metrics
+from tracing import tracer
+
+
+class Admission:
+    """Decision for one request; use as a context manager around the admitted work"""
+
+    ADMIT = "admit"
+    DEGRADE = "degrade"
+    SHED = "shed"
+
+    def __init__(self, controller: "AdmissionController", endpoint: str, decision: str, estimated_wait_s: float):
+        self.controller = controller
+        self.endpoint = endpoint
+        self.decision = decision
+        self.estimated_wait_s = estimated_wait_s
+        self._started: Optional[float] = None
+
+    @property
+    def shed(self) -> bool:
+        return self.decision == self.SHED
+
+    @property
+    def degraded(self) -> bool:
+        return self.decision == self.DEGRADE
+
+    @property
+    def retry_after_s(self) -> int:
+        """Whole seconds a shed client should wait before retrying (at least 1)"""
+        return max(1, math.ceil(self.estimated_wait_s))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": "overloaded",
+            "endpoint": self.endpoint,
+            "retry_after_s": self.retry_after_s,
+            "estimated_wait_ms": round(self.estimated_wait_s * 1000),
+        }
+
+    def __enter__(self) -> "Admission":
+        self._started = self.controller._enter(self.endpoint)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Failed requests count too: a backend timing out is the slowness the estimate must
+        # see. Only a cancelled request (client gone) has no meaningful duration
+        cancelled = exc_type is not None and issubclass(exc_type, asyncio.CancelledError)
+        self.controller._exit(self.endpoint, self._started, observe=not cancelled)
+
+
+class EndpointState:
+    """In-flight count and EWMA latency for one endpoint class"""
+
+    def __init__(self, max_in_flight: int, degrade_at: int, slo_ms: float, alpha: float):
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.degrade_at = max(1, min(int(degrade_at), self.max_in_flight))
+        self.slo_s = float(slo_ms) / 1000.0
+        self.alpha = float(alpha)
+        self.in_flight = 0
+        # Until the first completion the SLO stands in for the latency
+        self.latency_s: Optional[float] = None
+        self.observed_at = 0.0
+
+    def expected_latency_s(self) -> float:
+        return self.latency_s if self.latency_s is not None else self.slo_s / 2.0
+
+    def estimated_wait_s(self) -> float:
+        """Time for the work already in flight to drain at degrade_at-way parallelism"""
+        return self.expected_latency_s() * self.in_flight / self.degrade_at
+
+    def observe(self, seconds: float) -> None:
+        self.latency_s = seconds if self.latency_s is None else self.alpha * seconds + (1 - self.alpha) * self.latency_s
+        self.observed_at = time.monotonic()
+
+
+class AdmissionController:
+    """Per-endpoint admission that sheds photo ingestion before hints.
+
+    Photos (/analyze-photo, /ocr, session photos) are admitted normally up to
+    degrade_at in flight; beyond that they take the degraded (cheaper, single
+    backend) OCR path; at max_in_flight, or when the estimated wait passes the
+    photo SLO, they are shed with 503 and Retry-After. While hints are missing
+    their SLO, photos degrade at once and shed from degrade_at, so interactive
+    hints keep the provider capacity. Hints are only shed at their own
+    max_in_flight, after photos have been degraded and shed.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]], alpha: float = 0.2, stale_s: float = 60.0, enabled: bool = True):
+        self.enabled = enabled
+        # A hint latency older than this no longer counts as hints falling behind
+        self.stale_s = float(stale_s)
+        self._endpoints = {name: EndpointState(alpha=alpha, **options) for name, options in limits.items()}
+
+    def _hints_behind(self) -> bool:
+        hint = self._endpoints.get("hint")
+        if hint is None or hint.latency_s is None or time.monotonic() - hint.observed_at > self.stale_s:
+            return False
+        return hint.latency_s > hint.slo_s
+
+    def admit(self, endpoint: str) -> Admission:
+        """Decide whether to run, degrade or shed a request for this endpoint class"""
+        state = self._endpoints[endpoint]
+        wait_s = state.estimated_wait_s()
+        decision = Admission.ADMIT
+        if self.enabled:
+            if endpoint == "photo":
+                protect_hints = self._hints_behind()
+                if state.in_flight >= state.max_in_flight or wait_s > state.slo_s or (protect_hints and state.in_flight >= state.degrade_at):
+                    decision = Admission.SHED
+                elif state.in_flight >= state.degrade_at or protect_hints:
+                    decision = Admission.DEGRADE
+            elif state.in_flight >= state.max_in_flight:
+                decision = Admission.SHED
+        metrics.inc("admission_total", endpoint=endpoint, decision=decision)
+        if decision != Admission.ADMIT:
+            tracer.event("admission", endpoint=endpoint, decision=decision, in_flight=state.in_flight,
+                         estimated_wait_ms=round(wait_s * 1000))
+        return Admission(self, endpoint, decision, wait_s)
+
+    def _enter(self, endpoint: str) -> float:
+        self._endpoints[endpoint].in_flight += 1
+        return time.perf_counter()
+
+    def _exit(self, endpoint: str, started: Optional[float], observe: bool) -> None:
+        state = self._endpoints[endpoint]
+        state.in_flight -= 1
+        if started is not None and observe:
+            state.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "in_flight": state.in_flight,
+                "degrade_at": state.degrade_at,
+                "max_in_flight": state.max_in_flight,
+                "latency_ms": round(state.latency_s * 1000, 1) if state.latency_s is not None else None,
+                "slo_ms": round(state.slo_s * 1000),
+                "estimated_wait_ms": round(state.estimated_wait_s() * 1000),
+            }
+            for name, state in self._endpoints.items()
+        }
+
+
+def create_admission_controller() -> AdmissionController:
+    """Build the controller from THYNK_ADMIT_* environment variables"""
+    return AdmissionController(
+        {
+            "photo": {
+                "max_in_flight": int(os.getenv("THYNK_ADMIT_PHOTO_MAX", "32")),
+                "degrade_at": int(os.getenv("THYNK_ADMIT_PHOTO_DEGRADE_AT", "16")),
+                "slo_ms": float(os.getenv("THYNK_ADMIT_PHOTO_SLO_MS", "8000")),
+            },
+            "hint": {
+                "max_in_flight": int(os.getenv("THYNK_ADMIT_HINT_MAX", "64")),
+                "degrade_at": int(os.getenv("THYNK_ADMIT_HINT_MAX", "64")),
+                "slo_ms": float(os.getenv("THYNK_HINT_SLO_MS", "3000")),
+            },
+        },
+        enabled=os.getenv("THYNK_ADMISSION", "1").lower() not in ("0", "false", "no"),
+    )
@@ -0,0 +1,182 @@
+# Created for Thynk: Always Ask Y
+# Voice-activity detection and segmented transcription for lecture audio
+
+import asyncio
+import base64
+import io
+import os
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Segment as (start_sample, end_sample)
+Segment = Tuple[int, int]
+
+
+def decode_wav(audio_data: bytes) -> Optional[Tuple[np.ndarray, int]]:
+    """Decode 16-bit PCM WAV to mono float samples in [-1, 1]; None for other formats"""
+    try:
+        with wave.open(io.BytesIO(audio_data), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                return None
+            channels = wav.getnchannels()
+            sample_rate = wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """Encode mono float samples as 16-bit PCM WAV"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def detect_speech_segments(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 30,
+    min_speech_ms: int = 250,
+    max_gap_ms: int = 400,
+    padding_ms: int = 150,
+    max_segment_s: float = 30.0,
+    min_threshold: float = 0.01,
+    max_threshold: float = 0.05,
+) -> List[Segment]:
+    """Find voiced regions with short-time energy and zero-crossing rate.
+
+    A frame is voiced when its energy clears a noise floor estimated from the
+    quietest frames, clamped to [min_threshold, max_threshold] RMS so that a
+    chunk with no pauses cannot raise the floor above its own speech. If the
+    chunk has no quiet stretch at all (continuous lecturing), every frame is
+    voiced. Frames that only clear the floor because of a very high
+    zero-crossing rate (hiss, fricative noise) need a larger margin. Nearby
+    voiced frames are merged, short blips dropped, and long runs split so
+    segments stay transcribable.
+    """
+    frame_len = max(1, int(sample_rate * frame_ms / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return []
+
+    frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1))
+    zcr = np.mean(np.abs(np.diff(np.signbit(frames).astype(np.int8), axis=1)), axis=1)
+
+    noise_floor = float(np.percentile(energy, 20))
+    if noise_floor > min_threshold * 2.0 and float(np.percentile(energy, 90)) < noise_floor * 3.0:
+        # No speech/silence split to measure against: keep the whole chunk
+        voiced = np.ones(n_frames, dtype=bool)
+    else:
+        threshold = min(max(noise_floor * 3.0, min_threshold), max_threshold)
+        voiced = (energy > threshold) & ((zcr < 0.25) | (energy > threshold * 2.0))
+
+    # Merge voiced runs separated by short pauses
+    padded = np.concatenate(([False], voiced, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = list(zip(edges[0::2], edges[1::2]))
+    max_gap = max_gap_ms // frame_ms
+    merged: List[List[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] <= max_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    segments: List[Segment] = []
+    pad = int(sample_rate * padding_ms / 1000)
+    max_len = int(sample_rate * max_segment_s)
+    for start, end in merged:
+        if (end - start) * frame_ms < min_speech_ms:
+            continue
+        seg_start = max(0, int(start) * frame_len - pad)
+        seg_end = min(len(samples), int(end) * frame_len + pad)
+        for chunk_start in range(seg_start, seg_end, max_len):
+            segments.append((int(chunk_start), int(min(seg_end, chunk_start + max_len))))
+    return segments
+
+
+class SegmentedTranscriber:
+    """Transcribes only the voiced parts of an audio blob, in a bounded worker pool.
+
+    Wraps any transcriber exposing transcribe_base64_audio(audio_base64) ->
+    {"success", "text", "confidence"}. Audio that is not 16-bit PCM WAV is
+    passed through whole.
+    """
+
+    def __init__(self, transcriber: Any, max_workers: int = 4, **vad_options: Any):
+        self.transcriber = transcriber
+        self.vad_options = vad_options
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(max_workers)), thread_name_prefix="transcribe")
+
+    async def transcribe_base64_audio(self, audio_base64: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        audio_data = base64.b64decode(audio_base64)
+        decoded = decode_wav(audio_data)
+        if decoded is None:
+            return await loop.run_in_executor(self._executor, self.transcriber.transcribe_base64_audio, audio_base64)
+
+        samples, sample_rate = decoded
+        segments = detect_speech_segments(samples, sample_rate, **self.vad_options)
+        total_seconds = len(samples) / float(sample_rate)
+        voiced_seconds = sum(end - start for start, end in segments) / float(sample_rate)
+        if not segments:
+            return {"success": True, "text": "", "confidence": 0.0, "segments": 0,
+                    "voiced_seconds": 0.0, "total_seconds": total_seconds}
+
+        jobs = [
+            loop.run_in_executor(
+                self._executor,
+                self.transcriber.transcribe_base64_audio,
+                base64.b64encode(encode_wav(samples[start:end], sample_rate)).decode("utf-8"),
+            )
+            for start, end in segments
+        ]
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+
+        texts: List[str] = []
+        confidences: List[float] = []
+        errors: List[str] = []
+        for result in results:
+            if isinstance(result, Exception) or not result.get("success"):
+                errors.append(str(result) if isinstance(result, Exception) else result.get("error", "unknown error"))
+                continue
+            if result.get("text", "").strip():
+                texts.append(result["text"].strip())
+                confidences.append(float(result.get("confidence", 0.8)))
+
+        if errors and not texts:
+            return {"success": False, "error": "; ".join(errors), "text": ""}
+
+        return {
+            "success": True,
+            "text": " ".join(texts),
+            "confidence": sum(confidences) / len(confidences) if confidences else 0.0,
+            "segments": len(segments),
+            "voiced_seconds": voiced_seconds,
+            "total_seconds": total_seconds,
+        }
+
+
+def create_segmented_transcriber(transcriber: Any) -> SegmentedTranscriber:
+    """Wrap a transcriber using THYNK_TRANSCRIBE_WORKERS and THYNK_VAD_* environment variables"""
+    return SegmentedTranscriber(
+        transcriber,
+        max_workers=int(os.getenv("THYNK_TRANSCRIBE_WORKERS", "4")),
+        min_speech_ms=int(os.getenv("THYNK_VAD_MIN_SPEECH_MS", "250")),
+        max_gap_ms=int(os.getenv("THYNK_VAD_MAX_GAP_MS", "400")),
+        max_segment_s=float(os.getenv("THYNK_VAD_MAX_SEGMENT_S", "30")),
+    )
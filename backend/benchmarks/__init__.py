@@ -0,0 +1,2 @@
+# Offline benchmarks for the Thynk backend. Run modules from the backend directory,
+# e.g. `python -m benchmarks.bench_similarity`.
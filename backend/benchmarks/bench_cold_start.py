@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: time from process spawn to the first served requests
+Serves the fake upstreams from this process, then starts fresh interpreters that
+import the app, run its startup (lifespan), wait for /ready (the background warmup)
+and send one request per endpoint. The report gives the median over several runs for
+each phase: interpreter start, `import main`, startup, warmup, each first request, and
+the time from spawn to ready and to first response.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --runs 10 --endpoints health,analyze-photo,give-hint
+    THYNK_WARMUP=0 python -m benchmarks.bench_cold_start    # no warmup: first requests pay the cold start
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+ENDPOINTS = ("health", "analyze-photo", "give-hint")
+
+# Set by the parent: wall-clock time just before the child was spawned
+SPAWN_ENV = "THYNK_BENCH_SPAWN_TS"
+
+
+def child(endpoints: List[str], frame_path: str) -> None:
+    """Runs in the fresh interpreter; prints one JSON line of timings"""
+    started = time.time()
+    import main
+    imported = time.time()
+
+    import asyncio
+    import httpx
+
+    with open(frame_path) as f:
+        frame = f.read()
+    requests = {
+        "health": {"method": "GET", "url": "/health"},
+        "analyze-photo": {"method": "POST", "url": "/analyze-photo", "json": {"image_base64": frame, "user_id": "cold"}},
+        "give-hint": {"method": "POST", "url": "/give-hint", "json": {"learned": "Linear equations", "question": "What first?", "user_id": "cold"}},
+    }
+
+    async def serve() -> Dict[str, Any]:
+        timings: Dict[str, Any] = {}
+        startup_started = time.time()
+        async with main.fastapi_app.router.lifespan_context(main.fastapi_app):
+            timings["startup_s"] = time.time() - startup_started
+            transport = httpx.ASGITransport(app=main.fastapi_app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://thynk", timeout=120.0) as client:
+                # Gate traffic on readiness the way a load balancer would
+                while (await client.get("/ready")).status_code != 200:
+                    await asyncio.sleep(0.01)
+                ready = time.time()
+                timings["warmup_s"] = ready - startup_started - timings["startup_s"]
+                timings["spawn_to_ready_s"] = ready - float(os.environ[SPAWN_ENV])
+                timings["warmup_failed"] = main.warmup.snapshot()["failed"]
+                for endpoint in endpoints:
+                    request_started = time.time()
+                    response = await client.request(**requests[endpoint])
+                    finished = time.time()
+                    timings[f"first_{endpoint}_s"] = finished - request_started
+                    timings[f"first_{endpoint}_status"] = response.status_code
+                    timings.setdefault("spawn_to_first_response_s", finished - float(os.environ[SPAWN_ENV]))
+        return timings
+
+    timings = asyncio.run(serve())
+    print(json.dumps({
+        "interpreter_start_s": started - float(os.environ[SPAWN_ENV]),
+        "import_main_s": imported - started,
+        **timings,
+        "heavy_modules_after_requests": sorted(m for m in ("anthropic", "cerebras", "upstash_redis", "torch", "easyocr") if m in sys.modules),
+    }))
+
+
+def run_child(env: Dict[str, str], endpoints: List[str], frame_path: str) -> Dict[str, Any]:
+    env = dict(env, **{SPAWN_ENV: repr(time.time())})
+    process = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_cold_start", "--child", "--endpoints", ",".join(endpoints), "--frame", frame_path],
+        capture_output=True, text=True, env=env,
+    )
+    lines = [line for line in process.stdout.splitlines() if line.startswith("{")]
+    if process.returncode != 0 or not lines:
+        raise SystemExit(f"cold-start child failed:\n{process.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def summarize_runs(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    summary = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if isinstance(run.get(key), float)]
+        if values:
+            values.sort()
+            summary[key] = {"median": round(values[len(values) // 2], 3), "min": round(values[0], 3), "max": round(values[-1], 3)}
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", default=5, type=int)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), type=lambda s: [e.strip() for e in s.split(",") if e.strip()])
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--frame", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.endpoints, args.frame)
+        return
+    for endpoint in args.endpoints:
+        if endpoint not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {endpoint!r} (choose from {', '.join(ENDPOINTS)})")
+
+    # Upstreams answer instantly so the numbers are the backend's own start-up cost
+    from benchmarks.harness import OfflineBackend, git_revision, make_frame
+
+    instant = "latency_ms=0,jitter_ms=0"
+    backend = OfflineBackend({name: instant for name in ("anthropic", "cerebras", "upstash", "whisper")})
+    env = dict(os.environ, **backend.serve_upstreams())
+    with tempfile.NamedTemporaryFile("w", suffix=".b64", delete=False) as f:
+        f.write(make_frame("Problem 1\nSolve for x: 3x + 5 = 14\nShow your work"))
+        frame_path = f.name
+    try:
+        runs = [run_child(env, args.endpoints, frame_path) for _ in range(args.runs)]
+    finally:
+        os.unlink(frame_path)
+        backend.stop()
+
+    report = {
+        "benchmark": "bench_cold_start",
+        "revision": git_revision(),
+        "config": {"runs": args.runs, "endpoints": args.endpoints, "warmup": os.getenv("THYNK_WARMUP", "1"),
+                   "warmup_backends": os.getenv("THYNK_WARMUP_BACKENDS"), "warmup_inference": os.getenv("THYNK_WARMUP_INFERENCE", "local")},
+        "summary": summarize_runs(runs),
+        "heavy_modules_after_requests": runs[-1].get("heavy_modules_after_requests"),
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the CPU work on the request path
+Times image decode, the quality gate, frame hashing and preprocessing on a small
+frame and a 12MP phone photo; MinHash signatures, fingerprints and Redis JSON on
+short, page-sized and huge OCR texts; and the context weighting / prompt assembly
+in get_context, give_hint and the jury, with Redis and the LLMs replaced by
+zero-latency in-memory doubles. Runs offline with no API keys.
+
+Every case has a budget (generous, machine-independent ceilings that catch order of
+magnitude regressions). For tighter checks, save a baseline on one machine and compare
+later runs on the same machine against it; the exit status is 1 when a case regresses.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cpu
+    python -m benchmarks.bench_cpu --filter preprocess --repeats 7
+    python -m benchmarks.bench_cpu --save-baseline cpu_before.json
+    python -m benchmarks.bench_cpu --baseline cpu_before.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import sys
+import timeit
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.bench_similarity import make_page, ocr_noise
+from benchmarks.harness import git_revision, make_frame
+
+# Text sizes: a short photo caption, a textbook page, and a runaway OCR response
+TEXT_SIZES = {"short": 200, "page": 5000, "huge": 200000}
+
+
+def make_photo(width: int = 4032, height: int = 3024, seed: int = 0) -> str:
+    """Base64 JPEG of a 12MP phone photo: worksheet on a desk, uneven light and sensor noise"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    rng = np.random.default_rng(seed)
+    image = Image.new("RGB", (width, height), color=(92, 70, 52))
+    draw = ImageDraw.Draw(image)
+    page = (width // 8, height // 10, width * 7 // 8, height * 9 // 10)
+    draw.rectangle(page, fill=(232, 228, 218))
+    try:
+        font = ImageFont.load_default(size=height // 40)
+    except TypeError:
+        font = ImageFont.load_default()
+    text_rng = random.Random(seed)
+    y = page[1] + height // 20
+    while y < page[3] - height // 20:
+        draw.text((page[0] + width // 25, y), make_page(text_rng, 60), fill=(30, 30, 40), font=font)
+        y += height // 22
+
+    pixels = np.asarray(image, dtype=np.float32)
+    shading = np.linspace(0.8, 1.05, width, dtype=np.float32)[None, :, None]
+    pixels = np.clip(pixels * shading + rng.normal(0, 4, pixels.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class MemoryRedis:
+    """Zero-latency stand-in for the async Upstash client (only the commands the hot paths use)"""
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+        return "OK"
+
+    async def hset(self, key, field=None, value=None, values=None):
+        table = self.data.setdefault(key, {})
+        table.update(values or {field: value})
+        return 1
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hincrby(self, key, field, increment):
+        table = self.data.setdefault(key, {})
+        table[field] = int(table.get(field, 0)) + increment
+        return table[field]
+
+    async def zadd(self, key, scores):
+        self.data.setdefault(key, {}).update(scores)
+        return len(scores)
+
+    async def zrevrange(self, key, start, stop):
+        ordered = sorted(self.data.get(key, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member for member, _ in ordered[start:stop + 1 if stop >= 0 else None]]
+
+
+class InstantAnthropic:
+    """Messages API stand-in that answers immediately with a fixed text"""
+
+    def __init__(self, text: str = "Subtract 5 from both sides first."):
+        self.messages = SimpleNamespace(create=self._create)
+        self._text = text
+
+    async def _create(self, **kwargs):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=self._text)],
+            usage=SimpleNamespace(input_tokens=900, output_tokens=40, cache_creation_input_tokens=0, cache_read_input_tokens=800),
+        )
+
+
+class Case:
+    """One benchmark: a zero-argument callable plus its regression budget per call"""
+
+    def __init__(self, name: str, fn: Callable[[], Any], budget_ms: float):
+        self.name = name
+        self.fn = fn
+        self.budget_ms = budget_ms
+
+
+def _configure_offline() -> None:
+    # The backend modules build their clients at import time; nothing here touches the network
+    os.environ.setdefault("UPSTASH_REDIS_REST_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("UPSTASH_REDIS_REST_TOKEN", "offline")
+    os.environ.setdefault("CLAUDE_KEY", "offline")
+    os.environ.setdefault("CEREBRAS_API_KEY", "offline")
+    os.environ.setdefault("THYNK_TRACE_EXPORTERS", "none")
+
+
+def image_cases(frames: Dict[str, str]) -> List[Case]:
+    from PIL import Image
+
+    from capture_cadence import frame_hash
+    from ocr_models.preprocess import get_profile, preprocess_image
+    from ocr_models.quality_gate import create_quality_gate
+
+    gate = create_quality_gate()
+    cases = []
+    for label, image_base64 in frames.items():
+        data = base64.b64decode(image_base64)
+        large = label == "12mp"
+
+        def decode(image_base64=image_base64):
+            Image.open(io.BytesIO(base64.b64decode(image_base64))).load()
+
+        cases += [
+            Case(f"decode.b64_open.{label}", decode, 1500 if large else 50),
+            Case(f"quality_gate.{label}", lambda data=data: gate.assess(data), 400 if large else 50),
+            Case(f"frame_hash.{label}", lambda data=data: frame_hash(data), 400 if large else 50),
+            Case(f"preprocess.cerebras.{label}", lambda data=data: preprocess_image(data, get_profile("cerebras")), 1500 if large else 150),
+            Case(f"preprocess.claude.{label}", lambda data=data: preprocess_image(data, get_profile("claude")), 2500 if large else 200),
+        ]
+    return cases
+
+
+def text_cases(texts: Dict[str, str]) -> List[Case]:
+    from change_store import ChangeDetectionStore
+    from similarity import signature_similarity, text_signature
+
+    rng = random.Random(1)
+    cases = []
+    for label, text in texts.items():
+        huge = label == "huge"
+        signature = text_signature(text)
+        reread = text_signature(ocr_noise(rng, text, 0.02))
+        context_data = json.dumps({"content": text, "timestamp": 1.7e9, "created_at": "2025-01-01T00:00:00+00:00", "type": "general"})
+        cases += [
+            Case(f"is_different.signature.{label}", lambda text=text: text_signature(text), 2000 if huge else 50),
+            Case(f"is_different.compare.{label}", lambda a=signature, b=reread: signature_similarity(a, b), 5),
+            Case(f"is_different.fingerprint.{label}",
+                 lambda s=signature: ChangeDetectionStore.decode(ChangeDetectionStore.encode(s)), 5),
+            Case(f"redis_json.encode.{label}",
+                 lambda text=text: json.dumps({"content": text, "timestamp": 1.7e9, "created_at": "2025-01-01T00:00:00+00:00", "type": "general"}),
+                 200 if huge else 5),
+            Case(f"redis_json.decode.{label}", lambda payload=context_data: json.loads(payload), 200 if huge else 5),
+        ]
+    return cases
+
+
+def context_cases(texts: Dict[str, str], loop: asyncio.AbstractEventLoop) -> List[Case]:
+    """get_context, give_hint and jury aggregation with in-memory Redis and instant LLMs"""
+    import thynk_functions
+    from ocr_models import jury_model
+    from ocr_models.base_ocr import SimpleOCRResponse
+    from redis_client import redis_client
+
+    redis_client.client = MemoryRedis()
+    thynk_functions.anthropic_client = InstantAnthropic()
+
+    async def seed(user_id: str, entry_chars: int) -> None:
+        # 35 stored context entries and 15 lecture session summaries, the most give_hint reads
+        rng = random.Random(user_id)
+        context_key = redis_client._get_context_key(user_id)
+        for i in range(35):
+            entry = {"content": make_page(rng, entry_chars), "timestamp": 1.7e9 + i * 60, "type": "general"}
+            await redis_client.client.hset(context_key, f"ctx_{i}", json.dumps(entry))
+            await redis_client.client.zadd(f"{context_key}:sorted", {f"ctx_{i}": entry["timestamp"]})
+        for i in range(15):
+            await redis_client.store_lecture_session(f"lecture-{i}", {
+                "session_id": f"lecture-{i}", "summary": make_page(rng, entry_chars),
+                "chunks": 12, "tail": [], "timestamp": 1.7e9 + i * 600,
+            }, user_id)
+
+    # Entries are a tenth of the text size: 500 chars for "page", 20k for "huge"
+    for label in ("page", "huge"):
+        loop.run_until_complete(seed(f"bench-{label}", len(texts[label]) // 10))
+
+    class InstantMember:
+        """Jury member that returns a fixed OCR text"""
+
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def is_available(self):
+            return True
+
+        async def extract_text_from_image(self, image_base64):
+            return SimpleOCRResponse(full_text=texts["page"], success=True)
+
+    jury_model.ClaudeModel = InstantMember
+    jury_model.CerebrasModel = InstantMember
+    jury_model.get_shared_claude_client = lambda: InstantAnthropic(texts["page"])
+    jury = jury_model.JuryModel()
+
+    cases = []
+    for label in ("page", "huge"):
+        user_id = f"bench-{label}"
+        cases += [
+            Case(f"get_context.{label}", lambda u=user_id: loop.run_until_complete(thynk_functions.get_context(u)), 20 if label == "page" else 100),
+            Case(f"give_hint.{label}", lambda u=user_id: loop.run_until_complete(
+                thynk_functions.give_hint("Solving linear equations", "What do I do first?", u)), 40 if label == "page" else 250),
+        ]
+    cases.append(Case("jury.candidates.page", lambda: loop.run_until_complete(jury.extract_text_from_image("")), 20))
+    return cases
+
+
+def measure(case: Case, repeats: int, min_round_s: float) -> Dict[str, Any]:
+    """Best and median per-call time over `repeats` rounds, each long enough to time reliably"""
+    timer = timeit.Timer(case.fn)
+    number = 1
+    while timer.timeit(number) < min_round_s and number < 1 << 20:
+        number *= 2
+    rounds = [t / number * 1000 for t in timer.repeat(repeat=repeats, number=number)]
+    return {
+        "best_ms": round(min(rounds), 4),
+        "median_ms": round(float(np.median(rounds)), 4),
+        "calls_per_round": number,
+        "budget_ms": case.budget_ms,
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    """Names of cases over budget or slower than the baseline by more than `tolerance`"""
+    failures = []
+    for name, result in results.items():
+        if result["best_ms"] > result["budget_ms"]:
+            failures.append(f"{name}: {result['best_ms']:.3f} ms over budget {result['budget_ms']} ms")
+        previous = (baseline or {}).get("results", {}).get(name)
+        if previous:
+            limit = previous["best_ms"] * (1.0 + tolerance)
+            result["baseline_ms"] = previous["best_ms"]
+            result["change"] = round(result["best_ms"] / previous["best_ms"] - 1.0, 3) if previous["best_ms"] else None
+            if result["best_ms"] > limit:
+                failures.append(f"{name}: {result['best_ms']:.3f} ms vs baseline {previous['best_ms']:.3f} ms (+{result['change']:.0%})")
+    return failures
+
+
+def build_cases(loop: asyncio.AbstractEventLoop) -> List[Case]:
+    _configure_offline()
+    frames = {"small": make_frame("Solve for x: 2x + 5 = 13\nStep 1: 2x = 8\nStep 2: x = 4"), "12mp": make_photo()}
+    rng = random.Random(42)
+    texts = {label: make_page(rng, size) for label, size in TEXT_SIZES.items()}
+    return image_cases(frames) + text_cases(texts) + context_cases(texts, loop)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeats", default=5, type=int, help="timed rounds per case")
+    parser.add_argument("--min-round", default=0.05, type=float, help="minimum seconds per timed round")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", default=0.25, type=float, help="allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", help="write this run's JSON report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'case':<36} {'best ms':>10} {'median ms':>10} {'budget ms':>10}", file=sys.stderr)
+    for case in build_cases(loop):
+        if args.filter and args.filter not in case.name:
+            continue
+        results[case.name] = measure(case, args.repeats, args.min_round)
+        print(f"{case.name:<36} {results[case.name]['best_ms']:>10.3f} {results[case.name]['median_ms']:>10.3f} {case.budget_ms:>10}",
+              file=sys.stderr)
+    loop.close()
+
+    failures = compare(results, baseline, args.tolerance)
+    report = {
+        "benchmark": "bench_cpu",
+        "revision": git_revision(),
+        "config": {"repeats": args.repeats, "min_round_s": args.min_round, "tolerance": args.tolerance},
+        "results": results,
+        "failures": failures,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    if failures:
+        print("\n❌ Regressions:\n  " + "\n  ".join(failures), file=sys.stderr)
+        sys.exit(1)
+    print("\n✅ All cases within budget" + (" and baseline" if baseline else ""), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for /analyze-photo, /give-hint and /process-audio
+Boots the app in-process against fake Anthropic, Cerebras, Upstash and Whisper
+stand-ins, drives each endpoint at fixed concurrency levels and prints one JSON
+document (throughput, p50/p95/p99 latency, outbound call counts) that can be
+diffed across commits.
+
+Usage (from backend/):
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --concurrency 1,8,32 --requests 200 \\
+        --anthropic "latency_ms=600,jitter_ms=200,error_rate=0.02" --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import DEFAULT_PROFILES, OfflineBackend, git_revision, make_frame, make_lecture_wav, summarize
+
+ENDPOINTS = ("analyze-photo", "process-audio", "give-hint")
+
+
+def build_requests(endpoint: str, users: int, ocr_model: str) -> Callable[[int], Dict[str, Any]]:
+    """Request factory for an endpoint: index -> httpx request kwargs"""
+    if endpoint == "analyze-photo":
+        frames = [make_frame(f"Problem {i}\nSolve for x: {i + 2}x + 5 = {3 * i + 11}\nShow your work") for i in range(16)]
+        params = {"model": ocr_model} if ocr_model else {}
+        return lambda i: {"method": "POST", "url": "/analyze-photo", "params": params,
+                          "json": {"image_base64": frames[i % len(frames)], "user_id": f"bench-{i % users}"}}
+    if endpoint == "process-audio":
+        audio = make_lecture_wav()
+        return lambda i: {"method": "POST", "url": "/process-audio",
+                          "json": {"audio_base64": audio, "session_id": f"lecture-{i % users}", "user_id": f"bench-{i % users}"}}
+    if endpoint == "give-hint":
+        return lambda i: {"method": "POST", "url": "/give-hint",
+                          "json": {"learned": "I am solving linear equations", "question": "What do I do first?",
+                                   "user_id": f"bench-{i % users}"}}
+    raise ValueError(f"unknown endpoint {endpoint}")
+
+
+def is_success(endpoint: str, response) -> bool:
+    if response.status_code != 200:
+        return False
+    body = response.json()
+    if endpoint == "give-hint":
+        return body.get("status") == "success"
+    return bool(body.get("success"))
+
+
+async def run_level(backend: OfflineBackend, client, endpoint: str, concurrency: int, total: int, make) -> Dict[str, Any]:
+    """Send `total` requests with `concurrency` in flight; returns the run summary"""
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+    before = backend.outbound_calls()
+
+    async def worker():
+        nonlocal errors, next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            try:
+                response = await client.request(**make(index))
+                ok = is_success(endpoint, response)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_s = time.perf_counter() - started
+
+    after = backend.outbound_calls()
+    outbound = {name: after[name] - before[name] for name in after}
+    result = {"endpoint": endpoint, "concurrency": concurrency, **summarize(latencies, errors, wall_s)}
+    result["outbound_calls"] = outbound
+    result["outbound_calls_per_request"] = {name: round(count / max(1, total), 3) for name, count in outbound.items()}
+    return result
+
+
+async def run(args) -> Dict[str, Any]:
+    backend = OfflineBackend({name: getattr(args, name) for name in DEFAULT_PROFILES}, seed=args.seed).start()
+    results = []
+    try:
+        async with backend.client() as client:
+            for endpoint in args.endpoints:
+                make = build_requests(endpoint, args.users, args.ocr_model)
+                # One unmeasured request so lazy model/client setup is not in the numbers
+                await client.request(**make(0))
+                for concurrency in args.concurrency:
+                    results.append(await run_level(backend, client, endpoint, concurrency, args.requests, make))
+    finally:
+        backend.stop()
+
+    return {
+        "benchmark": "bench_endpoints",
+        "revision": git_revision(),
+        "config": {
+            "requests_per_level": args.requests,
+            "users": args.users,
+            "ocr_model": args.ocr_model or "adaptive",
+            "seed": args.seed,
+            "profiles": {name: profile.to_dict() for name, profile in backend.profiles.items()},
+        },
+        "results": results,
+        "outbound_errors_injected": backend.outbound_errors(),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS),
+                        type=lambda s: [e.strip() for e in s.split(",") if e.strip()])
+    parser.add_argument("--concurrency", default="1,8,32", type=lambda s: [int(c) for c in s.split(",")])
+    parser.add_argument("--requests", default=64, type=int, help="requests per endpoint and concurrency level")
+    parser.add_argument("--users", default=8, type=int, help="distinct user ids to spread requests over")
+    parser.add_argument("--ocr-model", default="", help="pin /analyze-photo to one OCR backend (default: adaptive)")
+    parser.add_argument("--seed", default=0, type=int)
+    for name, spec in DEFAULT_PROFILES.items():
+        parser.add_argument(f"--{name}", default=spec, help=f"fault profile for the fake {name} (default: {spec})")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    for endpoint in args.endpoints:
+        if endpoint not in ENDPOINTS:
+            raise SystemExit(f"unknown endpoint {endpoint!r} (choose from {', '.join(ENDPOINTS)})")
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark for hedged requests and circuit breakers
+Drives fault-injecting stub OCR backends directly, with and without the resilience layer
+
+Usage (from backend/):
+    python -m benchmarks.bench_resilience
+"""
+
+import asyncio
+import time
+from typing import List
+
+from ocr_models.stub_model import StubOCRModel
+from resilience import Resilience
+
+REQUESTS = 400
+CONCURRENCY = 20
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+async def drive(call) -> dict:
+    """Run REQUESTS calls at fixed concurrency; returns latency percentiles (ms) and error count"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call()
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(REQUESTS)))
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "errors": errors,
+    }
+
+
+def report(name: str, result: dict, extra: str = "") -> None:
+    print(
+        f"   {name:<26} p50={result['p50']:>7.1f}ms p95={result['p95']:>7.1f}ms "
+        f"p99={result['p99']:>7.1f}ms errors={result['errors']:>3} {extra}"
+    )
+
+
+async def run():
+    print("🛡️  Resilience benchmark (stub OCR backends)")
+    print(f"   {REQUESTS} requests at concurrency {CONCURRENCY}\n")
+
+    # Scenario 1: stragglers. Primary is usually fast but 4% of calls take 3s
+    print("Stragglers: primary 4% at 3000ms, alternate ~250ms")
+    primary = StubOCRModel("primary", latency_ms=120, jitter_ms=30, slow_rate=0.04, slow_ms=3000, seed=1)
+    alternate = StubOCRModel("alternate", latency_ms=250, jitter_ms=40, seed=2)
+    report("direct", await drive(lambda: primary.extract_text_from_image("")))
+
+    layer = Resilience(hedge_min_samples=20, hedge_default_ms=1000)
+    primary.calls = alternate.calls = 0
+    hedged = await drive(lambda: layer.hedged([
+        ("primary", lambda: primary.extract_text_from_image("")),
+        ("alternate", lambda: alternate.extract_text_from_image("")),
+    ]))
+    report("hedged at p95", hedged, f"extra calls={alternate.calls / max(1, primary.calls):.1%}")
+
+    # Scenario 2: outage. Primary fails every call after a 2s timeout-like delay
+    print("\nOutage: primary fails after 2000ms, alternate ~250ms")
+    broken = StubOCRModel("broken", latency_ms=2000, jitter_ms=0, error_rate=1.0, seed=3)
+    layer = Resilience(failure_threshold=5, reset_timeout_s=30, hedge_enabled=False)
+    fallback_only = await drive(lambda: layer.hedged([
+        ("broken", lambda: broken.extract_text_from_image("")),
+        ("alternate", lambda: alternate.extract_text_from_image("")),
+    ]))
+    report("breaker + fallback", fallback_only, f"calls to broken backend={broken.calls}")
+    print(f"\n   breaker state: {layer.snapshot()['broken']['state']}")
+
+
+def main():
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+"""
+Local stand-ins for external APIs used by the backend
+Each fake is a small FastAPI app that records what it receives, so offline
+benchmarks and checks can run without API keys or network access.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FaultProfile:
+    """Latency distribution and error rate for a fake endpoint.
+
+    Each call waits a Gaussian latency (latency_ms +/- jitter_ms); a slow_rate
+    share of calls waits slow_ms instead, and an error_rate share fails.
+    Build from a spec string such as "latency_ms=400,jitter_ms=100,error_rate=0.02".
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.slow_rate = float(slow_rate)
+        self.slow_ms = float(slow_ms)
+        self.seed = seed
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_spec(cls, spec: str, seed: Optional[int] = None) -> "FaultProfile":
+        options: Dict[str, Any] = {"seed": seed}
+        for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            options[key] = int(value) if key == "seed" else float(value)
+        return cls(**options)
+
+    def sample_ms(self) -> float:
+        if self.slow_rate and self._random.random() < self.slow_rate:
+            return self.slow_ms
+        return max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+
+    def fails(self) -> bool:
+        return bool(self.error_rate) and self._random.random() < self.error_rate
+
+    async def delay(self) -> None:
+        delay_ms = self.sample_ms()
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000.0)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "error_rate": self.error_rate,
+            "slow_rate": self.slow_rate,
+            "slow_ms": self.slow_ms,
+        }
+
+
+class FakeAnthropic:
+    """Fake Anthropic Messages API that simulates prompt caching.
+
+    A system prefix marked with cache_control is "written" to the cache the
+    first time it is seen and "read" on later requests, and the usage block
+    reports cache_creation_input_tokens / cache_read_input_tokens the way the
+    real API does. As with the real API, a prefix shorter than the model's
+    minimum cacheable length is processed uncached and billed as ordinary
+    input. Requests whose shape would defeat caching, or whose prefix is too
+    short to be cached, are recorded in `violations`.
+    """
+
+    # Shortest cacheable prefix: 2048 tokens for Haiku models, 1024 otherwise
+    CACHE_MIN_TOKENS = 1024
+    CACHE_MIN_TOKENS_HAIKU = 2048
+
+    def __init__(self, profile: Optional[FaultProfile] = None, record: bool = True):
+        self.profile = profile or FaultProfile()
+        self.record = record
+        self.calls = 0
+        self.errors = 0
+        self.requests: List[Dict[str, Any]] = []
+        self.violations: List[str] = []
+        self._cached_prefixes: set = set()
+        self.app = FastAPI(title="Fake Anthropic")
+        self.app.post("/v1/messages")(self.messages)
+
+    @staticmethod
+    def _tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    @classmethod
+    def cache_min_tokens(cls, model: str) -> int:
+        return cls.CACHE_MIN_TOKENS_HAIKU if "haiku" in (model or "") else cls.CACHE_MIN_TOKENS
+
+    def _check_shape(self, body: Dict[str, Any]) -> Optional[str]:
+        """Return the cached prefix text, recording violations of the cacheable layout"""
+        system = body.get("system")
+        if not isinstance(system, list) or not system:
+            self.violations.append("system prompt is not a list of content blocks")
+            return None
+        cached = [block for block in system if block.get("cache_control", {}).get("type") == "ephemeral"]
+        if not cached:
+            self.violations.append("no system block is marked with cache_control")
+            return None
+        if system[-1] is not cached[-1]:
+            self.violations.append("dynamic system blocks follow the cached prefix")
+        prefix = "".join(block.get("text", "") for block in system)
+        for message in body.get("messages", []):
+            content = message.get("content")
+            text = content if isinstance(content, str) else json.dumps(content)
+            if prefix and prefix[:200] in text:
+                self.violations.append("static prefix is repeated inside the user message")
+        return prefix
+
+    def _reply_text(self, body: Dict[str, Any]) -> str:
+        """Plausible response text for the prompt that was sent"""
+        messages = body.get("messages", [])
+        content = messages[-1].get("content", "") if messages else ""
+        text = content if isinstance(content, str) else json.dumps(content)
+        if "<item id=" in text:
+            count = text.count("<item id=")
+            return json.dumps([{"id": i, "summary": f"Summary of item {i}."} for i in range(count)])
+        if "Candidates:" in text:
+            return text.split("Candidates:\n", 1)[-1].split("\n", 1)[0].lstrip("0123456789. ")
+        return "Solve for $x$: $2x + 5 = 13$"
+
+    async def messages(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        await self.profile.delay()
+        if self.profile.fails():
+            self.errors += 1
+            return JSONResponse(status_code=529, content={
+                "type": "error",
+                "error": {"type": "overloaded_error", "message": "Injected fake overload"},
+            })
+        if self.record:
+            self.requests.append(body)
+        prefix = self._check_shape(body)
+
+        dynamic = json.dumps(body.get("messages", []))
+        usage = {
+            "input_tokens": self._tokens(dynamic),
+            "output_tokens": 16,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0,
+        }
+        minimum = self.cache_min_tokens(body.get("model", ""))
+        if prefix and self._tokens(prefix) < minimum:
+            self.violations.append(
+                f"cached prefix of ~{self._tokens(prefix)} tokens is below the {minimum}-token minimum "
+                f"for {body.get('model', 'this model')} and is never cached"
+            )
+            usage["input_tokens"] += self._tokens(prefix)
+        elif prefix:
+            if prefix in self._cached_prefixes:
+                usage["cache_read_input_tokens"] = self._tokens(prefix)
+            else:
+                self._cached_prefixes.add(prefix)
+                usage["cache_creation_input_tokens"] = self._tokens(prefix)
+
+        return {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model", "fake"),
+            "content": [{"type": "text", "text": self._reply_text(body)}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": usage,
+        }
+
+
+class FakeCerebras:
+    """Fake Cerebras chat completions API (OpenAI-style schema)"""
+
+    def __init__(self, profile: Optional[FaultProfile] = None):
+        self.profile = profile or FaultProfile()
+        self.calls = 0
+        self.errors = 0
+        self.app = FastAPI(title="Fake Cerebras")
+        self.app.post("/v1/chat/completions")(self.chat_completions)
+
+    async def chat_completions(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        await self.profile.delay()
+        if self.profile.fails():
+            self.errors += 1
+            return JSONResponse(status_code=500, content={"message": "Injected fake failure", "type": "server_error"})
+        prompt = json.dumps(body.get("messages", []))
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "Solve for $x$: $2x + 5 = 13$"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": max(1, len(prompt) // 4), "completion_tokens": 16,
+                      "total_tokens": max(1, len(prompt) // 4) + 16},
+        }
+
+
+class FakeUpstash:
+    """Fake Upstash Redis REST API backed by an in-memory store.
+
+    Speaks the REST protocol of upstash-redis (a JSON command array posted to
+    "/", a list of them to "/pipeline", base64-encoded results when asked for)
+    and implements the string, hash and sorted-set commands the backend uses.
+    """
+
+    def __init__(self, profile: Optional[FaultProfile] = None):
+        self.profile = profile or FaultProfile()
+        self.calls = 0
+        self.errors = 0
+        self.commands: Dict[str, int] = {}
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self.app = FastAPI(title="Fake Upstash")
+        self.app.post("/")(self.command)
+        self.app.post("/pipeline")(self.pipeline)
+
+    def _live(self, key: str) -> Any:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.time():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return self._data.get(key)
+
+    def _execute(self, command: List[Any]) -> Any:
+        name = str(command[0]).upper()
+        args = [str(arg) for arg in command[1:]]
+        self.commands[name] = self.commands.get(name, 0) + 1
+        if name == "PING":
+            return "PONG"
+        if name == "GET":
+            return self._live(args[0])
+        if name == "SET":
+            self._data[args[0]] = args[1]
+            self._expires.pop(args[0], None)
+            options = [arg.upper() for arg in args[2:]]
+            if "EX" in options:
+                self._expires[args[0]] = time.time() + float(args[2 + options.index("EX") + 1])
+            return "OK"
+        if name == "EXISTS":
+            return sum(1 for key in args if self._live(key) is not None)
+        if name == "DEL":
+            return sum(1 for key in args if self._data.pop(key, None) is not None)
+        if name == "EXPIRE":
+            if self._live(args[0]) is None:
+                return 0
+            self._expires[args[0]] = time.time() + float(args[1])
+            return 1
+        if name == "HSET":
+            table = self._live(args[0]) or {}
+            added = sum(1 for field in args[1::2] if field not in table)
+            table.update(zip(args[1::2], args[2::2]))
+            self._data[args[0]] = table
+            return added
+        if name == "HGET":
+            return (self._live(args[0]) or {}).get(args[1])
+        if name == "HGETALL":
+            return [item for pair in (self._live(args[0]) or {}).items() for item in pair]
+        if name == "HINCRBY":
+            table = self._live(args[0]) or {}
+            table[args[1]] = str(int(table.get(args[1], 0)) + int(args[2]))
+            self._data[args[0]] = table
+            return int(table[args[1]])
+        if name == "ZADD":
+            zset = self._live(args[0]) or {}
+            pairs = [arg for arg in args[1:] if arg.upper() not in ("NX", "XX", "GT", "LT", "CH")]
+            added = sum(1 for member in pairs[1::2] if member not in zset)
+            zset.update((member, float(score)) for score, member in zip(pairs[0::2], pairs[1::2]))
+            self._data[args[0]] = zset
+            return added
+        if name in ("ZRANGE", "ZREVRANGE"):
+            zset = self._live(args[0]) or {}
+            ordered = sorted(zset.items(), key=lambda item: (item[1], item[0]), reverse=(name == "ZREVRANGE"))
+            start, stop = int(args[1]), int(args[2])
+            stop = len(ordered) + stop if stop < 0 else stop
+            selected = ordered[start:stop + 1]
+            if any(arg.upper() == "WITHSCORES" for arg in args[3:]):
+                return [item for member, score in selected for item in (member, repr(score))]
+            return [member for member, _ in selected]
+        if name == "ZCARD":
+            return len(self._live(args[0]) or {})
+        raise ValueError(f"ERR unknown command '{name}'")
+
+    @staticmethod
+    def _encode(result: Any) -> Any:
+        if isinstance(result, str):
+            return result if result == "OK" else base64.b64encode(result.encode()).decode()
+        if isinstance(result, list):
+            return [FakeUpstash._encode(item) for item in result]
+        return result
+
+    async def _respond(self, request: Request, command: List[Any]) -> Dict[str, Any]:
+        try:
+            result = self._execute(command)
+        except Exception as e:
+            return {"error": str(e)}
+        if request.headers.get("upstash-encoding") == "base64":
+            result = self._encode(result)
+        return {"result": result}
+
+    async def command(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        await self.profile.delay()
+        if self.profile.fails():
+            self.errors += 1
+            return JSONResponse(status_code=500, content={"error": "Injected fake failure"})
+        return await self._respond(request, body)
+
+    async def pipeline(self, request: Request):
+        body = await request.json()
+        self.calls += 1
+        await self.profile.delay()
+        if self.profile.fails():
+            self.errors += 1
+            return JSONResponse(status_code=500, content={"error": "Injected fake failure"})
+        return [await self._respond(request, command) for command in body]
+
+
+LECTURE_SENTENCES = [
+    "Today we cover derivatives.",
+    "The derivative of x squared is 2x.",
+    "The power rule brings the exponent down and lowers it by one.",
+    "A constant factor can be pulled out of the derivative.",
+    "The derivative of a sum is the sum of the derivatives.",
+    "For a product we use the product rule.",
+    "The chain rule handles a function inside another function.",
+    "Sine differentiates to cosine.",
+    "The exponential function is its own derivative.",
+    "The natural log of x differentiates to one over x.",
+    "Critical points are where the derivative is zero.",
+    "The second derivative tells us about concavity.",
+]
+
+
+class FakeTranscriber:
+    """In-process stand-in for the Whisper transcriber (transcribe_base64_audio interface).
+
+    Each call returns the next two sentences of a short lecture, so sessions
+    keep receiving new material the way a real lecture does.
+    """
+
+    def __init__(self, profile: Optional[FaultProfile] = None, sentences: Optional[List[str]] = None):
+        self.profile = profile or FaultProfile()
+        self.sentences = sentences or LECTURE_SENTENCES
+        self.calls = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def transcribe_base64_audio(self, audio_base64: str) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+            start = (2 * self.calls) % len(self.sentences)
+            text = " ".join((self.sentences * 2)[start:start + 2])
+            delay_ms = self.profile.sample_ms()
+            failed = self.profile.fails()
+        time.sleep(delay_ms / 1000.0)
+        if failed:
+            with self._lock:
+                self.errors += 1
+            return {"success": False, "error": "Injected fake failure", "text": ""}
+        return {"success": True, "text": text, "confidence": 0.9}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_in_thread(app: FastAPI) -> Tuple[str, uvicorn.Server]:
+    """Start an app on a free local port and return (base_url, server)"""
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", server
@@ -0,0 +1,156 @@
+"""
+Offline harness: the FastAPI app in-process, wired to local fake upstreams
+Starts fake Anthropic, Cerebras and Upstash servers with configurable latency
+and error profiles, points the backend at them through its normal environment
+variables, imports main and swaps in a fake Whisper transcriber. Requests go
+through httpx's ASGI transport, so no port is opened for the app itself.
+"""
+
+import base64
+import io
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.fake_servers import FakeAnthropic, FakeCerebras, FakeTranscriber, FakeUpstash, FaultProfile, serve_in_thread
+
+# Defaults roughly match production medians for each upstream
+DEFAULT_PROFILES = {
+    "anthropic": "latency_ms=400,jitter_ms=120",
+    "cerebras": "latency_ms=150,jitter_ms=40",
+    "upstash": "latency_ms=4,jitter_ms=2",
+    "whisper": "latency_ms=250,jitter_ms=60",
+}
+
+# Environment variables serve_upstreams sets (a child process needs all of them)
+OFFLINE_ENV = (
+    "ANTHROPIC_BASE_URL", "CLAUDE_KEY", "CEREBRAS_BASE_URL", "CEREBRAS_API_KEY",
+    "UPSTASH_REDIS_REST_URL", "UPSTASH_REDIS_REST_TOKEN", "THYNK_TRACE_EXPORTERS",
+)
+
+
+def percentile(samples: List[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(latencies_ms: List[float], errors: int, wall_s: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles for one run"""
+    def rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+
+    return {
+        "requests": len(latencies_ms),
+        "errors": errors,
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(latencies_ms) / wall_s, 2) if wall_s > 0 else None,
+        "p50_ms": rounded(percentile(latencies_ms, 50)),
+        "p95_ms": rounded(percentile(latencies_ms, 95)),
+        "p99_ms": rounded(percentile(latencies_ms, 99)),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def make_frame(text: str, width: int = 640, height: int = 480) -> str:
+    """Base64 PNG of a worksheet-like frame with sharp dark text (passes the quality gate)"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (width, height), color=(235, 232, 225))
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(text.split("\n")):
+        draw.text((24, 24 + row * 28), line, fill=(20, 20, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def make_lecture_wav(seconds: float = 8.0, sample_rate: int = 16000, seed: int = 0) -> str:
+    """Base64 WAV with voiced bursts separated by near-silence (several VAD segments)"""
+    from audio_vad import encode_wav
+
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    voice = 0.3 * (np.sin(2 * np.pi * 180 * t) + 0.5 * np.sin(2 * np.pi * 360 * t)) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    voiced = (t % 2.5) < 1.5
+    samples = np.where(voiced, voice, 0.0) + rng.normal(0, 0.001, len(t))
+    return base64.b64encode(encode_wav(samples.astype(np.float32), sample_rate)).decode()
+
+
+class OfflineBackend:
+    """Fake upstreams plus the backend app, imported against them"""
+
+    def __init__(self, profiles: Optional[Dict[str, str]] = None, seed: int = 0):
+        specs = {**DEFAULT_PROFILES, **(profiles or {})}
+        self.profiles = {name: FaultProfile.from_spec(spec, seed=seed + i) for i, (name, spec) in enumerate(sorted(specs.items()))}
+        self.anthropic = FakeAnthropic(self.profiles["anthropic"], record=False)
+        self.cerebras = FakeCerebras(self.profiles["cerebras"])
+        self.upstash = FakeUpstash(self.profiles["upstash"])
+        self.whisper = FakeTranscriber(self.profiles["whisper"])
+        self.app: Any = None
+        self._servers: List[Any] = []
+
+    def serve_upstreams(self) -> Dict[str, str]:
+        """Start the fake upstreams and point the backend's environment variables at them"""
+        anthropic_url, server = serve_in_thread(self.anthropic.app)
+        self._servers.append(server)
+        cerebras_url, server = serve_in_thread(self.cerebras.app)
+        self._servers.append(server)
+        upstash_url, server = serve_in_thread(self.upstash.app)
+        self._servers.append(server)
+
+        # Every client reads these when it is first created
+        os.environ["ANTHROPIC_BASE_URL"] = anthropic_url
+        os.environ["CLAUDE_KEY"] = "fake-key"
+        os.environ["CEREBRAS_BASE_URL"] = cerebras_url
+        os.environ["CEREBRAS_API_KEY"] = "fake-key"
+        os.environ["UPSTASH_REDIS_REST_URL"] = upstash_url
+        os.environ["UPSTASH_REDIS_REST_TOKEN"] = "fake-token"
+        os.environ.setdefault("THYNK_TRACE_EXPORTERS", "none")
+        return {name: os.environ[name] for name in OFFLINE_ENV}
+
+    def start(self) -> "OfflineBackend":
+        """Serve the fakes and import the app against them, in this process"""
+        self.serve_upstreams()
+        if "main" in sys.modules:
+            raise RuntimeError("main was imported before the fake upstreams were configured")
+
+        import main
+
+        main.segmented_transcriber.transcriber = self.whisper
+        self.app = main.fastapi_app
+        return self
+
+    def client(self, timeout_s: float = 120.0) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://thynk", timeout=timeout_s)
+
+    def outbound_calls(self) -> Dict[str, int]:
+        return {
+            "anthropic": self.anthropic.calls,
+            "cerebras": self.cerebras.calls,
+            "upstash": self.upstash.calls,
+            "whisper": self.whisper.calls,
+        }
+
+    def outbound_errors(self) -> Dict[str, int]:
+        return {
+            "anthropic": self.anthropic.errors,
+            "cerebras": self.cerebras.errors,
+            "upstash": self.upstash.errors,
+            "whisper": self.whisper.errors,
+        }
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.should_exit = True
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Import-time report for the backend
+Imports a module (main by default) in a fresh interpreter with `python -X importtime`,
+then prints the slowest imports and the total per top-level package. It also lists
+heavy SDKs that were loaded eagerly; those should load on first use or at warmup.
+
+Usage (from backend/):
+    python -m benchmarks.import_report
+    python -m benchmarks.import_report --top 40 --json
+    python -m benchmarks.import_report --fail-on-heavy    # exit 1 if a heavy SDK loads at import
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+# SDKs that should never be paid for at import time
+HEAVY_MODULES = ("torch", "easyocr", "whisper", "google.cloud.vision", "cerebras", "anthropic", "upstash_redis", "modal")
+
+_MARKER = "__loaded_modules__"
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def run_importtime(module: str) -> Dict[str, Any]:
+    """Import `module` in a child interpreter; returns the parsed importtime entries and wall time"""
+    env = dict(os.environ)
+    # Import must work without credentials or network; clients are created lazily
+    env.setdefault("UPSTASH_REDIS_REST_URL", "http://127.0.0.1:9")
+    env.setdefault("UPSTASH_REDIS_REST_TOKEN", "offline")
+    env.setdefault("THYNK_TRACE_EXPORTERS", "none")
+    started = time.perf_counter()
+    # importtime also logs failed optional imports, so what actually loaded comes from sys.modules
+    code = f"import {module}, sys, json; print({_MARKER!r} + json.dumps(sorted(sys.modules)))"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env)
+    wall_s = time.perf_counter() - started
+    if process.returncode != 0:
+        errors = [line for line in process.stderr.splitlines() if not line.startswith("import time:")]
+        raise SystemExit(f"importing {module} failed:\n" + "\n".join(errors[-20:]))
+
+    entries = []
+    for line in process.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            entries.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    loaded = next((json.loads(line[len(_MARKER):]) for line in process.stdout.splitlines() if line.startswith(_MARKER)), [])
+    return {"entries": entries, "loaded": loaded, "wall_s": wall_s}
+
+
+def build_report(module: str, entries: List[Dict[str, Any]], loaded: List[str], wall_s: float, top: int) -> Dict[str, Any]:
+    # Each top-level package's cost is the sum of its own modules' self times
+    packages: Dict[str, float] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + entry["self_ms"]
+    heavy = sorted(name for name in HEAVY_MODULES if name in set(loaded))
+    slowest = sorted(entries, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+    return {
+        "module": module,
+        "wall_s": round(wall_s, 3),
+        "import_ms": round(sum(entry["self_ms"] for entry in entries), 1),
+        "modules_imported": len(entries),
+        "heavy_modules_loaded": heavy,
+        "packages_ms": {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]},
+        "slowest": [{"module": entry["module"], "cumulative_ms": round(entry["cumulative_ms"], 1)} for entry in slowest],
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"📦 import {report['module']}: {report['import_ms']:.0f} ms in imports, "
+          f"{report['modules_imported']} modules, {report['wall_s']:.2f} s interpreter wall time\n")
+    print(f"{'package':<28} {'ms':>9}")
+    for name, ms in report["packages_ms"].items():
+        print(f"{name:<28} {ms:>9.1f}")
+    print(f"\n{'slowest imports (cumulative)':<48} {'ms':>9}")
+    for entry in report["slowest"]:
+        print(f"{entry['module']:<48} {entry['cumulative_ms']:>9.1f}")
+    if report["heavy_modules_loaded"]:
+        print(f"\n⚠️  Heavy SDKs loaded at import: {', '.join(report['heavy_modules_loaded'])}")
+    else:
+        print("\n✅ No heavy SDKs loaded at import")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", default=25, type=int, help="rows per table")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--fail-on-heavy", action="store_true", help="exit 1 if any heavy SDK is imported eagerly")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run_importtime(args.module)
+    report = build_report(args.module, result["entries"], result["loaded"], result["wall_s"], args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.fail_on_heavy and report["heavy_modules_loaded"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
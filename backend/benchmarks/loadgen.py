@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+Session-replay load generator for streaming glasses workloads
+Replays recorded session traces, or simulates N users who stream near-duplicate
+frames at the capture cadence the server asks for, ask for hints now and then
+and (some of them) stream lecture audio. Reports per-user end-to-end latency
+plus backend, LLM and Redis operation counts taken from /metrics.
+
+Runs in-process against the offline fakes by default, or against a live
+replica with --url.
+
+Usage (from backend/):
+    python -m benchmarks.loadgen --users 20 --duration 120
+    python -m benchmarks.loadgen --users 50 --duration 600 --speed 10 --save-trace traces/run1
+    python -m benchmarks.loadgen --replay traces/run1/trace.jsonl --url http://localhost:8000
+
+Trace format: trace.jsonl, one event per line, sorted by "t" (seconds from start):
+    {"t": 0.0, "user_id": "u1", "type": "photo", "file": "frames/000001.png"}
+    {"t": 4.2, "user_id": "u1", "type": "hint", "learned": "...", "question": "..."}
+    {"t": 9.0, "user_id": "u2", "type": "audio", "file": "audio/000002.wav", "session_id": "lecture-u2"}
+    {"t": 9.5, "user_id": "u2", "type": "context", "text": "..."}
+"file" paths are relative to the trace file; "image_base64"/"audio_base64" may be inlined instead.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import os
+import random
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import DEFAULT_PROFILES, OfflineBackend, git_revision, make_lecture_wav, percentile, summarize
+
+# Worked problems the simulated students write out, one line at a time
+PROBLEMS = [
+    ["Solve for x: 2x + 5 = 13", "2x = 13 - 5", "2x = 8", "x = 4"],
+    ["Find dy/dx of y = x^2 + 3x", "dy/dx = 2x + 3"],
+    ["Factor x^2 - 5x + 6", "(x - 2)(x - 3)", "x = 2 or x = 3"],
+    ["Integrate 3x^2 dx", "= x^3 + C"],
+    ["Solve 3(x - 2) = 9", "x - 2 = 3", "x = 5"],
+    ["Area of a circle with r = 4", "A = pi r^2", "A = 16 pi"],
+]
+
+HINT_QUESTIONS = [
+    "What should I do first?",
+    "Am I on the right track?",
+    "How do I check my answer?",
+    "",
+]
+
+
+def math_frame(text: str, dx: int = 0, dy: int = 0, size=(800, 600)) -> bytes:
+    """PNG of black 40px text on white, like test_complete_flow.create_test_math_image, shifted by (dx, dy)"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    image = Image.new("RGB", size, color="white")
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=40)
+    except TypeError:
+        font = ImageFont.load_default()
+    draw.text((50 + dx, 200 + dy), text, fill="black", font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class Recorder:
+    """Per-user latencies and errors by request type, plus an optional trace writer"""
+
+    def __init__(self, trace_dir: Optional[str] = None, speed: float = 1.0):
+        self.samples: Dict[str, Dict[str, List[float]]] = {}
+        self.errors: Dict[str, Dict[str, int]] = {}
+        self.started = time.perf_counter()
+        self.trace_dir = trace_dir
+        self.speed = speed
+        self._trace: List[Dict[str, Any]] = []
+        if trace_dir:
+            os.makedirs(os.path.join(trace_dir, "frames"), exist_ok=True)
+            os.makedirs(os.path.join(trace_dir, "audio"), exist_ok=True)
+
+    def record(self, user_id: str, kind: str, latency_ms: float, ok: bool) -> None:
+        self.samples.setdefault(user_id, {}).setdefault(kind, []).append(latency_ms)
+        if not ok:
+            errors = self.errors.setdefault(user_id, {})
+            errors[kind] = errors.get(kind, 0) + 1
+
+    def trace(self, event: Dict[str, Any], payload: Optional[bytes] = None) -> None:
+        """Add a sent event to the saved trace (payload bytes are written next to it)"""
+        if not self.trace_dir:
+            return
+        # Saved in session time, so a trace recorded at --speed 10 replays at its real pace
+        event = dict(event, t=round((time.perf_counter() - self.started) * self.speed, 3))
+        if payload is not None:
+            folder, extension = ("frames", "png") if event["type"] == "photo" else ("audio", "wav")
+            name = f"{folder}/{len(self._trace):06d}.{extension}"
+            with open(os.path.join(self.trace_dir, name), "wb") as f:
+                f.write(payload)
+            event["file"] = name
+        self._trace.append(event)
+
+    def save_trace(self) -> Optional[str]:
+        if not self.trace_dir:
+            return None
+        path = os.path.join(self.trace_dir, "trace.jsonl")
+        with open(path, "w") as f:
+            for event in sorted(self._trace, key=lambda e: e["t"]):
+                f.write(json.dumps(event) + "\n")
+        return path
+
+
+async def send(client: httpx.AsyncClient, recorder: Recorder, event: Dict[str, Any], payload: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+    """Send one event to its endpoint; records latency and returns the JSON reply (None on failure)"""
+    kind = event["type"]
+    user_id = event["user_id"]
+    if kind == "photo":
+        image_base64 = event.get("image_base64") or base64.b64encode(payload).decode()
+        request = {"url": "/analyze-photo", "json": {"image_base64": image_base64, "user_id": user_id}}
+    elif kind == "audio":
+        audio_base64 = event.get("audio_base64") or base64.b64encode(payload).decode()
+        request = {"url": "/process-audio", "json": {"audio_base64": audio_base64, "user_id": user_id,
+                                                    "session_id": event.get("session_id")}}
+    elif kind == "hint":
+        request = {"url": "/give-hint", "json": {"learned": event.get("learned", ""), "question": event.get("question", ""),
+                                                 "user_id": user_id}}
+    elif kind == "context":
+        request = {"url": "/context-compression", "json": {"text": event.get("text", ""), "user_id": user_id}}
+    else:
+        raise ValueError(f"unknown event type {kind!r}")
+
+    recorder.trace({k: v for k, v in event.items() if k not in ("image_base64", "audio_base64")}, payload)
+    started = time.perf_counter()
+    body = None
+    try:
+        response = await client.post(**request)
+        ok = response.status_code == 200
+        body = response.json() if ok else None
+        if body is not None and kind in ("hint", "context"):
+            ok = body.get("status") == "success"
+        elif body is not None and kind in ("photo", "audio"):
+            # A rejected (blurred) frame is a valid, fast answer rather than an error
+            ok = bool(body.get("success")) or body.get("error") == "frame_rejected"
+    except Exception:
+        ok = False
+    recorder.record(user_id, kind, (time.perf_counter() - started) * 1000, ok)
+    return body
+
+
+async def simulated_user(client, recorder: Recorder, user_id: str, rng: random.Random, deadline: float, speed: float,
+                         hint_interval_s: float, lecture: bool, audio_chunk_s: float, change_rate: float) -> None:
+    """One student: frames at the server's capture cadence, occasional hints, optional lecture audio"""
+
+    async def sleep(seconds: float) -> None:
+        # Never past the deadline, so the run ends on time and throughput is not diluted
+        await asyncio.sleep(max(0.0, min(seconds / speed, deadline - time.perf_counter())))
+
+    def running() -> bool:
+        return time.perf_counter() < deadline
+
+    async def photos():
+        problem = rng.choice(PROBLEMS)
+        written = 1
+        while running():
+            # Head motion shifts the page a little between frames; sometimes a new line is written
+            if rng.random() < change_rate:
+                if written < len(problem):
+                    written += 1
+                else:
+                    problem, written = rng.choice(PROBLEMS), 1
+            frame = await asyncio.to_thread(math_frame, "\n".join(problem[:written]), rng.randint(-6, 6), rng.randint(-6, 6))
+            reply = await send(client, recorder, {"user_id": user_id, "type": "photo"}, frame)
+            next_capture_ms = (reply or {}).get("next_capture_ms") or 3000
+            await sleep(next_capture_ms / 1000.0)
+
+    async def hints():
+        while True:
+            await sleep(rng.expovariate(1.0 / hint_interval_s))
+            if not running():
+                return
+            await send(client, recorder, {"user_id": user_id, "type": "hint",
+                                          "learned": "Working through algebra problems",
+                                          "question": rng.choice(HINT_QUESTIONS)})
+
+    async def audio():
+        chunk = base64.b64decode(make_lecture_wav(seconds=audio_chunk_s, seed=rng.randint(0, 10 ** 6)))
+        while True:
+            await sleep(audio_chunk_s)
+            if not running():
+                return
+            await send(client, recorder, {"user_id": user_id, "type": "audio", "session_id": f"lecture-{user_id}"}, chunk)
+
+    # Users do not all start at the same instant
+    await sleep(rng.uniform(0, 3))
+    tasks = [photos(), hints()] + ([audio()] if lecture else [])
+    await asyncio.gather(*tasks)
+
+
+async def replay(client, recorder: Recorder, trace_path: str, speed: float) -> None:
+    """Send every trace event at its timestamp (scaled by speed), concurrently"""
+    base_dir = os.path.dirname(os.path.abspath(trace_path))
+    with open(trace_path) as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    events.sort(key=lambda e: e.get("t", 0.0))
+    started = time.perf_counter()
+    tasks = []
+    for event in events:
+        delay = event.get("t", 0.0) / speed - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = None
+        if event.get("file"):
+            with open(os.path.join(base_dir, event["file"]), "rb") as f:
+                payload = f.read()
+        tasks.append(asyncio.create_task(send(client, recorder, event, payload)))
+    await asyncio.gather(*tasks)
+
+
+_SAMPLE = re.compile(r'^(\w+)_count\{([^}]*)\} (\S+)$')
+
+
+def operation_counts(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    """Histogram counts from Prometheus text, keyed by metric and its main label"""
+    keys = {
+        "ocr_request_seconds": "backend",
+        "backend_call_seconds": "backend",
+        "llm_call_seconds": "prompt",
+        "redis_op_seconds": "op",
+    }
+    counts: Dict[str, Dict[str, float]] = {name: {} for name in keys}
+    for line in metrics_text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match or match.group(1) not in keys:
+            continue
+        labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match.group(2)))
+        key = labels.get(keys[match.group(1)], "")
+        series = counts[match.group(1)]
+        series[key] = series.get(key, 0) + float(match.group(3))
+    return counts
+
+
+def diff_counts(after: Dict[str, Dict[str, float]], before: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, int]]:
+    return {
+        name: {key: int(value - before.get(name, {}).get(key, 0)) for key, value in sorted(series.items())
+               if value - before.get(name, {}).get(key, 0) > 0}
+        for name, series in after.items()
+    }
+
+
+def build_report(recorder: Recorder, wall_s: float, operations: Dict[str, Dict[str, int]], users: int, speed: float) -> Dict[str, Any]:
+    per_type: Dict[str, List[float]] = {}
+    type_errors: Dict[str, int] = {}
+    per_user = {}
+    for user_id in sorted(recorder.samples):
+        per_user[user_id] = {}
+        for kind, samples in sorted(recorder.samples[user_id].items()):
+            errors = recorder.errors.get(user_id, {}).get(kind, 0)
+            per_type.setdefault(kind, []).extend(samples)
+            type_errors[kind] = type_errors.get(kind, 0) + errors
+            per_user[user_id][kind] = {
+                "count": len(samples),
+                "errors": errors,
+                "p50_ms": round(percentile(samples, 50), 1),
+                "p95_ms": round(percentile(samples, 95), 1),
+                "max_ms": round(max(samples), 1),
+            }
+    totals = {kind: summarize(samples, type_errors.get(kind, 0), wall_s) for kind, samples in sorted(per_type.items())}
+    requests = sum(len(samples) for samples in per_type.values())
+    return {
+        "totals": totals,
+        "capacity": {
+            "users": users,
+            "requests_per_s": round(requests / wall_s, 2) if wall_s > 0 else None,
+            # Load one real user generates; requests_per_s / this = users a replica sustains at these latencies
+            "requests_per_user_minute": round(requests / max(1, users) / (wall_s * speed / 60.0), 2) if wall_s > 0 else None,
+            "redis_ops_per_request": round(sum(operations.get("redis_op_seconds", {}).values()) / max(1, requests), 2),
+            "llm_calls_per_request": round(sum(operations.get("llm_call_seconds", {}).values()) / max(1, requests), 3),
+        },
+        "operations": {
+            "ocr_requests": operations.get("ocr_request_seconds", {}),
+            "backend_calls": operations.get("backend_call_seconds", {}),
+            "llm_calls": operations.get("llm_call_seconds", {}),
+            "redis_ops": operations.get("redis_op_seconds", {}),
+        },
+        "users": per_user,
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    backend = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120.0)
+    else:
+        backend = OfflineBackend({name: getattr(args, name) for name in DEFAULT_PROFILES}, seed=args.seed).start()
+        client = backend.client()
+
+    recorder = Recorder(args.save_trace, args.speed)
+    async with client:
+        before = operation_counts((await client.get("/metrics")).text)
+        outbound_before = backend.outbound_calls() if backend else None
+        started = time.perf_counter()
+        if args.replay:
+            await replay(client, recorder, args.replay, args.speed)
+            users = len(recorder.samples)
+        else:
+            deadline = started + args.duration / args.speed
+            rng = random.Random(args.seed)
+            lecture_users = set(rng.sample(range(args.users), int(round(args.users * args.lecture_fraction))))
+            await asyncio.gather(*(
+                simulated_user(client, recorder, f"sim-{i}", random.Random(args.seed * 1000 + i), deadline, args.speed,
+                               args.hint_interval, i in lecture_users, args.audio_chunk, args.change_rate)
+                for i in range(args.users)
+            ))
+            users = args.users
+        wall_s = time.perf_counter() - started
+        operations = diff_counts(operation_counts((await client.get("/metrics")).text), before)
+
+    report = {
+        "benchmark": "loadgen",
+        "mode": "replay" if args.replay else "synthetic",
+        "revision": git_revision(),
+        "target": args.url or "in-process (offline fakes)",
+        "config": {
+            "users": users,
+            "duration_s": args.duration,
+            "speed": args.speed,
+            "hint_interval_s": args.hint_interval,
+            "lecture_fraction": args.lecture_fraction,
+            "change_rate": args.change_rate,
+            "seed": args.seed,
+        },
+        "wall_s": round(wall_s, 3),
+        **build_report(recorder, wall_s, operations, users, args.speed),
+    }
+    if backend:
+        after = backend.outbound_calls()
+        report["outbound_calls"] = {name: after[name] - outbound_before[name] for name in after}
+        report["config"]["profiles"] = {name: profile.to_dict() for name, profile in backend.profiles.items()}
+        backend.stop()
+    trace_path = recorder.save_trace()
+    if trace_path:
+        report["saved_trace"] = trace_path
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replay", help="trace.jsonl to replay (default: synthetic users)")
+    parser.add_argument("--url", help="target a running server instead of the in-process app with offline fakes")
+    parser.add_argument("--users", default=10, type=int)
+    parser.add_argument("--duration", default=60.0, type=float, help="simulated seconds per user")
+    parser.add_argument("--speed", default=1.0, type=float, help="time compression (10 = ten times faster than real time)")
+    parser.add_argument("--hint-interval", default=45.0, type=float, help="mean seconds between hint requests per user")
+    parser.add_argument("--lecture-fraction", default=0.3, type=float, help="share of users also streaming lecture audio")
+    parser.add_argument("--audio-chunk", default=8.0, type=float, help="seconds of audio per lecture chunk")
+    parser.add_argument("--change-rate", default=0.15, type=float, help="chance a frame shows a newly written line")
+    parser.add_argument("--seed", default=0, type=int)
+    for name, spec in DEFAULT_PROFILES.items():
+        parser.add_argument(f"--{name}", default=spec, help=f"fault profile for the fake {name} (default: {spec})")
+    parser.add_argument("--save-trace", help="directory to write the sent events as a replayable trace")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
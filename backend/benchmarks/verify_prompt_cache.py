@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Checks that every Claude call site sends a cacheable prompt layout
+Runs OCR, jury aggregation, compression, lecture summary and hint calls twice against a local
+fake Anthropic server and verifies the request shape and cache hit metrics.
+
+Usage (from backend/):
+    python -m benchmarks.verify_prompt_cache
+"""
+
+import asyncio
+import base64
+import io
+import os
+import sys
+
+from benchmarks.fake_servers import FakeAnthropic, serve_in_thread
+
+
+def tiny_png() -> str:
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 16), color="white").save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+async def exercise_call_sites():
+    from ocr_models.claude_model import ClaudeModel
+    from ocr_models.jury_model import JuryModel
+    from thynk_functions import _compress_one, _compress_batch, lecture_context_compression, give_hint
+
+    image = tiny_png()
+    for _ in range(2):
+        await ClaudeModel().extract_text_from_image(image)
+        await JuryModel().extract_text_from_image(image)
+        await _compress_one("Solve for x: 2x + 5 = 13")
+        await _compress_batch(["2x + 5 = 13", "d/dx x^2 = 2x"])
+        await lecture_context_compression("Today we cover derivatives. The derivative of x squared is 2x.", "verify")
+        await give_hint("I am stuck on 2x + 5 = 13", "What do I do first?")
+
+
+def main():
+    fake = FakeAnthropic()
+    base_url, server = serve_in_thread(fake.app)
+
+    # Point every client at the fake before any backend module is imported
+    os.environ["ANTHROPIC_BASE_URL"] = base_url
+    os.environ["CLAUDE_KEY"] = "fake-key"
+    os.environ.pop("CEREBRAS_API_KEY", None)
+    os.environ.setdefault("UPSTASH_REDIS_REST_URL", "http://127.0.0.1:9")
+    os.environ.setdefault("UPSTASH_REDIS_REST_TOKEN", "fake-token")
+
+    asyncio.run(exercise_call_sites())
+    server.should_exit = True
+
+    from prompts import prompt_cache_stats
+
+    print("🧪 Prompt cache verification")
+    print(f"   requests sent to fake Anthropic: {len(fake.requests)}")
+    failed = False
+    for name, stats in sorted(prompt_cache_stats.snapshot().items()):
+        print(
+            f"   {name:<18} calls={stats['calls']} hit_rate={stats['cache_hit_rate']:.2f} "
+            f"cache_read={stats['cache_read_input_tokens']} cache_write={stats['cache_creation_input_tokens']}"
+        )
+        if stats["cache_hits"] == 0:
+            failed = True
+    for violation in sorted(set(fake.violations)):
+        print(f"   ❌ {violation}")
+        failed = True
+
+    print("   ✅ All prompts cacheable" if not failed else "   ❌ Prompt layout check failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# Created for Thynk: Always Ask Y
+# Server-driven capture cadence for streaming glasses clients
+
+import io
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from similarity import text_signature, signature_similarity
+
+
+def frame_hash(image_data: bytes) -> int:
+    """64-bit difference hash (dHash) of a frame; near-identical frames differ in few bits"""
+    image = Image.open(io.BytesIO(image_data))
+    if image.format == "JPEG":
+        image.draft("L", (64, 64))
+    pixels = np.asarray(image.convert("L").resize((9, 8)), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+class CaptureCadence:
+    """Per-user change-rate estimator that recommends the next capture interval.
+
+    Each analyzed frame reports how much changed since the previous one, from
+    the frame hash and, when OCR ran, the text signature. An EWMA of that
+    change drives the interval: steady pages back off towards max_interval_ms,
+    active writing stays near min_interval_ms. The EWMA rises faster than it
+    decays, so a page that starts changing is picked up within a frame or two.
+    """
+
+    def __init__(self, min_interval_ms: int = 1000, max_interval_ms: int = 15000, alpha: float = 0.3, max_users: int = 10000):
+        self.min_interval_ms = int(min_interval_ms)
+        self.max_interval_ms = max(self.min_interval_ms, int(max_interval_ms))
+        self.alpha = float(alpha)
+        self.max_users = max(1, int(max_users))
+        self._users: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def _state(self, user_id: str) -> Dict[str, Any]:
+        state = self._users.get(user_id)
+        if state is None:
+            # New users start as "changing" so the first frames come quickly
+            state = {"change_rate": 1.0, "frame_hash": None, "text_signature": None, "updated_at": time.time()}
+            self._users[user_id] = state
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        self._users.move_to_end(user_id)
+        return state
+
+    def observe(self, user_id: str, frame_digest: Optional[int] = None, text: Optional[str] = None) -> int:
+        """Record a frame (and its OCR text, if any) and return the recommended interval in ms"""
+        state = self._state(user_id)
+        changes = []
+
+        if frame_digest is not None:
+            if state["frame_hash"] is not None:
+                changes.append(bin(frame_digest ^ state["frame_hash"]).count("1") / 64.0)
+            state["frame_hash"] = frame_digest
+
+        if text is not None and text.strip():
+            signature = text_signature(text)
+            if state["text_signature"] is not None:
+                changes.append(1.0 - signature_similarity(state["text_signature"], signature))
+            state["text_signature"] = signature
+
+        if changes:
+            change = min(1.0, max(changes))
+            # React quickly when writing starts, back off gradually when the page goes still
+            alpha = max(self.alpha, 0.7) if change > state["change_rate"] else self.alpha
+            state["change_rate"] = alpha * change + (1.0 - alpha) * state["change_rate"]
+        state["updated_at"] = time.time()
+        return self.recommended_interval_ms(user_id)
+
+    def recommended_interval_ms(self, user_id: str) -> int:
+        """Interval the client should wait before the next capture"""
+        state = self._users.get(user_id)
+        if state is None:
+            return self.min_interval_ms
+        stillness = (1.0 - state["change_rate"]) ** 2
+        return int(self.min_interval_ms + (self.max_interval_ms - self.min_interval_ms) * stillness)
+
+    def change_rate(self, user_id: str) -> float:
+        state = self._users.get(user_id)
+        return state["change_rate"] if state else 1.0
+
+
+def create_capture_cadence() -> CaptureCadence:
+    """Build the estimator from THYNK_CAPTURE_* environment variables"""
+    return CaptureCadence(
+        min_interval_ms=int(os.getenv("THYNK_CAPTURE_MIN_INTERVAL_MS", "1000")),
+        max_interval_ms=int(os.getenv("THYNK_CAPTURE_MAX_INTERVAL_MS", "15000")),
+        alpha=float(os.getenv("THYNK_CAPTURE_EWMA_ALPHA", "0.3")),
+    )
@@ -0,0 +1,104 @@
+# Created for Thynk: Always Ask Y
+# Bounded, replica-consistent storage of is_different baselines
+
+import os
+import time
+import base64
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+
+from tracing import tracer
+
+
+class ChangeDetectionStore:
+    """Stores the last MinHash signature seen per user.
+
+    Without Redis, entries live in a bounded in-memory LRU. When a Redis
+    client is supplied, Redis holds the baseline as a compact base64
+    fingerprint and is the source of truth for every replica: the LRU is only
+    a read-through cache of what Redis returned or accepted. A missing Redis
+    entry means no baseline (the cached copy is dropped), and the cached copy
+    is only used while Redis is unreachable.
+    """
+
+    def __init__(self, max_users: int = 10000, ttl_seconds: int = 6 * 3600, redis=None):
+        self.max_users = max(1, int(max_users))
+        self.ttl_seconds = max(1, int(ttl_seconds))
+        self.redis = redis
+        self._entries: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+
+    @staticmethod
+    def encode(signature: np.ndarray) -> str:
+        """Pack a signature into a compact string fingerprint"""
+        return base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+    @staticmethod
+    def decode(fingerprint: str) -> np.ndarray:
+        """Unpack a fingerprint produced by encode"""
+        return np.frombuffer(base64.b64decode(fingerprint), dtype="<u4").astype(np.uint32)
+
+    def _get_local(self, user_id: str) -> Optional[np.ndarray]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        stored_at, signature = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return signature
+
+    def _set_local(self, user_id: str, signature: np.ndarray) -> None:
+        self._entries[user_id] = (time.time(), signature)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    async def get(self, user_id: str) -> Optional[np.ndarray]:
+        """Return the stored signature for a user, or None if there is no baseline"""
+        if self.redis is None:
+            return self._get_local(user_id)
+        try:
+            fingerprint = await self.redis.get_fingerprint(user_id)
+        except Exception:
+            # Redis unreachable: fall back to the last baseline it confirmed
+            return self._get_local(user_id)
+        if not fingerprint:
+            # Expired, cleared or never written: no replica has a baseline
+            self.forget(user_id)
+            return None
+        try:
+            signature = self.decode(fingerprint)
+        except Exception as e:
+            tracer.event("change_store.malformed_fingerprint", user_id=user_id, error=str(e))
+            self.forget(user_id)
+            return None
+        self._set_local(user_id, signature)
+        return signature
+
+    async def set(self, user_id: str, signature: np.ndarray) -> None:
+        """Record a new baseline signature for a user"""
+        if self.redis is None or await self.redis.store_fingerprint(user_id, self.encode(signature), self.ttl_seconds):
+            self._set_local(user_id, signature)
+        else:
+            # The write did not reach Redis, so this replica must not hold a baseline the others lack
+            self.forget(user_id)
+
+    def forget(self, user_id: str) -> None:
+        """Drop the local baseline so the user's next text counts as new"""
+        self._entries.pop(user_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def create_change_store(redis=None) -> ChangeDetectionStore:
+    """Build the store from THYNK_CHANGE_STATE_* environment variables"""
+    use_redis = os.getenv("THYNK_CHANGE_STATE_REDIS", "1").lower() not in ("0", "false", "no")
+    return ChangeDetectionStore(
+        max_users=int(os.getenv("THYNK_CHANGE_STATE_MAX_USERS", "10000")),
+        ttl_seconds=int(os.getenv("THYNK_CHANGE_STATE_TTL", str(6 * 3600))),
+        redis=redis if use_redis else None,
+    )
@@ -0,0 +1,122 @@
+# Created for Thynk: Always Ask Y
+# Micro-batching of context compression jobs
+
+import os
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from tracing import tracer
+
+# Compresses a batch of texts in one LLM call; None marks items that could not be parsed
+BatchCompressor = Callable[[List[str]], Awaitable[List[Optional[str]]]]
+# Compresses a single text; used for batches of one and per-item fallback
+SingleCompressor = Callable[[str], Awaitable[str]]
+
+
+class CompressionBatcher:
+    """Collects compression jobs for a short window and sends them as one request.
+
+    Jobs are grouped per user, or into one shared group when cross_user is
+    enabled. A group is flushed when it reaches max_batch_size or when its
+    oldest job has waited max_wait_ms. Each caller awaits its own future and
+    receives only its own summary.
+    """
+
+    def __init__(
+        self,
+        compress_batch: BatchCompressor,
+        compress_one: SingleCompressor,
+        max_batch_size: int = 8,
+        max_wait_ms: int = 250,
+        cross_user: bool = False,
+    ):
+        self._compress_batch = compress_batch
+        self._compress_one = compress_one
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, int(max_wait_ms)) / 1000.0
+        self.cross_user = cross_user
+        self._pending: Dict[str, List[Tuple[str, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        # The event loop only keeps weak references to tasks; hold running batches until they finish
+        self._batches: Set[asyncio.Task] = set()
+
+    def _group_key(self, user_id: str) -> str:
+        return "*" if self.cross_user else user_id
+
+    async def submit(self, text: str, user_id: str = "default") -> str:
+        """Queue text for compression and wait for its summary"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = self._group_key(user_id)
+        self._pending.setdefault(key, []).append((text, future))
+
+        if len(self._pending[key]) >= self.max_batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_after_wait(key))
+
+        return await future
+
+    async def _flush_after_wait(self, key: str) -> None:
+        await asyncio.sleep(self.max_wait)
+        self._timers.pop(key, None)
+        self._flush(key)
+
+    def _flush(self, key: str) -> None:
+        """Detach the pending group and run it in the background"""
+        timer = self._timers.pop(key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        batch = self._pending.pop(key, [])
+        if batch:
+            task = asyncio.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        texts = [text for text, _ in batch]
+        try:
+            if len(texts) == 1:
+                results: List[Optional[str]] = [await self._compress_one(texts[0])]
+            else:
+                try:
+                    results = await self._compress_batch(texts)
+                except Exception as e:
+                    # A failed batch call falls back per item, like an unparsable response
+                    tracer.event("compression.batch_failed", items=len(texts), error=str(e))
+                    results = []
+                if len(results) != len(texts):
+                    results = [None] * len(texts)
+
+            # Per-item fallback for anything the batch response did not cover
+            missing = [i for i, result in enumerate(results) if result is None]
+            if missing:
+                tracer.event("compression.batch_fallback", missing=len(missing), items=len(texts))
+                fallbacks = await asyncio.gather(
+                    *[self._compress_one(texts[i]) for i in missing], return_exceptions=True
+                )
+                for i, fallback in zip(missing, fallbacks):
+                    results[i] = fallback
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+
+def create_compression_batcher(compress_batch: BatchCompressor, compress_one: SingleCompressor) -> CompressionBatcher:
+    """Build a batcher from THYNK_COMPRESSION_* environment variables"""
+    return CompressionBatcher(
+        compress_batch,
+        compress_one,
+        max_batch_size=int(os.getenv("THYNK_COMPRESSION_BATCH_SIZE", "8")),
+        max_wait_ms=int(os.getenv("THYNK_COMPRESSION_MAX_WAIT_MS", "250")),
+        cross_user=os.getenv("THYNK_COMPRESSION_CROSS_USER", "0").lower() in ("1", "true", "yes"),
+    )
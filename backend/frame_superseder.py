@@ -0,0 +1,93 @@
+# Created for Thynk: Always Ask Y
+# Latest-wins superseding of in-flight frames per user
+
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from metrics import metrics
+from tracing import tracer
+
+
+class FrameSuperseded(Exception):
+    """Raised for a frame whose OCR was cancelled because a newer frame arrived"""
+
+
+class FrameTicket:
+    """One frame's place in its user's sequence"""
+
+    __slots__ = ("user_id", "task", "done", "superseded")
+
+    def __init__(self, user_id: Optional[str]):
+        self.user_id = user_id
+        self.task: Optional[asyncio.Task] = None
+        self.done = False
+        self.superseded = False
+
+
+class FrameSuperseder:
+    """Latest-wins handling of frames from one user.
+
+    Streaming clients send a new frame while the previous one can still be in
+    OCR (a jury round takes seconds). Once a newer frame starts, the older
+    one's result is outdated. Mode "cancel" cancels the older frame's OCR, so no
+    more LLM calls are made for it; "demote" lets it finish and returns its text,
+    but only the newest frame's result is stored; "off" keeps every frame.
+    Frames are grouped by stream key (an identified user, or one connection);
+    frames without a key are never superseded, since they may come from
+    different people.
+    """
+
+    MODES = ("cancel", "demote", "off")
+
+    def __init__(self, mode: str = "cancel", max_users: int = 10000):
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported frame supersede mode: {mode}. Allowed: {list(self.MODES)}")
+        self.mode = mode
+        self.max_users = max(1, int(max_users))
+        self._latest: "OrderedDict[str, FrameTicket]" = OrderedDict()
+
+    def begin(self, user_id: Optional[str]) -> FrameTicket:
+        """Register a new frame for user_id, superseding the one still in flight"""
+        ticket = FrameTicket(user_id)
+        if self.mode == "off" or not user_id:
+            return ticket
+        previous = self._latest.pop(user_id, None)
+        self._latest[user_id] = ticket
+        while len(self._latest) > self.max_users:
+            self._latest.popitem(last=False)
+        if previous is not None and not previous.done:
+            previous.superseded = True
+            metrics.inc("frames_superseded_total", mode=self.mode)
+            tracer.event("frame.superseded", user_id=user_id, mode=self.mode)
+            if self.mode == "cancel" and previous.task is not None:
+                previous.task.cancel()
+        return ticket
+
+    async def run(self, ticket: FrameTicket, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await call() for this frame; raises FrameSuperseded if a newer frame cancelled it"""
+        if ticket.superseded and self.mode == "cancel":
+            ticket.done = True
+            raise FrameSuperseded()
+        ticket.task = asyncio.ensure_future(call())
+        try:
+            return await ticket.task
+        except asyncio.CancelledError:
+            current = asyncio.current_task()
+            # Only our own cancellation of the OCR task becomes FrameSuperseded;
+            # the request itself being cancelled still propagates
+            if ticket.superseded and ticket.task.cancelled() and not (current and current.cancelling()):
+                raise FrameSuperseded() from None
+            raise
+        finally:
+            ticket.done = True
+
+    def is_latest(self, ticket: FrameTicket) -> bool:
+        """Whether this frame's result should be stored"""
+        return not ticket.superseded
+
+
+def create_frame_superseder() -> FrameSuperseder:
+    """Build the superseder from THYNK_FRAME_SUPERSEDE (cancel, demote or off)"""
+    return FrameSuperseder(mode=os.getenv("THYNK_FRAME_SUPERSEDE", "cancel").strip().lower())
@@ -0,0 +1,113 @@
+# Created for Thynk: Always Ask Y
+# Per-session rolling lecture summaries with overlap-aware deduplication
+
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from similarity import normalize_text
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a transcript into sentences on terminal punctuation"""
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text.strip()) if sentence.strip()]
+
+
+def _words(sentence: str) -> List[str]:
+    return _WORD_RE.findall(normalize_text(sentence))
+
+
+def _containment(words: List[str], seen: set) -> float:
+    """Fraction of a sentence's words already present in an earlier sentence"""
+    if not words:
+        return 1.0
+    return sum(1 for word in words if word in seen) / len(words)
+
+
+def novel_sentences(text: str, recent: List[str], threshold: float = 0.8) -> Tuple[List[str], int]:
+    """
+    Drop sentences already covered by the recent tail of the session.
+
+    Consecutive audio chunks overlap at their boundaries and lecturers repeat
+    themselves, so a new sentence counts as a duplicate when most of its words
+    appear in one recent sentence. Containment rather than equality also catches
+    fragments cut off at a chunk boundary.
+
+    Returns:
+        (novel sentences in order, number of duplicates dropped)
+    """
+    seen = [set(_words(sentence)) for sentence in recent]
+    novel: List[str] = []
+    duplicates = 0
+    for sentence in split_sentences(text):
+        words = _words(sentence)
+        if any(_containment(words, previous) >= threshold for previous in seen):
+            duplicates += 1
+            continue
+        novel.append(sentence)
+        seen.append(set(words))
+    return novel, duplicates
+
+
+class RollingLectureSummary:
+    """Bounded running summary of one lecture session.
+
+    Holds the current summary and a short tail of recent transcript sentences
+    used for deduplication. Both are bounded, so the stored entry stays the
+    same size however long the lecture runs.
+    """
+
+    def __init__(self, max_chars: int = 1500, tail_sentences: int = 40, dedup_threshold: float = 0.8):
+        self.max_chars = int(max_chars)
+        self.tail_sentences = int(tail_sentences)
+        self.dedup_threshold = float(dedup_threshold)
+
+    def empty_state(self, session_id: str) -> Dict[str, Any]:
+        return {"session_id": session_id, "summary": "", "tail": [], "chunks": 0, "transcript_chars": 0}
+
+    def prepare(self, state: Dict[str, Any], transcript: str) -> Tuple[List[str], int]:
+        """Deduplicate a new chunk against the session tail"""
+        return novel_sentences(transcript, state.get("tail", []), self.dedup_threshold)
+
+    def bound(self, summary: str) -> str:
+        """Clip a summary to max_chars, cutting at a sentence boundary where possible"""
+        summary = summary.strip()
+        if len(summary) <= self.max_chars:
+            return summary
+        clipped = summary[: self.max_chars]
+        cut = max(clipped.rfind(". "), clipped.rfind(".\n"))
+        return clipped[: cut + 1] if cut > self.max_chars // 2 else clipped
+
+    def fallback_summary(self, state: Dict[str, Any], novel: List[str]) -> str:
+        """Summary used when the LLM update fails: append and keep the most recent text"""
+        combined = " ".join([state.get("summary", "")] + novel).strip()
+        if len(combined) <= self.max_chars:
+            return combined
+        tail = combined[-self.max_chars:]
+        start = tail.find(". ")
+        return tail[start + 2:] if 0 <= start < self.max_chars // 2 else tail
+
+    def apply(self, state: Dict[str, Any], transcript: str, novel: List[str], summary: str) -> Dict[str, Any]:
+        """New session state after a chunk has been folded into the summary"""
+        tail = (state.get("tail", []) + novel)[-self.tail_sentences:]
+        return {
+            "session_id": state.get("session_id"),
+            "summary": self.bound(summary),
+            "tail": tail,
+            "chunks": state.get("chunks", 0) + 1,
+            "transcript_chars": state.get("transcript_chars", 0) + len(transcript),
+            "timestamp": time.time(),
+        }
+
+
+def create_lecture_summarizer() -> RollingLectureSummary:
+    """Build the summarizer from THYNK_LECTURE_* environment variables"""
+    return RollingLectureSummary(
+        max_chars=int(os.getenv("THYNK_LECTURE_SUMMARY_MAX_CHARS", "1500")),
+        tail_sentences=int(os.getenv("THYNK_LECTURE_TAIL_SENTENCES", "40")),
+        dedup_threshold=float(os.getenv("THYNK_LECTURE_DEDUP_THRESHOLD", "0.8")),
+    )
@@ -5,40 +5,44 @@
 import os
 import json
 import time
+import asyncio
 import base64
 import io
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from typing import Dict, Any, List, Optional
 
-import modal
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import Response, JSONResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
 from dotenv import load_dotenv
 from pydantic import BaseModel
-from PIL import Image
-import numpy as np
 from ocr_models.ocr_factory import OCRFactory
 from ocr_models.base_ocr import SimpleOCRResponse
-from redis_client import ThynkRedisClient
+from prompts import prompt_cache_stats
+from resilience import resilience
+from provider_scheduler import scheduler
+from admission import create_admission_controller
+from metrics import metrics
+from tracing import tracer
+from ocr_models.quality_gate import create_quality_gate
+from ocr_models.backend_selector import create_backend_selector
+from capture_cadence import create_capture_cadence, frame_hash
+from audio_vad import create_segmented_transcriber
+from session_channel import create_session_state, frame_digest, parse_binary_frame, parse_text_message
 
 
 # Import Thynk system components
-from .thynk_functions import (
-    is_different, 
-    context_compression, 
-    get_context, 
-    give_hint,
-    lecture_context_compression
-)
-from .redis_client import redis_client
-from .audio_transcription import audio_transcriber
-from thynk_functions import is_different, context_compression, get_context, give_hint
+from thynk_functions import is_different, context_compression, get_context, give_hint, lecture_context_compression, get_anthropic_client, change_store
 from redis_client import redis_client
+from warmup import create_warmup
+from single_flight import content_digest, create_single_flight
+from frame_superseder import FrameSuperseded, create_frame_superseder
 
 EASYOCR_AVAILABLE = False
 
-# Modal imports (only if Modal is available)
+# Modal imports (only if Modal is available; only needed to deploy, not to serve)
 try:
     import modal
     MODAL_AVAILABLE = True
@@ -47,9 +51,19 @@ except ImportError:
 
 load_dotenv()
 
+# Startup warmup (models, clients, one throwaway inference); /ready gates on it
+warmup = create_warmup()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup: run the warmup in the background so /health answers at once and /ready flips when it is done"""
+    task = asyncio.create_task(run_warmup())
+    yield
+    task.cancel()
+
 # Create FastAPI app
-fastapi_app = FastAPI(title="Rizzoids Backend", version="1.0.0")
-thynk_client = ThynkRedisClient()
+fastapi_app = FastAPI(title="Rizzoids Backend", version="1.0.0", lifespan=lifespan)
+thynk_client = redis_client
 
 # CORS configuration to allow frontend to call backend (handles OPTIONS preflight)
 fastapi_app.add_middleware(
@@ -70,6 +84,18 @@ fastapi_app.add_middleware(
     allow_headers=["*"],
 )
 
+# Every request gets a root span; X-Request-ID is honoured if sent and always echoed
+@fastapi_app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with tracer.request(f"{request.method} {request.url.path}", request_id=request.headers.get("x-request-id"),
+                        method=request.method, path=request.url.path) as span:
+        response = await call_next(request)
+        span.set(status_code=response.status_code)
+    request_id = getattr(span, "request_id", None)
+    if request_id:
+        response.headers["X-Request-ID"] = request_id
+    return response
+
 # Generic OPTIONS handler to ensure preflight never 400s even if headers are missing
 @fastapi_app.options("/{rest_of_path:path}")
 async def preflight_handler():
@@ -81,20 +107,6 @@ async def preflight_handler():
     }
     return Response(status_code=200, headers=headers)
 
-# --- Modal Setup ---
-app = modal.App("rizzoids-backend")
-image = modal.Image.debian_slim(python_version="3.12").pip_install(
-    "fastapi==0.104.1",
-    "uvicorn[standard]==0.24.0",
-    "python-dotenv==1.0.0",
-    "modal==0.64.0",
-    "easyocr==1.7.0",
-    "pillow==10.1.0",
-    "pydantic==2.5.0",
-    "anthropic==0.25.0",
-    "redis==5.0.1",
-    "upstash-redis==0.15.0",
-)
 
 @fastapi_app.get("/")
 async def root():
@@ -104,9 +116,24 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "rizzoids-backend"}
 
+@fastapi_app.get("/ready")
+async def readiness_check():
+    """Readiness: 503 until the startup warmup has finished (liveness stays on /health)"""
+    snapshot = warmup.snapshot()
+    if not snapshot["ready"]:
+        return JSONResponse(status_code=503, content={"status": "warming", **snapshot})
+    return {"status": "ready", **snapshot}
+
 # Pydantic models
 class OCRRequest(BaseModel):
     image_base64: str
+    user_id: Optional[str] = "default"
+
+class AnalyzePhotoResponse(SimpleOCRResponse):
+    """OCR result plus the capture interval the streaming client should wait"""
+    next_capture_ms: Optional[int] = None
+    # A newer frame from the same user arrived first; this result was not stored
+    superseded: bool = False
 
 class OCRResponse(BaseModel):
     text: str
@@ -116,116 +143,349 @@ class OCRResponse(BaseModel):
 # Thynk system models
 class ThynkContextRequest(BaseModel):
     text: str
+    user_id: Optional[str] = "default"
 
 class HintRequest(BaseModel):
     learned: str
     question: Optional[str] = ""
+    user_id: Optional[str] = "default"
 
 class ContextStatusResponse(BaseModel):
     status: str
     total_entries: int
     context_preview: str
 
-# Initialize EasyOCR reader (lazy loading)
-_ocr_reader = None
+# Lecture mode models
+class AudioRequest(BaseModel):
+    audio_base64: str
+    session_id: Optional[str] = None
+    user_id: Optional[str] = "default"
+
+class AudioResponse(BaseModel):
+    success: bool
+    transcript: Optional[str] = ""
+    compressed_content: Optional[str] = None
+    session_id: Optional[str] = None
+    compression_stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+# Frame quality gate for /analyze-photo
+QUALITY_GATE_ENABLED = os.getenv("THYNK_QUALITY_GATE", "1").lower() not in ("0", "false", "no")
+quality_gate = create_quality_gate()
+
+# Per-user change-rate estimator that paces streaming captures
+capture_cadence = create_capture_cadence()
+
+# Per-endpoint admission: photos degrade to a cheaper OCR backend, then shed with 503,
+# before hints are ever rejected
+admission_control = create_admission_controller()
+DEGRADED_OCR_BACKEND = os.getenv("THYNK_ADMIT_DEGRADED_OCR", "claude").strip().lower()
+
+def _overloaded(admission, **extra) -> JSONResponse:
+    """503 with Retry-After and the expected wait for a shed request"""
+    return JSONResponse(status_code=503, content={**admission.to_dict(), **extra},
+                        headers={"Retry-After": str(admission.retry_after_s)})
+
+# Latest-wins handling of frames from the same user (THYNK_FRAME_SUPERSEDE)
+frame_superseder = create_frame_superseder()
+
+# Voice-activity gate in front of the lecture transcriber (Whisper is attached on first use)
+segmented_transcriber = create_segmented_transcriber(None)
+_audio_transcriber_checked = False
+
+def get_audio_transcriber():
+    """Get or import the Whisper transcriber (lazy loading); None when it is not installed"""
+    global _audio_transcriber_checked
+    if segmented_transcriber.transcriber is None and not _audio_transcriber_checked:
+        _audio_transcriber_checked = True
+        try:
+            from audio_transcription import audio_transcriber
+            segmented_transcriber.transcriber = audio_transcriber
+        except ImportError:
+            pass
+    return segmented_transcriber.transcriber
 
 @fastapi_app.get("/ocr/models")
 async def get_available_ocr_models():
     """Get list of available OCR models"""
     available_models = OCRFactory.get_available_models()
-    return {"available_models": available_models}
-
-# Initialize OCR model using factory
-_ocr_model = None
-
-def get_ocr_model():
-    """Get or initialize OCR model (lazy loading)"""
-    global _ocr_model
-    if _ocr_model is None:
-        # Get available models and use the first available one
+    return {"available_models": available_models, "selector": get_backend_selector().snapshot()}
+
+# OCR model instances by backend name, created and loaded on first use (or at warmup)
+_ocr_models: Dict[str, Any] = {}
+_ocr_loads: Dict[str, asyncio.Task] = {}
+_available_models: List[str] = []
+_backend_selector = None
+
+def get_backend_selector():
+    """Get or initialize the adaptive OCR backend selector (lazy loading)"""
+    global _backend_selector
+    if _backend_selector is None:
         available_models = OCRFactory.get_available_models()
+        _available_models[:] = available_models
         if not available_models:
             raise HTTPException(
                 status_code=500,
                 detail="No OCR models are available. Please check your environment configuration."
             )
-        
-        # Prefer Claude, then EasyOCR, then Google Vision
-        preferred_order = ["jury","claude", "easyocr", "google_vision"]
-        selected_model = None
-        
-        for preferred in preferred_order:
-            if preferred in available_models:
-                selected_model = preferred
-                break
-        
-        # Fallback to first available if none of the preferred models are available
-        if selected_model is None:
-            selected_model = available_models[0]
-        
-        print(f"Using OCR model: {selected_model}")
-        _ocr_model = OCRFactory.create_ocr_model(selected_model)
-    return _ocr_model
+        _backend_selector = create_backend_selector(available_models, is_open=resilience.is_open)
+        tracer.event("ocr.backend_candidates", candidates=",".join(_backend_selector.candidates))
+    return _backend_selector
+
+async def _load_ocr_model(name: str):
+    with tracer.span("ocr.load", backend=name), metrics.timer("ocr_model_load_seconds", backend=name):
+        ocr_model = await asyncio.to_thread(OCRFactory.create_ocr_model, name)
+        await ocr_model.load()
+    _ocr_models[name] = ocr_model
+    return ocr_model
+
+def _forget_ocr_load(name: str, task: asyncio.Task) -> None:
+    # Drop the in-flight entry so a failed load is retried by the next caller
+    _ocr_loads.pop(name, None)
+    if not task.cancelled():
+        task.exception()
+
+async def load_ocr_model(name: str):
+    """Create and load an OCR backend once; concurrent first callers all await the same load"""
+    if name in _ocr_models:
+        return _ocr_models[name]
+    task = _ocr_loads.get(name)
+    if task is None:
+        task = asyncio.ensure_future(_load_ocr_model(name))
+        _ocr_loads[name] = task
+        task.add_done_callback(lambda done, name=name: _forget_ocr_load(name, done))
+    # Shielded so one caller giving up does not cancel the load for the others
+    return await asyncio.shield(task)
+
+async def get_ocr_model(model: Optional[str] = None, user_id: Optional[str] = None):
+    """
+    Pick an OCR backend for this request and return (name, model).
+    
+    A pinned model is used as is; otherwise the selector picks the fastest
+    backend that is healthy and within the latency SLO.
+    """
+    selector = get_backend_selector()
+    if model:
+        name = model.lower()
+        if name not in _available_models:
+            raise HTTPException(status_code=400, detail=f"OCR model '{model}' is not available")
+    else:
+        name = selector.choose(user_id)
+    return name, await load_ocr_model(name)
+
+def _warmup_pipeline() -> None:
+    """Run the frame pipeline once on a synthetic frame (first-call import and allocation costs)"""
+    from ocr_models.base_ocr import warmup_image_base64
+    from ocr_models.preprocess import preprocess_image, get_profile
+
+    image_data = base64.b64decode(warmup_image_base64())
+    quality_gate.assess(image_data)
+    frame_hash(image_data)
+    preprocess_image(image_data, get_profile("claude"))
+
+async def _warmup_redis() -> None:
+    # Build the client off the event loop (SDK import), then open its connection
+    client = await asyncio.to_thread(lambda: redis_client.client)
+    await client.ping()
+
+async def _warmup_ocr(name: str) -> None:
+    ocr_model = await load_ocr_model(name)
+    if warmup.runs_inference(ocr_model.local):
+        await ocr_model.warmup()
+
+async def run_warmup() -> None:
+    """Register the warmup steps for this configuration and run them"""
+    if warmup.enabled:
+        warmup.add("pipeline", lambda: asyncio.to_thread(_warmup_pipeline))
+        warmup.add("redis", _warmup_redis)
+        warmup.add("llm_client", lambda: asyncio.to_thread(get_anthropic_client))
+        warmup.add("transcriber", lambda: asyncio.to_thread(get_audio_transcriber))
+        backends = warmup.backends
+        if backends is None:
+            try:
+                backends = list(get_backend_selector().candidates)
+            except HTTPException:
+                backends = []
+        for name in backends:
+            warmup.add(f"ocr:{name}", lambda name=name: _warmup_ocr(name))
+    await warmup.run()
+
+# Concurrent identical requests share one call: OCR by image digest and model, hints
+# by user, context version and question (client retries, several consumers per frame)
+ocr_flight = create_single_flight("ocr")
+hint_flight = create_single_flight("hint")
+
+async def _run_ocr(image_base64: str, model: Optional[str] = None, user_id: Optional[str] = None) -> SimpleOCRResponse:
+    """Run OCR, joining an identical call (same image, same model or automatic choice) already in flight"""
+    digest = await asyncio.to_thread(content_digest, image_base64)
+    return await ocr_flight.run((digest, (model or "").lower()), lambda: _run_ocr_call(image_base64, model, user_id))
+
+async def _run_ocr_call(image_base64: str, model: Optional[str] = None, user_id: Optional[str] = None) -> SimpleOCRResponse:
+    """Run OCR on the selected backend and feed the outcome back to the selector"""
+    name, ocr_model = await get_ocr_model(model, user_id)
+    started = time.perf_counter()
+    try:
+        with tracer.span("ocr", backend=name, pinned=bool(model)) as span:
+            result = await ocr_model.extract_text_from_image(image_base64)
+            span.set(success=result.success, chars=len(result.full_text or ""))
+    except Exception:
+        elapsed = time.perf_counter() - started
+        get_backend_selector().record(name, elapsed * 1000, ok=False)
+        metrics.observe("ocr_request_seconds", elapsed, backend=name, outcome="error")
+        raise
+    elapsed = time.perf_counter() - started
+    get_backend_selector().record(name, elapsed * 1000, ok=result.success)
+    metrics.observe("ocr_request_seconds", elapsed, backend=name, outcome="ok" if result.success else "error")
+    return result
 
 # OCR endpoints
 @fastapi_app.post("/ocr", response_model=SimpleOCRResponse)
-async def perform_ocr(request: OCRRequest):
-    """Extract text from image using OCR"""
+async def perform_ocr(request: OCRRequest, model: Optional[str] = None):
+    """Extract text from image using OCR (pin a backend with ?model=)"""
+    admission = admission_control.admit("photo")
+    if admission.shed:
+        return _overloaded(admission)
     try:
-        ocr_model = get_ocr_model()
-        return await ocr_model.extract_text_from_image(request.image_base64)
+        with admission:
+            return await _run_ocr(request.image_base64, _photo_model(admission, model), request.user_id)
     except HTTPException as he:
-        import traceback
-        print("/ocr endpoint HTTPException:", he.detail)
-        print(traceback.format_exc())
+        tracer.record_exception(he)
         raise he
     except Exception as e:
-        import traceback
-        print("/ocr endpoint error:", e)
-        print(traceback.format_exc())
+        tracer.record_exception(e)
         # Re-raise as HTTPException to ensure proper JSON response
         raise HTTPException(status_code=500, detail=str(e))
 
-@fastapi_app.post("/analyze-photo", response_model=SimpleOCRResponse)
-async def analyze_photo(request: OCRRequest):
-    """Analyze photo from Mentra glasses and extract text using OCR"""
-    print("Analyzing photo...")
+async def _gate_frame(image_data: bytes) -> Optional[Dict[str, Any]]:
+    """Run the frame quality gate; returns the rejection body, or None if the frame is usable"""
+    if not QUALITY_GATE_ENABLED:
+        return None
+    with tracer.span("quality_gate") as span:
+        quality = await asyncio.to_thread(quality_gate.assess, image_data)
+        span.set(usable=quality.usable, reason=quality.reason, sharpness=round(quality.sharpness, 1))
+    if quality.usable:
+        metrics.inc("frames_accepted_total")
+        return None
+    metrics.inc("frames_rejected_total", reason=quality.reason)
+    return {
+        "success": False,
+        "full_text": "",
+        "error": "frame_rejected",
+        **quality.to_dict(),
+        # Likely head motion; ask for a retake soon
+        "next_capture_ms": capture_cadence.min_interval_ms,
+    }
+
+def _photo_model(admission, model: Optional[str]) -> Optional[str]:
+    """OCR backend for an admitted photo: the pinned one, or the cheaper backend when degraded"""
+    if model or not admission.degraded:
+        return model
+    get_backend_selector()
+    if DEGRADED_OCR_BACKEND not in _available_models:
+        return None
+    metrics.inc("ocr_degraded_total", backend=DEGRADED_OCR_BACKEND)
+    return DEGRADED_OCR_BACKEND
+
+def _frame_stream(user_id: Optional[str]) -> Optional[str]:
+    """Supersession key for an identified user; None for the shared "default" user,
+    whose frames may come from different people"""
+    return user_id if user_id and user_id != "default" else None
+
+async def _ocr_frame(image_base64: str, user_id: str, digest: int, model: Optional[str] = None, stream: Optional[str] = None) -> AnalyzePhotoResponse:
+    """OCR a frame that passed the gate, store its text and update the capture cadence.
+
+    Only the stream's newest frame is stored: an older frame still in OCR is
+    cancelled or demoted when a newer one starts (see FrameSuperseder).
+    Frames without a stream key are never superseded.
+    """
+    ticket = frame_superseder.begin(stream)
+    try:
+        result = await frame_superseder.run(ticket, lambda: _run_ocr(image_base64, model, user_id))
+    except FrameSuperseded:
+        return AnalyzePhotoResponse(full_text="", success=False, superseded=True,
+                                    next_capture_ms=capture_cadence.recommended_interval_ms(user_id))
+    if not frame_superseder.is_latest(ticket):
+        # Demoted: the caller gets the text, but the newer frame's result is the one kept
+        metrics.inc("frames_demoted_total")
+        return AnalyzePhotoResponse(full_text=result.full_text, success=result.success, superseded=True,
+                                    next_capture_ms=capture_cadence.recommended_interval_ms(user_id))
+    if result.success:
+        text = result.full_text
+        await thynk_client.store_context(text, user_id)
+
+    # Feed frame and text change into the per-user cadence estimator
+    next_capture_ms = capture_cadence.observe(user_id, digest, result.full_text if result.success else None)
+    return AnalyzePhotoResponse(
+        full_text=result.full_text,
+        success=result.success,
+        next_capture_ms=next_capture_ms,
+    )
+
+@fastapi_app.post("/analyze-photo", response_model=AnalyzePhotoResponse)
+async def analyze_photo(request: OCRRequest, model: Optional[str] = None):
+    """Analyze photo from Mentra glasses and extract text using OCR (pin a backend with ?model=)"""
+    user_id = request.user_id or "default"
+    tracer.current().set(user_id=user_id)
+    admission = admission_control.admit("photo")
+    if admission.shed:
+        # Back off the capture stream for at least the expected wait
+        return _overloaded(admission, success=False, full_text="",
+                           next_capture_ms=max(capture_cadence.recommended_interval_ms(user_id), admission.retry_after_s * 1000))
     try:
-        ocr_model = get_ocr_model()
-        result = await ocr_model.extract_text_from_image(request.image_base64)
-        if result.success:
-            text = result.full_text
-            await thynk_client.store_context(text)
-        return result
+        with admission:
+            with tracer.span("decode"), metrics.timer("image_decode_seconds", site="analyze_photo"):
+                image_data = base64.b64decode(request.image_base64)
+
+            # Drop blurred or badly exposed frames before paying for any OCR call.
+            # A rejection is a normal answer (200, success false), not a 422 that
+            # clients would confuse with a request validation error
+            rejection = await _gate_frame(image_data)
+            if rejection:
+                return JSONResponse(content=rejection)
+
+            with tracer.span("frame_hash"):
+                digest = await asyncio.to_thread(frame_hash, image_data)
+            result = await _ocr_frame(request.image_base64, user_id, digest, _photo_model(admission, model), _frame_stream(request.user_id))
+            if admission.degraded:
+                result.next_capture_ms = max(result.next_capture_ms or 0, admission.retry_after_s * 1000)
+            return result
     except HTTPException as he:
-        import traceback
-        print("/analyze-photo endpoint HTTPException:", he.detail)
-        print(traceback.format_exc())
+        tracer.record_exception(he)
         raise he
     except Exception as e:
-        import traceback
-        print("/analyze-photo endpoint error:", e)
-        print(traceback.format_exc())
+        tracer.record_exception(e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@fastapi_app.post("/process-audio", response_model=AudioResponse)
-async def process_audio(request: AudioRequest):
-    """
-    Process audio input for lecture mode - transcribe and compress content
-    """
+@fastapi_app.get("/capture-interval")
+async def capture_interval(user_id: str = "default"):
+    """Recommended interval before the next capture for a streaming client"""
+    return {
+        "user_id": user_id,
+        "next_capture_ms": capture_cadence.recommended_interval_ms(user_id),
+        "change_rate": round(capture_cadence.change_rate(user_id), 3),
+    }
+
+async def _process_audio_chunk(audio_base64: str, session_id: Optional[str] = None, user_id: str = "default") -> Dict[str, Any]:
+    """Transcribe a lecture audio chunk and fold it into the session summary"""
+    if await asyncio.to_thread(get_audio_transcriber) is None:
+        return {"success": False, "error": "Audio transcription is not available", "transcript": "", "session_id": session_id}
     try:
-        # Transcribe audio using Whisper
-        transcription_result = audio_transcriber.transcribe_base64_audio(request.audio_base64)
+        # Transcribe only the voiced segments using Whisper, in the bounded worker pool
+        transcription_result = await segmented_transcriber.transcribe_base64_audio(audio_base64)
         
         if not transcription_result["success"]:
             return {
                 "success": False,
                 "error": f"Transcription failed: {transcription_result.get('error', 'Unknown error')}",
                 "transcript": "",
-                "session_id": request.session_id
+                "session_id": session_id
             }
         
         transcript = transcription_result["text"]
+        if "segments" in transcription_result:
+            metrics.inc("audio_seconds_total", transcription_result["total_seconds"])
+            metrics.inc("audio_voiced_seconds_total", transcription_result["voiced_seconds"])
+            metrics.inc("audio_segments_total", transcription_result["segments"])
         
         # Skip processing if transcript is too short or empty
         if len(transcript.strip()) < 10:
@@ -233,23 +493,16 @@ async def process_audio(request: AudioRequest):
                 "success": True,
                 "transcript": transcript,
                 "compressed_content": "Audio too short to process",
-                "session_id": request.session_id,
+                "session_id": session_id,
                 "compression_stats": {
                     "original_length": len(transcript),
                     "compressed_length": 0
                 }
             }
         
-        # Store transcription in Redis as lecture content with confidence
-        await redis_client.store_lecture_transcription(
-            transcript,
-            user_id="default",
-            confidence=transcription_result.get('confidence', 0.8)
-        )
-        
-        # Use lecture-specific context compression with session ID
-        session_id = request.session_id or "default"
-        compression_result = await lecture_context_compression(transcript, session_id)
+        # Fold the transcript into the session's rolling lecture summary
+        session_id = session_id or "default"
+        compression_result = await lecture_context_compression(transcript, session_id, user_id)
         
         if compression_result["success"]:
             return {
@@ -259,7 +512,10 @@ async def process_audio(request: AudioRequest):
                 "session_id": session_id,
                 "compression_stats": {
                     "original_length": compression_result["original_length"],
-                    "compressed_length": compression_result["compressed_length"]
+                    "compressed_length": compression_result["compressed_length"],
+                    "new_sentences": compression_result["new_sentences"],
+                    "duplicate_sentences": compression_result["duplicate_sentences"],
+                    "chunks": compression_result["chunks"]
                 }
             }
         else:
@@ -276,11 +532,18 @@ async def process_audio(request: AudioRequest):
             "error": f"Audio processing failed: {str(e)}"
         }
 
+@fastapi_app.post("/process-audio", response_model=AudioResponse)
+async def process_audio(request: AudioRequest):
+    """
+    Process audio input for lecture mode - transcribe and compress content
+    """
+    return await _process_audio_chunk(request.audio_base64, request.session_id, request.user_id or "default")
+
 @fastapi_app.get("/context_status")
-async def context_status():
+async def context_status(user_id: str = "default"):
     """Debug endpoint to check stored context"""
     try:
-        context_data = await get_context()
+        context_data = await get_context(user_id)
         return {
             "status": "success", 
             "total_entries": context_data["entries"], 
@@ -289,16 +552,41 @@ async def context_status():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+@fastapi_app.get("/backends")
+async def backends_status():
+    """Debug endpoint with circuit breaker state and latency percentiles per backend"""
+    return {"status": "success", "backends": resilience.snapshot(), "providers": scheduler.snapshot(),
+            "admission": admission_control.snapshot()}
+
+@fastapi_app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Counters and per-stage latency histograms in Prometheus text format"""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@fastapi_app.get("/prompt-cache")
+async def prompt_cache_status():
+    """Debug endpoint with prompt cache usage per prompt, taken from Claude response usage"""
+    return {"status": "success", "prompts": prompt_cache_stats.snapshot()}
+
 # Thynk System Endpoints
 
+async def _give_hint(learned: str, question: Optional[str], user_id: str) -> str:
+    """Generate a hint, joining an identical one in flight for the same user and context"""
+    key = (user_id, redis_client.context_version(user_id), learned or "", question or "")
+    return await hint_flight.run(key, lambda: give_hint(learned, question, user_id))
+
 @fastapi_app.post("/give-hint")
 async def give_hint_endpoint(request: HintRequest):
     """
     Generate a helpful hint based on learned context.
     This is the main endpoint for the frontend 'get hint' button.
     """
+    admission = admission_control.admit("hint")
+    if admission.shed:
+        return _overloaded(admission, hint="💡 **Hint:** Keep working through the problem step by step!", status="overloaded")
     try:
-        hint_text = await give_hint(request.learned, request.question)
+        with admission:
+            hint_text = await _give_hint(request.learned, request.question, request.user_id or "default")
         return {"hint": hint_text, "status": "success"}
     except Exception as e:
         return {"hint": "💡 **Hint:** Keep working through the problem step by step!", "status": "error", "message": str(e)}
@@ -310,18 +598,18 @@ async def context_compression_endpoint(request: ThynkContextRequest):
     """
     try:
         content_data = {"text": request.text}
-        await context_compression(content_data)
+        await context_compression(content_data, request.user_id or "default")
         return {"status": "success", "message": "Context processed and stored"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 @fastapi_app.get("/get-context")
-async def get_context_endpoint():
+async def get_context_endpoint(user_id: str = "default"):
     """
     Retrieve current learning context
     """
     try:
-        context_data = await get_context()
+        context_data = await get_context(user_id)
         return {
             "status": "success",
             "entries": context_data["entries"],
@@ -337,7 +625,7 @@ async def is_different_endpoint(request: ThynkContextRequest):
     """
     try:
         content_data = {"text": request.text}
-        result = is_different(content_data)
+        result = await is_different(content_data, request.user_id or "default")
         return {
             "status": "success",
             "is_different": bool(result.get("text")),
@@ -347,12 +635,13 @@ async def is_different_endpoint(request: ThynkContextRequest):
         return {"status": "error", "message": str(e)}
 
 @fastapi_app.delete("/clear-context")
-async def clear_context_endpoint():
+async def clear_context_endpoint(user_id: str = "default", clear_lectures: bool = False):
     """
-    Clear all stored context (useful for testing)
+    Clear a user's stored context (useful for testing)
     """
     try:
-        success = await redis_client.clear_context()
+        success = await redis_client.clear_context(user_id, clear_lectures)
+        change_store.forget(user_id)
         if success:
             return {"status": "success", "message": "Context cleared"}
         else:
@@ -360,6 +649,140 @@ async def clear_context_endpoint():
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+# Streaming session channel
+
+async def _ws_send(websocket: WebSocket, state, message: Dict[str, Any]) -> None:
+    """Send a JSON message; replies from concurrent handlers are serialized per socket"""
+    async with state.send_lock:
+        await websocket.send_json(message)
+
+async def _ws_photo(state, request_id: int, image_data: bytes) -> Dict[str, Any]:
+    admission = admission_control.admit("photo")
+    if admission.shed:
+        return {"type": "overloaded", "id": request_id, **admission.to_dict(),
+                "next_capture_ms": max(capture_cadence.recommended_interval_ms(state.user_id), admission.retry_after_s * 1000)}
+    with admission:
+        return await _ws_admitted_photo(state, request_id, image_data, admission)
+
+async def _ws_admitted_photo(state, request_id: int, image_data: bytes, admission) -> Dict[str, Any]:
+    rejection = await _gate_frame(image_data)
+    if rejection:
+        return {"type": "frame_rejected", "id": request_id, **rejection}
+
+    digest = await asyncio.to_thread(frame_hash, image_data)
+    # Only a byte-identical resend reuses the last text: a near-identical dHash can
+    # hide a few new handwritten characters, which change detection must see
+    content = frame_digest(image_data)
+    if state.is_repeat_frame(content):
+        # Same frame as the last one on this socket: answer from connection state
+        metrics.inc("ws_repeat_frames_total")
+        next_capture_ms = capture_cadence.observe(state.user_id, digest, state.last_text or None)
+        return {"type": "ocr", "id": request_id, "success": True, "full_text": state.last_text,
+                "repeat": True, "next_capture_ms": next_capture_ms, "context_version": state.context_version}
+
+    # Frames on one socket come from one client, so supersede per connection if the user is anonymous
+    stream = _frame_stream(state.user_id) or f"ws:{state.connection_id}"
+    result = await _ocr_frame(base64.b64encode(image_data).decode("utf-8"), state.user_id, digest, _photo_model(admission, None), stream)
+    if result.superseded:
+        return {"type": "ocr", "id": request_id, **result.model_dump(), "repeat": False,
+                "context_version": state.context_version}
+    if result.success:
+        # Only a frame whose text we hold may answer later repeats of itself
+        state.last_frame_digest = content
+        state.last_text = result.full_text
+        state.context_version += 1
+    return {"type": "ocr", "id": request_id, **result.model_dump(), "repeat": False,
+            "context_version": state.context_version}
+
+async def _ws_audio(state, request_id: int, audio_data: bytes) -> Dict[str, Any]:
+    result = await _process_audio_chunk(base64.b64encode(audio_data).decode("utf-8"), state.session_id, state.user_id)
+    if result.get("success") and result.get("compression_stats", {}).get("compressed_length"):
+        state.context_version += 1
+    return {"type": "lecture", "id": request_id, **result, "context_version": state.context_version}
+
+async def _ws_message(state, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    message_type = message["type"]
+    request_id = message.get("id")
+    if message_type == "hello":
+        state.user_id = message.get("user_id") or state.user_id
+        state.session_id = message.get("session_id") or state.session_id
+        return {"type": "hello", "id": request_id, **state.to_dict()}
+    if message_type == "ping":
+        return {"type": "pong", "id": request_id}
+    if message_type == "hint":
+        admission = admission_control.admit("hint")
+        if admission.shed:
+            return {"type": "overloaded", "id": request_id, **admission.to_dict()}
+        with admission:
+            hint_text = await _give_hint(message.get("learned", ""), message.get("question", ""), state.user_id)
+        return {"type": "hint", "id": request_id, "hint": hint_text, "context_version": state.context_version}
+    if message_type == "context":
+        await context_compression({"text": message.get("text", "")}, state.user_id)
+        state.context_version += 1
+        return {"type": "context", "id": request_id, "status": "success", "context_version": state.context_version}
+    return None
+
+async def _ws_handle(websocket: WebSocket, state, incoming: Dict[str, Any]) -> None:
+    """Handle one inbound message and send its reply"""
+    request_id = None
+    try:
+        with tracer.request("WS /ws/session", user_id=state.user_id, session_id=state.session_id) as span:
+            if incoming.get("bytes") is not None:
+                kind, request_id, payload = parse_binary_frame(incoming["bytes"])
+                span.set(message_type=kind, message_id=request_id)
+                reply = await (_ws_photo if kind == "photo" else _ws_audio)(state, request_id, payload)
+            else:
+                message = parse_text_message(incoming.get("text") or "")
+                request_id = message.get("id")
+                span.set(message_type=message["type"], message_id=request_id)
+                reply = await _ws_message(state, message)
+            if reply is not None:
+                await _ws_send(websocket, state, reply)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        if isinstance(e, RuntimeError) and WebSocketState.DISCONNECTED in (websocket.client_state, websocket.application_state):
+            # Reply to a socket that has already closed
+            return
+        tracer.event("ws.error", user_id=state.user_id, error=f"{type(e).__name__}: {e}")
+        try:
+            await _ws_send(websocket, state, {"type": "error", "id": request_id, "error": str(e)})
+        except Exception:
+            pass
+    finally:
+        state.inflight.release()
+
+@fastapi_app.websocket("/ws/session")
+async def session_socket(websocket: WebSocket, user_id: str = "default", session_id: Optional[str] = None):
+    """
+    Persistent channel for glasses clients.
+    
+    Binary messages carry photos and audio (type byte + request id + raw bytes),
+    text messages are typed JSON (hello, hint, context, ping). Messages are
+    handled concurrently, up to a per-connection limit, and each reply echoes
+    the request id.
+    """
+    await websocket.accept()
+    state = create_session_state(user_id, session_id)
+    tasks = set()
+    metrics.inc("ws_connections_total")
+    try:
+        while True:
+            incoming = await websocket.receive()
+            if incoming["type"] == "websocket.disconnect":
+                break
+            state.messages += 1
+            # Backpressure: stop reading while too many messages are in flight
+            await state.inflight.acquire()
+            task = asyncio.create_task(_ws_handle(websocket, state, incoming))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+
 # Modal deployment setup (only if Modal is available)
 if MODAL_AVAILABLE:
     # Create Modal app (use 'app' as the variable name for Modal CLI)
@@ -0,0 +1,145 @@
+# Created for Thynk: Always Ask Y
+# In-process metrics registry
+
+import bisect
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+# Latency buckets in seconds, from a JSON decode to a slow jury run
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_set(labels: Dict[str, str]) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs, ending with +Inf"""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class _Timer:
+    """Context manager that observes elapsed seconds into a histogram, even on error"""
+
+    def __init__(self, registry: "MetricsRegistry", name: str, labels: Dict[str, str]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.seconds = time.perf_counter() - self._started
+        self.registry.observe(self.name, self.seconds, **self.labels)
+
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms keyed by metric name and label set"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self.buckets = tuple(sorted(buckets))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        """Increment a counter"""
+        key = _label_set(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record one observation (seconds for latencies) in a histogram"""
+        key = _label_set(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self.buckets)
+            series[key].observe(value)
+
+    def timer(self, name: str, **labels: str) -> _Timer:
+        """Time a block into a histogram: `with metrics.timer("redis_op_seconds", op="hget"):`"""
+        return _Timer(self, name, labels)
+
+    def get(self, name: str, **labels: str) -> float:
+        """Current value of a counter (0 if never incremented)"""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_set(labels), 0.0)
+
+    def get_histogram(self, name: str, **labels: str) -> Tuple[int, float]:
+        """(count, sum) of a histogram series ((0, 0.0) if never observed)"""
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(_label_set(labels))
+            return (histogram.count, histogram.sum) if histogram else (0, 0.0)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """All counters as {name: {"label=value,...": value}}"""
+        with self._lock:
+            return {
+                name: {",".join(f"{k}={v}" for k, v in labels): value for labels, value in series.items()}
+                for name, series in self._counters.items()
+            }
+
+    def render_prometheus(self) -> str:
+        """All counters and histograms in the Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    for bound, count in histogram.cumulative():
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
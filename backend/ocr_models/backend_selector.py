@@ -0,0 +1,185 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Static quality priors per backend (1.0 = best transcription of handwriting and math)
+DEFAULT_QUALITY = {
+    "jury": 0.95,
+    "claude": 0.9,
+    # Text-only model: it is sent the base64 string, not the image, so it cannot
+    # read frames on its own (it stays useful as a jury member)
+    "cerebras": 0.3,
+    "google_vision": 0.75,
+    "easyocr": 0.6,
+    "stub": 0.5,
+}
+
+
+class BackendStats:
+    """EWMA latency and error rate for one OCR backend"""
+
+    def __init__(self, quality: float):
+        self.latency_ms: Optional[float] = None
+        self.error_rate = 0.0
+        self.quality = quality
+        self.samples = 0
+        self.last_used = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": round(self.latency_ms, 1) if self.latency_ms is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "quality": self.quality,
+            "samples": self.samples,
+        }
+
+
+class BackendSelector:
+    """Chooses an OCR backend per request from live latency, error and quality stats.
+
+    A backend is acceptable when its quality meets min_quality, its EWMA error
+    rate is below max_error_rate and its circuit breaker (if is_open is given)
+    is closed. Among acceptable backends within the latency SLO the fastest
+    wins; if none meets the SLO, the fastest acceptable one does. Backends
+    without samples are assumed to sit at half the SLO, so they get tried, and
+    a small exploration rate keeps stats fresh for losing backends. A backend
+    held back only by its error rate (breaker closed) gets one recovery probe
+    every probe_s. Backends below min_quality are never probed or explored.
+    With sticky_s > 0 a user keeps their backend for that long unless it
+    degrades, so consecutive frames are read the same way.
+    """
+
+    def __init__(
+        self,
+        candidates: List[str],
+        slo_ms: float = 4000.0,
+        alpha: float = 0.2,
+        max_error_rate: float = 0.3,
+        min_quality: float = 0.75,
+        explore_rate: float = 0.05,
+        sticky_s: float = 0.0,
+        probe_s: float = 10.0,
+        quality: Optional[Dict[str, float]] = None,
+        is_open: Optional[Callable[[str], bool]] = None,
+        max_users: int = 10000,
+    ):
+        quality = {**DEFAULT_QUALITY, **(quality or {})}
+        # Keep order (it breaks ties) and drop duplicates
+        self.candidates = list(dict.fromkeys(candidates))
+        self.slo_ms = float(slo_ms)
+        self.alpha = float(alpha)
+        self.max_error_rate = float(max_error_rate)
+        self.min_quality = float(min_quality)
+        self.explore_rate = float(explore_rate)
+        self.sticky_s = float(sticky_s)
+        self.probe_s = float(probe_s)
+        self.is_open = is_open
+        self.max_users = max(1, int(max_users))
+        self._stats = {name: BackendStats(quality.get(name, 0.5)) for name in self.candidates}
+        self._sticky: Dict[str, tuple] = {}
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def _good_enough(self, name: str) -> bool:
+        """Quality clears min_quality and the breaker is closed (errors aside)"""
+        return self._stats[name].quality >= self.min_quality and not (self.is_open and self.is_open(name))
+
+    def _acceptable(self, name: str) -> bool:
+        return self._good_enough(name) and self._stats[name].error_rate <= self.max_error_rate
+
+    def _expected_latency(self, name: str) -> float:
+        latency = self._stats[name].latency_ms
+        return latency if latency is not None else self.slo_ms / 2.0
+
+    def choose(self, user_id: Optional[str] = None) -> str:
+        """Backend for the next request"""
+        with self._lock:
+            if not self.candidates:
+                raise ValueError("no OCR backends configured")
+            acceptable = [name for name in self.candidates if self._acceptable(name)]
+            if not acceptable:
+                # Everything is degraded: take the least-bad backend rather than failing outright,
+                # preferring one whose output is good enough to use
+                pool = [name for name in self.candidates if self._stats[name].quality >= self.min_quality] or self.candidates
+                return min(pool, key=lambda n: (self._stats[n].error_rate, self._expected_latency(n)))
+
+            if user_id and self.sticky_s > 0:
+                sticky = self._sticky.get(user_id)
+                if sticky and sticky[0] in acceptable and time.time() - sticky[1] < self.sticky_s:
+                    return sticky[0]
+
+            # Backends held back only by errors get one recovery probe per probe_s
+            now = time.time()
+            eligible = [name for name in self.candidates if self._good_enough(name)]
+            probes = [name for name in eligible if name not in acceptable and now - self._stats[name].last_used >= self.probe_s]
+            if probes:
+                choice = probes[0]
+                self._stats[choice].last_used = now
+            elif len(eligible) > 1 and self._random.random() < self.explore_rate:
+                choice = self._random.choice(eligible)
+            else:
+                within_slo = [name for name in acceptable if self._expected_latency(name) <= self.slo_ms]
+                choice = min(within_slo or acceptable, key=self._expected_latency)
+
+            if user_id and self.sticky_s > 0:
+                self._sticky[user_id] = (choice, time.time())
+                if len(self._sticky) > self.max_users:
+                    self._sticky.pop(next(iter(self._sticky)))
+            return choice
+
+    def record(self, name: str, latency_ms: float, ok: bool, quality: Optional[float] = None) -> None:
+        """Fold one call's outcome into the backend's stats"""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                return
+            stats.samples += 1
+            stats.last_used = time.time()
+            stats.error_rate = self.alpha * (0.0 if ok else 1.0) + (1.0 - self.alpha) * stats.error_rate
+            if ok:
+                stats.latency_ms = latency_ms if stats.latency_ms is None else \
+                    self.alpha * latency_ms + (1.0 - self.alpha) * stats.latency_ms
+            if quality is not None:
+                stats.quality = self.alpha * quality + (1.0 - self.alpha) * stats.quality
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "slo_ms": self.slo_ms,
+                "backends": {
+                    name: {**stats.to_dict(), "acceptable": self._acceptable(name)}
+                    for name, stats in self._stats.items()
+                },
+            }
+
+
+def _parse_quality(spec: str) -> Dict[str, float]:
+    quality = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        quality[name.strip()] = float(value)
+    return quality
+
+
+def create_backend_selector(available: List[str], is_open: Optional[Callable[[str], bool]] = None) -> BackendSelector:
+    """Build the selector from THYNK_OCR_* environment variables.
+
+    THYNK_OCR_BACKENDS restricts (and orders) the candidates; by default every
+    available model except the test stub is a candidate.
+    """
+    configured = [n.strip() for n in os.getenv("THYNK_OCR_BACKENDS", "").split(",") if n.strip()]
+    candidates = [n for n in configured if n in available] if configured else [n for n in available if n != "stub"]
+    return BackendSelector(
+        candidates,
+        slo_ms=float(os.getenv("THYNK_OCR_SLO_MS", "4000")),
+        alpha=float(os.getenv("THYNK_OCR_EWMA_ALPHA", "0.2")),
+        max_error_rate=float(os.getenv("THYNK_OCR_MAX_ERROR_RATE", "0.3")),
+        min_quality=float(os.getenv("THYNK_OCR_MIN_QUALITY", "0.75")),
+        explore_rate=float(os.getenv("THYNK_OCR_EXPLORE_RATE", "0.05")),
+        sticky_s=float(os.getenv("THYNK_OCR_STICKY_S", "0")),
+        probe_s=float(os.getenv("THYNK_OCR_PROBE_S", "10")),
+        quality=_parse_quality(os.getenv("THYNK_OCR_QUALITY", "")),
+        is_open=is_open,
+    )
@@ -1,7 +1,36 @@
+import base64
+import importlib.util
+import io
 from abc import ABC, abstractmethod
 from typing import Optional, List
 from pydantic import BaseModel
 
+
+def module_available(name: str) -> bool:
+    """True if a module can be imported, without importing it (heavy SDKs load on first use)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+_warmup_image = None
+
+
+def warmup_image_base64() -> str:
+    """Small PNG with a line of printed text, used for throwaway warmup inferences"""
+    global _warmup_image
+    if _warmup_image is None:
+        from PIL import Image, ImageDraw
+
+        image = Image.new("RGB", (320, 96), color="white")
+        ImageDraw.Draw(image).text((12, 36), "Solve for x: 2x + 5 = 13", fill="black")
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        _warmup_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    return _warmup_image
+
+
 # Pydantic models for OCR
 class OCRRequest(BaseModel):
     image_base64: str
@@ -25,6 +54,9 @@ class SimpleOCRResponse(BaseModel):
 class BaseOCR(ABC):
     """Abstract base class for OCR implementations"""
     
+    # Runs on this machine, so an inference costs no API call
+    local = False
+    
     @abstractmethod
     async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
         """Extract text from base64 encoded image"""
@@ -39,3 +71,12 @@ class BaseOCR(ABC):
     def get_model_name(self) -> str:
         """Get the name of the OCR model"""
         pass
+    
+    async def load(self) -> None:
+        """Build clients or load weights ahead of the first request (default: nothing to load)"""
+        pass
+    
+    async def warmup(self) -> None:
+        """Load, then run one throwaway inference so first-call costs are paid before traffic"""
+        await self.load()
+        await self.extract_text_from_image(warmup_image_base64())
@@ -5,21 +5,34 @@ from PIL import Image
 from fastapi import HTTPException
 from dotenv import load_dotenv
 load_dotenv()
-from cerebras.cloud.sdk import Cerebras
 
 import json
 import asyncio
 
-from .base_ocr import BaseOCR, OCRResponse, SimpleOCRResponse, TextPhrase
+from .base_ocr import BaseOCR, OCRResponse, SimpleOCRResponse, TextPhrase, module_available
+from .preprocess import preprocess_image, get_profile
+from metrics import metrics
+from tracing import tracer
+from provider_scheduler import scheduler, estimate_tokens
+from resilience import resilience
 
-# CEREBRAS AVAILABLE
-try:
-    import cerebras
-    CEREBRAS_AVAILABLE = True
-except ImportError:
-    CEREBRAS_AVAILABLE = False
+# The Cerebras SDK is imported when the client is first built
+CEREBRAS_AVAILABLE = module_available("cerebras.cloud.sdk")
+if not CEREBRAS_AVAILABLE:
     print("Cerebras not available. Install cerebras to use Cerebras OCR.")
 
+_shared_cerebras_client = None
+
+
+def get_shared_cerebras_client():
+    """Process-wide Cerebras client, so per-request (and jury) instances reuse one connection pool"""
+    global _shared_cerebras_client
+    if _shared_cerebras_client is None:
+        from cerebras.cloud.sdk import Cerebras
+
+        _shared_cerebras_client = Cerebras(api_key=os.getenv("CEREBRAS_API_KEY"))
+    return _shared_cerebras_client
+
 
 class CerebrasModel(BaseOCR):
     """Cerebras OCR implementation (scaffold)"""
@@ -56,30 +69,26 @@ class CerebrasModel(BaseOCR):
                     status_code=500, 
                     detail="Cerebras API not available. Please set CEREBRAS_API_KEY environment variable."
                 )
-            cerebras_api_key = os.getenv("CEREBRAS_API_KEY")
-            self._cerebras_client = Cerebras(api_key=cerebras_api_key)
+            self._cerebras_client = get_shared_cerebras_client()
         return self._cerebras_client
     
+    async def load(self) -> None:
+        """Import the SDK and build the shared client in a worker thread"""
+        await asyncio.to_thread(self._get_cerebras_client)
+    
     async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
         """Extract text from base64 encoded image (not implemented)."""
         try:
             # Get Cerebras client
             client = self._get_cerebras_client()
             
-            # Determine image format from base64 data
-            image_data = base64.b64decode(image_base64)
-            pil_image = Image.open(io.BytesIO(image_data))
-            
-            # Always downscale and compress to keep prompt size under context limits
-            # - Resize to max 512px on the longest side
-            # - Re-encode as JPEG quality 50
+            # Adaptive downscale/compression to keep the inline base64 prompt small
+            with metrics.timer("image_decode_seconds", site="cerebras"):
+                image_data = base64.b64decode(image_base64)
             try:
-                max_dim = 512
-                pil_image = pil_image.convert('RGB')
-                pil_image.thumbnail((max_dim, max_dim))
-                buffer = io.BytesIO()
-                pil_image.save(buffer, format='JPEG', quality=50, optimize=True)
-                image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+                with metrics.timer("image_preprocess_seconds", backend="cerebras"):
+                    prepared = await asyncio.to_thread(preprocess_image, image_data, get_profile("cerebras"))
+                image_base64 = prepared.base64
             except Exception:
                 # Fallback to original base64 if compression fails
                 image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -99,17 +108,26 @@ class CerebrasModel(BaseOCR):
             # Make API call to Cerebras with text-only message (model: gpt-oss-120b)
             # Note: Cerebras chat API uses OpenAI-like schema and typically returns text content.
             # If/when image inputs are supported, this will need to be adapted.
-            response = await asyncio.to_thread(
-                client.chat.completions.create,
-                model=self._model_name,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"{system_prompt}\n\n{user_prompt}",
-                    }
-                ],
-                max_tokens=self._max_tokens,
-            )
+            # The breaker and latency tracking cover the API call only, not time queued for a slot
+            async with scheduler.slot("cerebras", "ocr", estimate_tokens(system_prompt, user_prompt, max_tokens=self._max_tokens)) as slot:
+                with tracer.span("llm_call", provider="cerebras", prompt="ocr", model=self._model_name), \
+                        metrics.timer("llm_call_seconds", provider="cerebras", prompt="ocr"):
+                    response = await resilience.call("cerebras", lambda: asyncio.to_thread(
+                        client.chat.completions.create,
+                        model=self._model_name,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": f"{system_prompt}\n\n{user_prompt}",
+                            }
+                        ],
+                        max_tokens=self._max_tokens,
+                    ))
+                slot.record(response)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                metrics.inc("llm_tokens_total", getattr(usage, "prompt_tokens", 0) or 0, provider="cerebras", prompt="ocr", kind="input")
+                metrics.inc("llm_tokens_total", getattr(usage, "completion_tokens", 0) or 0, provider="cerebras", prompt="ocr", kind="output")
             
             # Parse the response text from Cerebras
             try:
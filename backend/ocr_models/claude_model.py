@@ -1,27 +1,54 @@
+import asyncio
 import base64
 import io
 import os
 from PIL import Image
-import anthropic
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from fastapi import HTTPException
 
-from .base_ocr import BaseOCR, SimpleOCRResponse, TextPhrase
+from .base_ocr import BaseOCR, SimpleOCRResponse, TextPhrase, module_available, warmup_image_base64
+from .preprocess import preprocess_image, get_profile
+from prompts import OCR_PROMPT, prompt_cache_stats
+from resilience import resilience
+from metrics import metrics
+from tracing import tracer
+from provider_scheduler import ProviderSlot, scheduler, estimate_tokens
 
-# Claude API imports
-try:
-    import anthropic
-    CLAUDE_AVAILABLE = True
-except ImportError:
-    CLAUDE_AVAILABLE = False
+# The Anthropic SDK is imported when the shared client is first built
+CLAUDE_AVAILABLE = module_available("anthropic")
+if not CLAUDE_AVAILABLE:
     print("Anthropic not available. Install anthropic to use Claude OCR.")
 
+_shared_claude_client = None
+
+# Static instructions are a cacheable system prefix; the image is the only per-call content
+OCR_USER_PROMPT = "Extract and return only the text from this image. When writing any equations, use MathJAX formatting as described."
+
+
+def get_shared_claude_client():
+    """Process-wide async Anthropic client.
+
+    Model instances are created per request (and per jury member), so sharing
+    one client keeps its connection pool alive instead of leaking an unclosed
+    client, and its sockets, on every call.
+    """
+    global _shared_claude_client
+    if _shared_claude_client is None:
+        import anthropic
+
+        # Use the async Anthropic client
+        _shared_claude_client = anthropic.AsyncAnthropic(api_key=os.getenv("CLAUDE_KEY"))
+    return _shared_claude_client
+
+
 class ClaudeModel(BaseOCR):
     """Claude 4 Sonnet implementation of the OCR interface"""
     
-    def __init__(self):
+    def __init__(self, hedge: bool = True):
         self._claude_client = None
+        # Hedge slow or failing Claude calls with the backends in THYNK_CLAUDE_HEDGE_BACKENDS
+        self._hedge = hedge
     
     def is_available(self) -> bool:
         """Check if Claude is available"""
@@ -39,61 +66,122 @@ class ClaudeModel(BaseOCR):
                     status_code=500, 
                     detail="Claude API not available. Please set CLAUDE_KEY environment variable."
                 )
-            claude_api_key = os.getenv("CLAUDE_KEY")
-            # Use the async Anthropic client
-            self._claude_client = anthropic.AsyncAnthropic(api_key=claude_api_key)
+            self._claude_client = get_shared_claude_client()
         return self._claude_client
     
+    async def load(self) -> None:
+        """Import the SDK and build the shared client in a worker thread"""
+        await asyncio.to_thread(self._get_claude_client)
+    
+    async def warmup(self) -> None:
+        """One un-hedged Claude call, so warmup does not also wake the hedge backends"""
+        await self.load()
+        await self._extract(warmup_image_base64(), [])
+    
+    def _hedge_backends(self) -> List[Tuple[str, BaseOCR]]:
+        """Available alternate OCR backends to hedge Claude calls with"""
+        if not self._hedge:
+            return []
+        from .ocr_factory import OCRFactory
+
+        backends = []
+        for name in filter(None, (n.strip() for n in os.getenv("THYNK_CLAUDE_HEDGE_BACKENDS", "").split(","))):
+            try:
+                backend = OCRFactory.create_ocr_model(name)
+                if backend.is_available():
+                    backends.append((name, backend))
+            except Exception as e:
+                tracer.event("hedge_backend_unavailable", backend=name, error=str(e))
+        return backends
+
     async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
-        """Extract text from base64 encoded image using Claude. Returns plain text only."""
+        """Extract text from base64 encoded image using Claude. Returns plain text only.
 
+        The call goes through Claude's circuit breaker. Once it runs past Claude's
+        observed p95 latency (or fails, or the breaker is open), the same frame is
+        sent to the hedge backends and the first successful result wins.
+        """
         try:
-            # Get Claude client
-            client = self._get_claude_client()
+            return await self._extract(image_base64, self._hedge_backends())
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Claude OCR processing failed: {str(e)}",
+            )
+
+    async def _extract(self, image_base64: str, hedges: List[Tuple[str, BaseOCR]]) -> SimpleOCRResponse:
+        """Prepare the frame, then race Claude against the hedges.
+
+        Only the Claude entrant waits for an Anthropic provider slot, so a hedge
+        backend can start (and win) while Claude is still queued for rate limits.
+        The queue wait is left out of Claude's recorded latency.
+        """
+        prepared_base64, media_type = await self._prepare_image(image_base64)
 
-            # Determine image format from base64 data
+        async def claude() -> SimpleOCRResponse:
+            slot = scheduler.slot("anthropic", "ocr", estimate_tokens(OCR_USER_PROMPT, max_tokens=4000, images=1))
+            async with slot:
+                resilience.exclude_wait(slot.wait_s)
+                return await self._extract_with_claude(prepared_base64, media_type, slot)
+
+        calls = [("claude", claude)]
+        for name, backend in hedges:
+            calls.append((name, lambda backend=backend: backend.extract_text_from_image(image_base64)))
+        return await resilience.hedged(calls)
+
+    async def _prepare_image(self, image_base64: str) -> Tuple[str, str]:
+        """Shrink the frame to the smallest legible JPEG; returns (base64, media type)"""
+        with metrics.timer("image_decode_seconds", site="claude"):
             image_data = base64.b64decode(image_base64)
+        try:
+            with metrics.timer("image_preprocess_seconds", backend="claude"):
+                prepared = await asyncio.to_thread(preprocess_image, image_data, get_profile("claude"))
+            return prepared.base64, prepared.media_type
+        except Exception as e:
+            tracer.event("preprocess_failed", backend="claude", error=str(e))
             pil_image = Image.open(io.BytesIO(image_data))
 
             # Convert to supported format if needed
             if pil_image.format not in ['JPEG', 'PNG', 'GIF', 'WEBP']:
                 buffer = io.BytesIO()
                 pil_image.save(buffer, format='PNG')
-                image_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
-                media_type = "image/png"
-            else:
-                media_type = f"image/{pil_image.format.lower()}"
-
-            # Prompts for plain text OCR output
-            system_prompt = (
-                "You are an expert OCR system. Extract all visible text from the image. "
-                "If the text contains mathematical expressions or equations, format them using MathJAX: use $...$ for inline math and $$...$$ for display equations (e.g., \\frac{a}{b}, \\sqrt{x}, superscripts as x^{2}, subscripts as a_{i}). "
-                "Return ONLY the extracted text with no additional commentary, labels, or JSON."
-            )
-            user_prompt = "Extract and return only the text from this image. When writing any equations, use MathJAX formatting as described."
+                return base64.b64encode(buffer.getvalue()).decode('utf-8'), "image/png"
+            return image_base64, f"image/{pil_image.format.lower()}"
+
+    async def _extract_with_claude(self, image_base64: str, media_type: str, slot: ProviderSlot) -> SimpleOCRResponse:
+        """Single Claude OCR call on a prepared image, inside an acquired provider slot"""
+        try:
+            # Get Claude client
+            client = self._get_claude_client()
 
             # Claude API call (async)
-            response = await client.messages.create(
-                model="claude-opus-4-1-20250805",
-                max_tokens=4000,
-                system=system_prompt,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": media_type,
-                                    "data": image_base64,
+            with tracer.span("llm_call", provider="anthropic", prompt=OCR_PROMPT.name), \
+                    metrics.timer("llm_call_seconds", provider="anthropic", prompt=OCR_PROMPT.name):
+                response = await client.messages.create(
+                    model="claude-opus-4-1-20250805",
+                    max_tokens=4000,
+                    system=OCR_PROMPT.system_blocks(),
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": [
+                                {"type": "text", "text": OCR_USER_PROMPT},
+                                {
+                                    "type": "image",
+                                    "source": {
+                                        "type": "base64",
+                                        "media_type": media_type,
+                                        "data": image_base64,
+                                    },
                                 },
-                            },
-                        ],
-                    }
-                ],
-            )
+                            ],
+                        }
+                    ],
+                )
+            slot.record(response)
+            prompt_cache_stats.record(OCR_PROMPT.name, response)
 
             # Gather all text blocks into a single string
             response_text_parts: List[str] = []
@@ -108,6 +196,8 @@ class ClaudeModel(BaseOCR):
             )
 
         except Exception as e:
+            # A 429 still pauses the provider even if a hedge wins the race
+            slot.record_error(e)
             raise HTTPException(
                 status_code=500,
                 detail=f"Claude OCR processing failed: {str(e)}",
@@ -1,16 +1,15 @@
+import asyncio
 import base64
 import io
 from PIL import Image
 from fastapi import HTTPException
 
-from .base_ocr import BaseOCR, OCRResponse, SimpleOCRResponse, TextPhrase
+from .base_ocr import BaseOCR, OCRResponse, SimpleOCRResponse, TextPhrase, module_available
+from metrics import metrics
 
-# Google Cloud Vision imports
-try:
-    from google.cloud import vision
-    GOOGLE_VISION_AVAILABLE = True
-except ImportError:
-    GOOGLE_VISION_AVAILABLE = False
+# Google Cloud Vision is imported when the client is first built
+GOOGLE_VISION_AVAILABLE = module_available("google.cloud.vision")
+if not GOOGLE_VISION_AVAILABLE:
     print("Google Cloud Vision not available. Install google-cloud-vision to use OCR.")
 
 class GoogleVisionModel(BaseOCR):
@@ -35,19 +34,27 @@ class GoogleVisionModel(BaseOCR):
                     status_code=500, 
                     detail="Google Cloud Vision not available. Please install google-cloud-vision."
                 )
+            from google.cloud import vision
+
             # Initialize the Vision API client
             self._vision_client = vision.ImageAnnotatorClient()
         return self._vision_client
     
+    async def load(self) -> None:
+        """Import the SDK and build the client in a worker thread"""
+        await asyncio.to_thread(self._get_vision_client)
+    
     async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
         """Extract text from base64 encoded image using Google Cloud Vision"""
         
         try:
             # Decode base64 image
-            image_data = base64.b64decode(image_base64)
+            with metrics.timer("image_decode_seconds", site="google_vision"):
+                image_data = base64.b64decode(image_base64)
             
             # Get Vision client
             client = self._get_vision_client()
+            from google.cloud import vision
             
             # Create Vision API image object
             image = vision.Image(content=image_data)
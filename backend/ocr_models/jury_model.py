@@ -1,22 +1,32 @@
 import os
+import time
 import asyncio
 from fastapi import HTTPException
 import os
 
-# Optional Anthropic import for aggregation step
-try:
-    import anthropic
-    _ANTHROPIC_OK = True
-except ImportError:
-    _ANTHROPIC_OK = False
-
-from .base_ocr import BaseOCR, SimpleOCRResponse, TextPhrase
-from .claude_model import ClaudeModel
+from .base_ocr import BaseOCR, SimpleOCRResponse, TextPhrase, module_available
+from .claude_model import ClaudeModel, get_shared_claude_client
 from .cerebras_model import CerebrasModel
+from prompts import JURY_AGGREGATION_PROMPT, prompt_cache_stats
+from resilience import resilience
+from metrics import metrics
+from tracing import tracer
+from provider_scheduler import scheduler, estimate_tokens
 
 # Placeholder availability flag for Jury (orchestrator always available)
 JURY_AVAILABLE = True
 
+# Optional Anthropic SDK for the aggregation step (imported by the shared client on first use)
+_ANTHROPIC_OK = module_available("anthropic")
+
+
+async def _run_member(name: str, run, image_base64: str) -> SimpleOCRResponse:
+    """Run one jury member inside its own span"""
+    with tracer.span("jury.member", backend=name) as span:
+        result = await run(image_base64)
+        span.set(chars=len(result.full_text or "") if result else 0)
+        return result
+
 
 class JuryModel(BaseOCR):
     """Jury OCR implementation that ensembles multiple models.
@@ -52,98 +62,122 @@ class JuryModel(BaseOCR):
         """No concrete client to initialize for the orchestrator."""
         return None
 
+    async def load(self) -> None:
+        """Build the shared clients of the available members"""
+        for member in (ClaudeModel(hedge=False), CerebrasModel(max_tokens=self._cerebras_max_tokens)):
+            if member.is_available():
+                await member.load()
+
     async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
         """Run multiple OCR backends concurrently and return up to 4 outputs as phrases."""
         texts: list[str] = []
 
-        tasks = []
+        members = []
 
-        # Prepare Claude task
+        # Prepare Claude member (guarded by Claude's breaker; the jury does its own straggler handling)
         try:
-            claude = ClaudeModel()
-            if claude.is_available():
-                tasks.append(claude.extract_text_from_image(image_base64))
+            claude = ClaudeModel(hedge=False)
+            if claude.is_available() and not resilience.is_open("claude"):
+                members.append(("claude", claude.extract_text_from_image))
         except Exception as e:
-            print(f"Jury: Claude init/availability check failed: {e}")
+            tracer.event("jury.member_unavailable", backend="claude", error=str(e))
 
-        # Prepare Cerebras tasks
+        # Prepare Cerebras members
         cerebras_variants = [
             "gpt-oss-120b",
         ]
         for model_type in cerebras_variants:
             try:
                 cerebras = CerebrasModel(model_type=model_type, max_tokens=self._cerebras_max_tokens)
-                if cerebras.is_available():
-                    tasks.append(cerebras.extract_text_from_image(image_base64))
+                if cerebras.is_available() and not resilience.is_open("cerebras"):
+                    # Guarded by Cerebras' breaker inside the model, after its provider slot
+                    members.append(("cerebras", cerebras.extract_text_from_image))
             except Exception as e:
-                print(f"Jury: Cerebras ({model_type}) init/availability check failed: {e}")
-
-        # Run all tasks concurrently
-        if tasks:
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            for idx, res in enumerate(results):
-                if isinstance(res, Exception):
-                    print(f"Jury: backend task {idx} failed: {res}")
-                    continue
-                try:
-                    if res and res.full_text:
-                        candidate = res.full_text.strip()
-                        print(f"Jury candidate [{idx}]:", candidate)
-                        texts.append(candidate)
-                except Exception as e:
-                    print(f"Jury: error processing result {idx}: {e}")
+                tracer.event("jury.member_unavailable", backend="cerebras", model=model_type, error=str(e))
+
+        # Run all members concurrently. Once the first candidate is in, the others
+        # get until their own observed p95 to finish; stragglers are cancelled
+        tasks = {asyncio.ensure_future(_run_member(name, run, image_base64)): name for name, run in members}
+        started = time.perf_counter()
+        pending = set(tasks)
+        try:
+            while pending:
+                timeout = None
+                if texts:
+                    elapsed = time.perf_counter() - started
+                    timeout = max(0.0, max(resilience.hedge_delay(tasks[t]) for t in pending) - elapsed)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    for task in pending:
+                        tracer.event("jury.straggler_dropped", backend=tasks[task])
+                        task.cancel()
+                    break
+                for task in done:
+                    name = tasks[task]
+                    if task.exception() is not None:
+                        tracer.event("jury.member_failed", backend=name, error=str(task.exception()))
+                        continue
+                    res = task.result()
+                    try:
+                        if res and res.full_text:
+                            candidate = res.full_text.strip()
+                            tracer.event("jury.candidate", backend=name, text=candidate)
+                            texts.append(candidate)
+                    except Exception as e:
+                        tracer.event("jury.member_failed", backend=name, error=str(e))
+        finally:
+            # Cancelled mid-round (e.g. the frame was superseded): stop the members too
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
 
         # Keep only first 4 outputs
         texts = [t for t in texts if t]
         texts = texts[:4]
 
-        # Log all candidates
-        print(f"Jury candidates collected ({len(texts)}):")
-        for i, t in enumerate(texts, start=1):
-            print(f"  {i}. {t}")
+        tracer.current().set(jury_candidates=len(texts))
 
         if not texts:
             raise HTTPException(status_code=500, detail="No OCR outputs available from ensemble")
 
         # Aggregate the four inputs using Claude 4 Sonnet (text-only). If unavailable, fall back.
+        aggregation_started = time.perf_counter()
         aggregated_text = None
-        if _ANTHROPIC_OK and os.getenv("CLAUDE_KEY"):
-            try:
-                client = anthropic.AsyncAnthropic(api_key=os.getenv("CLAUDE_KEY"))
-                numbered = "\n".join([f"{i+1}. {t}" for i, t in enumerate(texts)])
-                system_prompt = (
-                    "You are a world-class OCR aggregation system. You will be given up to four OCR outputs "
-                    "that attempt to read the same scene. Your job is to produce a single, clean, faithful, and concise "
-                    "final text that best represents the underlying content. Remove duplicates, resolve minor conflicts, "
-                    "and prefer the clearly correct words. If any mathematical expressions or equations appear, ensure they are formatted using MathJAX: use $...$ for inline math and $$...$$ for display equations (e.g., \\frac{a}{b}, \\sqrt{x}, x^{2}, a_{i}). "
-                    "Do not add commentary. Return ONLY the final text."
-                )
-                user_prompt = (
-                    "Aggregate the following OCR candidate outputs into a single best representation. "
-                    "When writing any equations, use MathJAX formatting as described.\n\n"
-                    f"Candidates:\n{numbered}\n\nReturn only the final consolidated text."
-                )
-                resp = await client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=512,
-                    system=system_prompt,
-                    messages=[{"role": "user", "content": user_prompt}],
-                )
-                # Extract plain text from Anthropic response
-                parts = []
-                for block in getattr(resp, "content", []) or []:
-                    if getattr(block, "type", None) == "text" and getattr(block, "text", None):
-                        parts.append(block.text)
-                aggregated_text = ("\n".join(parts)).strip() if parts else None
-            except Exception as e:
-                print(f"Jury: Aggregation with Claude failed: {e}")
-
-        if not aggregated_text:
-            # Fallback: choose the longest candidate as a heuristic
-            aggregated_text = max(texts, key=len)
-
-        # Log final aggregation result
-        print("Jury aggregated text:", aggregated_text)
+        with tracer.span("jury.aggregate", candidates=len(texts)) as aggregation:
+            if _ANTHROPIC_OK and os.getenv("CLAUDE_KEY"):
+                try:
+                    client = get_shared_claude_client()
+                    numbered = "\n".join([f"{i+1}. {t}" for i, t in enumerate(texts)])
+                    # Static instructions are a cacheable system prefix; candidates go last
+                    user_prompt = f"Candidates:\n{numbered}"
+                    # Skipped straight to the fallback below while the aggregation breaker is open
+                    async with scheduler.slot("anthropic", "ocr", estimate_tokens(user_prompt, max_tokens=512)) as slot:
+                        with tracer.span("llm_call", provider="anthropic", prompt=JURY_AGGREGATION_PROMPT.name), \
+                                metrics.timer("llm_call_seconds", provider="anthropic", prompt=JURY_AGGREGATION_PROMPT.name):
+                            resp = await resilience.call("claude_aggregation", lambda: client.messages.create(
+                                model="claude-sonnet-4-20250514",
+                                max_tokens=512,
+                                system=JURY_AGGREGATION_PROMPT.system_blocks(),
+                                messages=[{"role": "user", "content": user_prompt}],
+                            ))
+                        slot.record(resp)
+                    prompt_cache_stats.record(JURY_AGGREGATION_PROMPT.name, resp)
+                    # Extract plain text from Anthropic response
+                    parts = []
+                    for block in getattr(resp, "content", []) or []:
+                        if getattr(block, "type", None) == "text" and getattr(block, "text", None):
+                            parts.append(block.text)
+                    aggregated_text = ("\n".join(parts)).strip() if parts else None
+                except Exception as e:
+                    tracer.event("jury.aggregation_failed", error=str(e))
+
+            if not aggregated_text:
+                # Fallback: choose the longest candidate as a heuristic
+                aggregated_text = max(texts, key=len)
+                aggregation.set(fallback=True)
+            aggregation.set(text=aggregated_text)
+        metrics.observe("jury_aggregation_seconds", time.perf_counter() - aggregation_started,
+                        candidates=str(len(texts)))
 
         return SimpleOCRResponse(
             full_text=aggregated_text,
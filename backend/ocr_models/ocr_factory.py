@@ -1,66 +1,50 @@
+import importlib
+from typing import Callable, Dict, Tuple
+
 from .base_ocr import BaseOCR
-from .easyocr_model import EasyOCRModel
-from .google_vision_model import GoogleVisionModel
-from .claude_model import ClaudeModel
-from .cerebras_model import CerebrasModel
-from .jury_model import JuryModel
-from .cerebras_model import CerebrasModel
+
+# Backend name -> (module, class or factory). Modules are imported on first
+# use, so startup never pays for SDKs (torch via easyocr, google.cloud, cerebras) it may
+# not need; the startup warmup loads the configured backends ahead of time instead.
+# The order is the order get_available_models reports backends in.
+_BACKENDS: Dict[str, Tuple[str, str]] = {
+    "easyocr": (".easyocr_model", "EasyOCRModel"),
+    "google_vision": (".google_vision_model", "GoogleVisionModel"),
+    "claude": (".claude_model", "ClaudeModel"),
+    "cerebras": (".cerebras_model", "CerebrasModel"),
+    "jury": (".jury_model", "JuryModel"),
+    "stub": (".stub_model", "create_stub_model"),
+}
+
+_constructors: Dict[str, Callable[[], BaseOCR]] = {}
+
+
+def _constructor(model_type: str) -> Callable[[], BaseOCR]:
+    """Import a backend's module on first use and return its class or factory"""
+    name = model_type.lower()
+    if name not in _constructors:
+        if name not in _BACKENDS:
+            raise ValueError(f"Unsupported OCR model type: {model_type}")
+        module_name, attribute = _BACKENDS[name]
+        _constructors[name] = getattr(importlib.import_module(module_name, __package__), attribute)
+    return _constructors[name]
+
 
 class OCRFactory:
     """Factory class to create OCR model instances"""
-    
+
     @staticmethod
     def create_ocr_model(model_type: str = "claude") -> BaseOCR:
         """Create an OCR model instance based on the specified type"""
-        
-        if model_type.lower() == "easyocr":
-            return EasyOCRModel()
-        elif model_type.lower() == "google_vision":
-            return GoogleVisionModel()
-        elif model_type.lower() == "claude":
-            return ClaudeModel()
-        elif model_type.lower() == "cerebras":
-            return CerebrasModel()
-        elif model_type.lower() == "jury":
-            return JuryModel()
-        else:
-            raise ValueError(f"Unsupported OCR model type: {model_type}")
-    
+        return _constructor(model_type)()
+
     @staticmethod
     def get_available_models() -> list[str]:
-        """Get list of available OCR models"""
-        models = []
-        
-        # Check EasyOCR availability
-        easyocr_model = EasyOCRModel()
-        if easyocr_model.is_available():
-            models.append("easyocr")
-        
-        # Check Google Vision availability
-        google_vision_model = GoogleVisionModel()
-        if google_vision_model.is_available():
-            models.append("google_vision")
-        
-        # Check Claude availability
-        claude_model = ClaudeModel()
-        if claude_model.is_available():
-            models.append("claude")
+        """Get list of available OCR models (availability checks do not import backend SDKs)"""
+        models = [name for name in _BACKENDS if name != "jury" and OCRFactory.create_ocr_model(name).is_available()]
 
-        # Jury is available if any member is available
-        jury_model = JuryModel()
-        if jury_model.is_available():
-            # Put jury first as an aggregate choice
-            models = [m for m in models if m != "jury"]
+        # Jury is available if any member is available; put it first as an aggregate choice
+        if OCRFactory.create_ocr_model("jury").is_available():
             models.insert(0, "jury")
-        
-        # Check Cerebras availability
-        cerebras_model = CerebrasModel()
-        if cerebras_model.is_available():
-            models.append("cerebras")
-        
-        # Check Jury availability
-        jury_model = JuryModel()
-        if jury_model.is_available():
-            models.append("jury")
-        
+
         return models
@@ -0,0 +1,178 @@
+import base64
+import io
+import os
+from typing import Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+from .text_region import Box, box_mean, locate_text_region
+
+
+class PreprocessProfile:
+    """Quality-vs-bytes settings for one OCR backend.
+
+    max_side caps the longest edge, min_side is the shortest the longest edge
+    may be scaled down to, and target_glyph_px is the text height (in output pixels)
+    the backend still reads reliably. Frames are downscaled until their
+    estimated glyph height reaches target_glyph_px, never upscaled.
+    """
+
+    def __init__(
+        self,
+        max_side: int = 1568,
+        min_side: int = 256,
+        target_glyph_px: int = 20,
+        jpeg_quality: int = 80,
+        allow_grayscale: bool = True,
+        normalize_contrast: bool = True,
+        crop_to_text: bool = True,
+    ):
+        self.max_side = int(max_side)
+        self.min_side = int(min_side)
+        self.target_glyph_px = int(target_glyph_px)
+        self.jpeg_quality = int(jpeg_quality)
+        self.allow_grayscale = bool(allow_grayscale)
+        self.normalize_contrast = bool(normalize_contrast)
+        self.crop_to_text = bool(crop_to_text)
+
+    def with_overrides(self, overrides: str) -> "PreprocessProfile":
+        """Return a copy with "key=value,key=value" overrides applied"""
+        values = dict(vars(self))
+        for item in overrides.split(","):
+            if "=" not in item:
+                continue
+            key, raw = (part.strip() for part in item.split("=", 1))
+            if key not in values:
+                continue
+            if isinstance(values[key], bool):
+                values[key] = raw.lower() in ("1", "true", "yes")
+            else:
+                values[key] = int(raw)
+        return PreprocessProfile(**values)
+
+
+# Defaults per backend. Claude bills images by pixel area and caps the long edge at 1568px;
+# Cerebras receives the image inline as base64 text, so bytes there are prompt tokens.
+PROFILES: Dict[str, PreprocessProfile] = {
+    "claude": PreprocessProfile(max_side=1568, min_side=384, target_glyph_px=18, jpeg_quality=80),
+    "cerebras": PreprocessProfile(max_side=512, min_side=192, target_glyph_px=10, jpeg_quality=50),
+    "easyocr": PreprocessProfile(max_side=1600, min_side=480, target_glyph_px=24, jpeg_quality=90),
+}
+
+
+def get_profile(backend: str) -> PreprocessProfile:
+    """Profile for a backend, with THYNK_PREPROCESS_<BACKEND> overrides applied"""
+    profile = PROFILES.get(backend, PreprocessProfile())
+    overrides = os.getenv(f"THYNK_PREPROCESS_{backend.upper()}")
+    return profile.with_overrides(overrides) if overrides else profile
+
+
+class PreprocessedImage:
+    """Result of preprocessing: the encoded frame plus size accounting"""
+
+    def __init__(self, image: Image.Image, data: bytes, media_type: str, original_bytes: int, crop_box: Optional[Box] = None):
+        self.image = image
+        self.data = data
+        self.media_type = media_type
+        self.original_bytes = original_bytes
+        self.crop_box = crop_box
+
+    @property
+    def base64(self) -> str:
+        return base64.b64encode(self.data).decode("utf-8")
+
+    @property
+    def size(self):
+        return self.image.size
+
+
+def _is_monochrome(image: Image.Image, chroma_threshold: int = 24) -> bool:
+    """True when almost every pixel is close to gray (paper, ink, pencil) after white balancing"""
+    sample = np.asarray(image.convert("RGB").resize((64, 64)), dtype=np.float32)
+    # Gray-world white balance so tinted paper or warm lighting still counts as monochrome
+    channel_medians = np.maximum(np.median(sample.reshape(-1, 3), axis=0), 1.0)
+    sample *= channel_medians.mean() / channel_medians
+    chroma = sample.max(axis=2) - sample.min(axis=2)
+    return float(np.percentile(chroma, 95)) < chroma_threshold
+
+
+def _stretch_contrast(pixels: np.ndarray) -> np.ndarray:
+    """Map the 2nd..98th percentile range onto 0..255"""
+    low, high = np.percentile(pixels, (2, 98))
+    if high - low < 16:
+        return pixels
+    stretched = (pixels.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(stretched, 0, 255).astype(np.uint8)
+
+
+def estimate_glyph_height(gray: np.ndarray) -> Optional[float]:
+    """Estimate text height in pixels from the horizontal projection profile.
+
+    Rows containing ink form runs, one per text line; the median run length
+    approximates glyph height. Returns None when no line structure is found.
+    """
+    if gray.size == 0:
+        return None
+    # Ink is darker than its surroundings; a local mean keeps dark desk or margins from counting
+    window = max(15, (min(gray.shape) // 20) | 1)
+    ink = gray < box_mean(gray, window) - 20
+    row_density = ink.mean(axis=1)
+
+    # Compare against the background level so margins or dark borders do not swamp the lines
+    baseline = float(np.percentile(row_density, 20))
+    peak = float(np.percentile(row_density, 95))
+    if peak - baseline < 0.02:
+        return None
+    text_rows = row_density > baseline + 0.25 * (peak - baseline)
+
+    # Run lengths of consecutive text rows
+    padded = np.concatenate(([False], text_rows, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    runs = edges[1::2] - edges[0::2]
+    runs = runs[runs >= 3]
+    if runs.size < 2:
+        return None
+    return float(np.median(runs))
+
+
+def preprocess_image(image_data: bytes, profile: PreprocessProfile) -> PreprocessedImage:
+    """Decode, normalize and shrink a frame to the smallest legible JPEG for a profile"""
+    image = Image.open(io.BytesIO(image_data))
+
+    # JPEG draft mode decodes directly at 1/2, 1/4 or 1/8 scale when that is enough
+    if image.format == "JPEG":
+        scale = profile.max_side / max(image.size)
+        if scale < 1.0:
+            image.draft("RGB", (int(image.size[0] * scale), int(image.size[1] * scale)))
+
+    image = image.convert("RGB")
+    if max(image.size) > profile.max_side:
+        image.thumbnail((profile.max_side, profile.max_side), Image.LANCZOS)
+
+    # Crop away desk, hands and background; keep the full frame when the localizer is unsure
+    crop_box = None
+    if profile.crop_to_text:
+        crop_box = locate_text_region(np.asarray(image.convert("L")))
+        if crop_box:
+            image = image.crop(crop_box)
+
+    grayscale = profile.allow_grayscale and _is_monochrome(image)
+    pixels = np.asarray(image.convert("L") if grayscale else image)
+    if profile.normalize_contrast:
+        pixels = _stretch_contrast(pixels)
+
+    # Downscale to the smallest size that keeps glyphs at the profile's legible height
+    gray = pixels if pixels.ndim == 2 else pixels.mean(axis=2)
+    glyph_height = estimate_glyph_height(gray)
+    if glyph_height and glyph_height > profile.target_glyph_px:
+        scale = max(profile.target_glyph_px / glyph_height, profile.min_side / max(image.size))
+        if scale < 1.0:
+            new_size = (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale)))
+            image = Image.fromarray(pixels).resize(new_size, Image.LANCZOS)
+            pixels = np.asarray(image)
+
+    image = Image.fromarray(pixels)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=profile.jpeg_quality, optimize=True)
+    return PreprocessedImage(image, buffer.getvalue(), "image/jpeg", len(image_data), crop_box)
@@ -0,0 +1,91 @@
+import io
+import os
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+
+class FrameQuality:
+    """Sharpness and exposure measurements for one frame"""
+
+    def __init__(self, sharpness: float, dark_fraction: float, bright_fraction: float, reason: Optional[str]):
+        self.sharpness = sharpness
+        self.dark_fraction = dark_fraction
+        self.bright_fraction = bright_fraction
+        self.reason = reason
+
+    @property
+    def usable(self) -> bool:
+        return self.reason is None
+
+    def to_dict(self) -> dict:
+        return {
+            "reason": self.reason,
+            "sharpness": round(self.sharpness, 2),
+            "dark_fraction": round(self.dark_fraction, 3),
+            "bright_fraction": round(self.bright_fraction, 3),
+        }
+
+
+class FrameQualityGate:
+    """Cheap NumPy checks that reject frames no OCR backend can read.
+
+    Sharpness is the variance of the Laplacian on a small grayscale copy;
+    motion blur flattens it. A frame is underexposed when most pixels are
+    crushed to black, and overexposed when most are blown out to white and
+    no dark (ink) pixels survive, so a clean white page still passes.
+    Sharpness is checked before overexposure: blur smears ink into grey, so a
+    blurred bright page would otherwise look blown out.
+    """
+
+    def __init__(
+        self,
+        min_sharpness: float = 40.0,
+        max_dark_fraction: float = 0.85,
+        max_bright_fraction: float = 0.97,
+        analysis_side: int = 640,
+    ):
+        self.min_sharpness = float(min_sharpness)
+        self.max_dark_fraction = float(max_dark_fraction)
+        self.max_bright_fraction = float(max_bright_fraction)
+        self.analysis_side = int(analysis_side)
+
+    def assess(self, image_data: bytes) -> FrameQuality:
+        """Measure a frame and decide whether it is worth sending to OCR"""
+        image = Image.open(io.BytesIO(image_data))
+        if image.format == "JPEG":
+            image.draft("L", (self.analysis_side, self.analysis_side))
+        image = image.convert("L")
+        image.thumbnail((self.analysis_side, self.analysis_side))
+        gray = np.asarray(image, dtype=np.float32)
+
+        # 4-neighbour Laplacian on the interior pixels
+        laplacian = (
+            gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:] - 4.0 * gray[1:-1, 1:-1]
+        )
+        sharpness = float(laplacian.var()) if laplacian.size else 0.0
+
+        histogram = np.bincount(gray.astype(np.uint8).ravel(), minlength=256)
+        total = float(histogram.sum()) or 1.0
+        dark_fraction = float(histogram[:32].sum()) / total
+        bright_fraction = float(histogram[224:].sum()) / total
+        ink_fraction = float(histogram[:96].sum()) / total
+
+        reason = None
+        if dark_fraction > self.max_dark_fraction:
+            reason = "underexposed"
+        elif sharpness < self.min_sharpness:
+            reason = "blurry"
+        elif bright_fraction > self.max_bright_fraction and ink_fraction < 0.001:
+            reason = "overexposed"
+        return FrameQuality(sharpness, dark_fraction, bright_fraction, reason)
+
+
+def create_quality_gate() -> FrameQualityGate:
+    """Build the gate from THYNK_QUALITY_* environment variables"""
+    return FrameQualityGate(
+        min_sharpness=float(os.getenv("THYNK_QUALITY_MIN_SHARPNESS", "40")),
+        max_dark_fraction=float(os.getenv("THYNK_QUALITY_MAX_DARK_FRACTION", "0.85")),
+        max_bright_fraction=float(os.getenv("THYNK_QUALITY_MAX_BRIGHT_FRACTION", "0.97")),
+    )
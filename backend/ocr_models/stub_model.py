@@ -0,0 +1,75 @@
+import asyncio
+import os
+import random
+from typing import Optional
+
+from fastapi import HTTPException
+
+from .base_ocr import BaseOCR, SimpleOCRResponse
+
+
+class StubOCRModel(BaseOCR):
+    """Local fault-injecting OCR backend for tests and benchmarks.
+
+    Returns fixed text after a configurable latency, with injected errors and
+    occasional stragglers. Configure with keyword arguments or with
+    THYNK_STUB_OCR="latency_ms=200,jitter_ms=50,error_rate=0.1,slow_rate=0.05,slow_ms=5000".
+    Only listed as available when THYNK_STUB_OCR is set.
+    """
+
+    local = True
+
+    def __init__(
+        self,
+        name: str = "stub",
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_ms: float = 5000.0,
+        text: str = "Solve for $x$: $2x + 5 = 13$",
+        seed: Optional[int] = None,
+    ):
+        self.name = name
+        self.latency_ms = float(latency_ms)
+        self.jitter_ms = float(jitter_ms)
+        self.error_rate = float(error_rate)
+        self.slow_rate = float(slow_rate)
+        self.slow_ms = float(slow_ms)
+        self.text = text
+        self.calls = 0
+        self._random = random.Random(seed)
+
+    @classmethod
+    def from_spec(cls, spec: str, **defaults) -> "StubOCRModel":
+        """Build a stub from a "key=value,..." spec string"""
+        options = dict(defaults)
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key in ("name", "text"):
+                options[key] = value
+            else:
+                options[key] = int(value) if key == "seed" else float(value)
+        return cls(**options)
+
+    def is_available(self) -> bool:
+        return os.getenv("THYNK_STUB_OCR") is not None
+
+    def get_model_name(self) -> str:
+        return f"Stub ({self.name})"
+
+    async def extract_text_from_image(self, image_base64: str) -> SimpleOCRResponse:
+        """Sleep for the sampled latency, then fail or return the fixed text"""
+        self.calls += 1
+        delay_ms = self.slow_ms if self._random.random() < self.slow_rate else \
+            max(0.0, self._random.gauss(self.latency_ms, self.jitter_ms))
+        await asyncio.sleep(delay_ms / 1000.0)
+        if self._random.random() < self.error_rate:
+            raise HTTPException(status_code=500, detail=f"Stub OCR ({self.name}) injected failure")
+        return SimpleOCRResponse(full_text=self.text, success=True)
+
+
+def create_stub_model() -> StubOCRModel:
+    """Build the stub from THYNK_STUB_OCR"""
+    return StubOCRModel.from_spec(os.getenv("THYNK_STUB_OCR", ""))
@@ -0,0 +1,102 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Box as (left, top, right, bottom) in pixels
+Box = Tuple[int, int, int, int]
+
+
+def box_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Mean over a window x window neighbourhood (edge-padded), via an integral image"""
+    half = window // 2
+    padded = np.pad(values.astype(np.float32), ((half, window - half - 1), (half, window - half - 1)), mode="edge")
+    integral = np.pad(padded.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    total = (
+        integral[window:, window:] - integral[:-window, window:]
+        - integral[window:, :-window] + integral[:-window, :-window]
+    )
+    return total / float(window * window)
+
+
+def _dominant_span(profile: np.ndarray, on_fraction: float = 0.15, gap_fraction: float = 0.08) -> Optional[Tuple[int, int]]:
+    """Densest contiguous span of a projection profile, bridging small gaps between lines"""
+    if profile.size == 0 or profile.max() <= 0:
+        return None
+    on = profile > profile.max() * on_fraction
+    padded = np.concatenate(([False], on, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    starts, ends = edges[0::2], edges[1::2]
+    if starts.size == 0:
+        return None
+
+    # Merge runs separated by gaps smaller than gap_fraction of the profile (line/paragraph spacing)
+    max_gap = max(1, int(profile.size * gap_fraction))
+    spans = [[int(starts[0]), int(ends[0])]]
+    for start, end in zip(starts[1:], ends[1:]):
+        if start - spans[-1][1] <= max_gap:
+            spans[-1][1] = int(end)
+        else:
+            spans.append([int(start), int(end)])
+
+    best = max(spans, key=lambda span: profile[span[0]:span[1]].sum())
+    return best[0], best[1]
+
+
+def locate_text_region(
+    gray: np.ndarray,
+    analysis_side: int = 256,
+    margin: float = 0.04,
+    min_confidence: float = 0.6,
+    max_area_fraction: float = 0.85,
+) -> Optional[Box]:
+    """Find the page/text bounding box in a grayscale frame.
+
+    Works on a block-averaged copy of at most analysis_side pixels per edge:
+    gradient magnitude marks edges, a local density filter keeps stroke-dense
+    (text-like) areas, and row/column projections of those give the densest
+    text block. Returns None (use the full frame) when the box holds
+    less than min_confidence of the edge mass or would barely shrink the frame.
+    """
+    height, width = gray.shape[:2]
+    step = max(1, int(round(max(height, width) / analysis_side)))
+    # Block-average downsample; averaging also suppresses sensor noise and desk texture
+    rows_used, cols_used = (height // step) * step, (width // step) * step
+    small = gray[:rows_used, :cols_used].astype(np.float32)
+    small = small.reshape(rows_used // step, step, cols_used // step, step).mean(axis=(1, 3))
+    if min(small.shape) < 8:
+        return None
+
+    gradient = np.abs(np.diff(small, axis=1))[:-1, :] + np.abs(np.diff(small, axis=0))[:, :-1]
+    edges = (gradient > max(40.0, float(np.percentile(gradient, 90)))).astype(np.float32)
+
+    # Text is a dense texture of strokes; page borders, hands and desk edges are thin lines.
+    # Keep pixels whose local window is densely edged.
+    text_mask = box_mean(edges, 7) > 0.2
+    total = int(text_mask.sum())
+    if total < 20:
+        return None
+
+    kernel = np.ones(5, dtype=np.float32) / 5
+    rows = np.convolve(text_mask.sum(axis=1).astype(np.float32), kernel, mode="same")
+    cols = np.convolve(text_mask.sum(axis=0).astype(np.float32), kernel, mode="same")
+    row_span = _dominant_span(rows)
+    col_span = _dominant_span(cols)
+    if row_span is None or col_span is None:
+        return None
+
+    top, bottom = row_span
+    left, right = col_span
+    confidence = text_mask[top:bottom, left:right].sum() / total
+    area_fraction = ((bottom - top) * (right - left)) / float(text_mask.size)
+    if confidence < min_confidence or area_fraction > max_area_fraction:
+        return None
+
+    # Back to full resolution, padded by a margin so edge glyphs are not clipped
+    pad_x = int(width * margin)
+    pad_y = int(height * margin)
+    return (
+        max(0, left * step - pad_x),
+        max(0, top * step - pad_y),
+        min(width, (right + 1) * step + pad_x),
+        min(height, (bottom + 1) * step + pad_y),
+    )
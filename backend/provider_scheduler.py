@@ -0,0 +1,272 @@
+# Created for Thynk: Always Ask Y
+# Per-provider rate limits, concurrency caps and priority scheduling for LLM calls
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from tracing import tracer
+
+# Lower runs first. Hints are interactive; OCR feeds them; compression and lecture
+# summaries can wait
+PRIORITIES: Dict[str, int] = {"hint": 0, "ocr": 1, "background": 2}
+
+# Rough image cost for estimates; the bucket is corrected from the response's usage
+IMAGE_TOKENS = 1600
+
+
+def estimate_tokens(*texts: str, max_tokens: int = 0, images: int = 0) -> int:
+    """Estimated tokens for one call: ~4 characters per input token plus the output allowance"""
+    return sum(len(text) for text in texts) // 4 + images * IMAGE_TOKENS + max(0, int(max_tokens))
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, up to per_minute"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_s(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (amounts above capacity wait for a full bucket)"""
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+    def drain(self) -> None:
+        self.level = min(self.level, 0.0)
+
+
+class ProviderLimiter:
+    """Concurrency cap plus request and token buckets for one provider.
+
+    Callers wait in a priority queue (FIFO within a priority). The head of
+    the queue is admitted once a concurrency slot is free and both buckets
+    cover it; nothing behind it overtakes, so a waiting hint is never starved
+    by a stream of cheaper background calls. A limit of 0 means unlimited.
+    """
+
+    def __init__(self, name: str, concurrency: int = 16, rpm: int = 0, tpm: int = 0):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._queue: List[Tuple[int, int, asyncio.Future, int]] = []
+        self._order = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _wait_s(self, tokens: int, now: float) -> float:
+        """Seconds until the buckets allow a call of this size (0 if they already do)"""
+        wait = max(0.0, self.paused_until - now)
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_s(1, now))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_s(tokens, now))
+        return wait
+
+    def _start(self, tokens: int) -> None:
+        self.in_flight += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    def _wake(self) -> None:
+        """Admit waiters from the head of the queue while slots and buckets allow"""
+        self._timer = None
+        while self._queue:
+            _, _, future, tokens = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= self.concurrency:
+                return
+            wait = self._wait_s(tokens, time.monotonic())
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._wake)
+                return
+            heapq.heappop(self._queue)
+            self._start(tokens)
+            future.set_result(None)
+
+    async def acquire(self, priority: int, tokens: int) -> None:
+        """Wait for a slot; the caller must release() it"""
+        if not self._queue and self.in_flight < self.concurrency and self._wait_s(tokens, time.monotonic()) == 0:
+            self._start(tokens)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), future, tokens))
+        if self._timer is None or self._queue[0][2] is future:
+            # A new head may fit the buckets sooner than the one the timer waits for
+            self._rewake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: hand the slot back
+                self.release()
+            elif self._queue and self._queue[0][2] is future:
+                # The timer was sized for us; size it for the next waiter instead
+                self._rewake()
+            raise
+
+    def _rewake(self) -> None:
+        """Drop the pending bucket timer and re-check the queue head now"""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._wake()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        if self._timer is None:
+            self._wake()
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the response reports actual usage"""
+        if self.tokens is not None:
+            self.tokens.take(actual - estimated)
+
+    def pause(self, seconds: float) -> None:
+        """Stop admitting calls for a while after the provider answered 429"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        for bucket in (self.requests, self.tokens):
+            if bucket is not None:
+                bucket.drain()
+
+    def snapshot(self) -> Dict[str, Any]:
+        names = {level: name for name, level in PRIORITIES.items()}
+        queued: Dict[str, int] = {}
+        for priority, _, future, _ in self._queue:
+            if not future.done():
+                name = names.get(priority, str(priority))
+                queued[name] = queued.get(name, 0) + 1
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queued": queued,
+            "requests_available": round(self.requests.level, 1) if self.requests else None,
+            "tokens_available": round(self.tokens.level) if self.tokens else None,
+            "paused_s": round(max(0.0, self.paused_until - time.monotonic()), 2),
+        }
+
+
+def _retry_after_s(error: BaseException) -> Optional[float]:
+    """Seconds to back off if error is a provider 429 (Retry-After honoured when present)"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 1.0))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class ProviderSlot:
+    """`async with scheduler.slot(...) as slot:` around one outbound call"""
+
+    def __init__(self, scheduler: "ProviderScheduler", provider: str, priority: str, tokens: int):
+        self.scheduler = scheduler
+        self.provider = provider
+        self.priority = priority
+        self.tokens = max(1, int(tokens))
+        self.wait_s = 0.0
+        self._limiter: Optional[ProviderLimiter] = None
+        self._error: Optional[BaseException] = None
+
+    async def __aenter__(self) -> "ProviderSlot":
+        if not self.scheduler.enabled:
+            return self
+        limiter = self.scheduler.limiter(self.provider)
+        started = time.perf_counter()
+        with tracer.span("provider_queue", provider=self.provider, priority=self.priority) as span:
+            await limiter.acquire(PRIORITIES.get(self.priority, len(PRIORITIES)), self.tokens)
+            self.wait_s = time.perf_counter() - started
+            span.set(wait_ms=round(self.wait_s * 1000, 1))
+        self._limiter = limiter
+        metrics.observe("provider_queue_wait_seconds", self.wait_s, provider=self.provider, priority=self.priority)
+        return self
+
+    def record(self, response: Any) -> None:
+        """Settle the token estimate against the response's usage (Anthropic or OpenAI style)"""
+        usage = getattr(response, "usage", None)
+        if self._limiter is None or usage is None:
+            return
+        actual = sum(getattr(usage, field, 0) or 0 for field in ("input_tokens", "output_tokens", "prompt_tokens", "completion_tokens"))
+        if actual:
+            self._limiter.settle(self.tokens, actual)
+
+    def record_error(self, error: BaseException) -> None:
+        """Note the call's error when it is handled inside the slot (e.g. a hedge won instead)"""
+        self._error = error
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if self._limiter is None:
+            return
+        self._limiter.release()
+        error = self._error or exc
+        retry_after = _retry_after_s(error) if error is not None else None
+        if retry_after is not None:
+            metrics.inc("provider_rate_limited_total", provider=self.provider)
+            self._limiter.pause(retry_after)
+
+
+class ProviderScheduler:
+    """Outbound LLM calls go through here, one limiter per provider"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, int]]] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.limits = limits or {}
+        self._limiters: Dict[str, ProviderLimiter] = {}
+
+    def limiter(self, provider: str) -> ProviderLimiter:
+        if provider not in self._limiters:
+            self._limiters[provider] = ProviderLimiter(provider, **self.limits.get(provider, {}))
+        return self._limiters[provider]
+
+    def slot(self, provider: str, priority: str, tokens: int) -> ProviderSlot:
+        """Admission for one call of about `tokens` tokens at the given priority class"""
+        return ProviderSlot(self, provider, priority, tokens)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limiter.snapshot() for name, limiter in sorted(self._limiters.items())}
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """"concurrency=16,rpm=50,tpm=40000" -> keyword arguments for ProviderLimiter"""
+    limits = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        key, raw = (part.strip() for part in item.split("=", 1))
+        if key in ("concurrency", "rpm", "tpm"):
+            limits[key] = int(raw)
+    return limits
+
+
+def create_provider_scheduler() -> ProviderScheduler:
+    """Build the scheduler from THYNK_PROVIDER_SCHEDULER and THYNK_LIMITS_<PROVIDER>"""
+    limits = {}
+    for provider in ("anthropic", "cerebras"):
+        spec = os.getenv(f"THYNK_LIMITS_{provider.upper()}")
+        if spec:
+            limits[provider] = parse_limits(spec)
+    return ProviderScheduler(limits, enabled=os.getenv("THYNK_PROVIDER_SCHEDULER", "1").lower() not in ("0", "false", "no"))
+
+
+# Global scheduler shared by all LLM call sites
+scheduler = create_provider_scheduler()
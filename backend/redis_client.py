@@ -5,13 +5,43 @@ import os
 import json
 import time
 import math
+import inspect
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
-from upstash_redis.asyncio import Redis
 from dotenv import load_dotenv
 
+from metrics import metrics
+from tracing import tracer
+
 load_dotenv()
 
+class TimedRedis:
+    """Wraps an async Redis client so every awaited command is timed per operation"""
+    
+    def __init__(self, client: Any):
+        self._client = client
+    
+    def __getattr__(self, op: str) -> Any:
+        attr = getattr(self._client, op)
+        if not callable(attr):
+            return attr
+        
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return self._timed(op, result) if inspect.isawaitable(result) else result
+        return call
+    
+    async def _timed(self, op: str, awaitable: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            with tracer.span(f"redis.{op}"):
+                return await awaitable
+        except Exception:
+            metrics.inc("redis_errors_total", op=op)
+            raise
+        finally:
+            metrics.observe("redis_op_seconds", time.perf_counter() - started, op=op)
+
 class ThynkRedisClient:
     """Redis client for managing learning context in Thynk system"""
     
@@ -25,28 +55,128 @@ class ThynkRedisClient:
                 "Missing Upstash Redis credentials. Please set UPSTASH_REDIS_REST_URL and UPSTASH_REDIS_REST_TOKEN in your .env file"
             )
         
-        self.client = Redis(url=self.redis_url, token=self.redis_token)
+        # Built on first command (see the client property), so importing this module stays cheap
+        self._client = None
+        
+        # Key layout: every key for a user shares the hash tag {user_id}, so all of a
+        # user's data lands on one Redis Cluster slot (multi-key ops stay legal) while
+        # different users spread across nodes
+        self.KEY_PREFIX = "thynk:"
+        
+        # Keys written before the hash-tag layout (thynk:<kind>:<user_id>) are moved to it the
+        # first time this process touches the user; off once every user has been migrated
+        self.migrate_legacy_keys = os.getenv("THYNK_REDIS_MIGRATE_LEGACY_KEYS", "1").lower() not in ("0", "false", "no")
+        self._checked_users: Dict[str, None] = {}
         
-        # Key prefixes for organization
-        self.CONTEXT_PREFIX = "thynk:context:"
-        self.LECTURE_PREFIX = "thynk:lecture:"
-        self.METADATA_PREFIX = "thynk:meta:"
+        # Per-user count of context writes made by this process; requests that read
+        # context (hints) include it in their single-flight key, so a hint started
+        # before a write is never shared with a request made after it
+        self._context_versions: Dict[str, int] = {}
+        self.max_versioned_users = 10000
         
+    @property
+    def client(self) -> Any:
+        """The timed Upstash client, created on first use"""
+        if self._client is None:
+            from upstash_redis.asyncio import Redis
+            
+            self._client = TimedRedis(Redis(url=self.redis_url, token=self.redis_token))
+        return self._client
+    
+    @client.setter
+    def client(self, client: Any) -> None:
+        self._client = client
+    
+    def context_version(self, user_id: str = "default") -> int:
+        """Number of context writes this process has made for a user"""
+        return self._context_versions.get(user_id or "default", 0)
+    
+    def _context_written(self, user_id: str) -> None:
+        user_id = user_id or "default"
+        self._context_versions[user_id] = self._context_versions.pop(user_id, 0) + 1
+        if len(self._context_versions) > self.max_versioned_users:
+            # Oldest-written user first (dicts keep insertion order)
+            del self._context_versions[next(iter(self._context_versions))]
+    
+    def _user_key(self, user_id: str, suffix: str) -> str:
+        """Generate a hash-tagged key for user data"""
+        # Braces in the id would change which part of the key is hashed
+        tag = (user_id or "default").replace("{", "").replace("}", "")
+        return f"{self.KEY_PREFIX}{{{tag}}}:{suffix}"
+    
     def _get_context_key(self, user_id: str = "default") -> str:
         """Generate context key for user"""
-        return f"{self.CONTEXT_PREFIX}{user_id}"
+        return self._user_key(user_id, "context")
     
-    def _get_lecture_key(self, user_id: str = "default") -> str:
-        """Generate lecture transcription key for user"""
-        return f"{self.LECTURE_PREFIX}{user_id}"
+    def _get_lecture_sessions_key(self, user_id: str = "default") -> str:
+        """Generate rolling lecture summary key for user (one field per session)"""
+        return self._user_key(user_id, "lecture:sessions")
     
     def _get_metadata_key(self, user_id: str = "default") -> str:
         """Generate metadata key for user"""
-        return f"{self.METADATA_PREFIX}{user_id}"
+        return self._user_key(user_id, "meta")
+    
+    def _get_fingerprint_key(self, user_id: str = "default") -> str:
+        """Generate change-detection fingerprint key for user"""
+        return self._user_key(user_id, "fingerprint")
+    
+    async def _ensure_migrated(self, user_id: str) -> None:
+        """Move a user's pre-hash-tag keys into the current layout, once per process"""
+        user_id = user_id or "default"
+        if not self.migrate_legacy_keys or user_id in self._checked_users:
+            return
+        self._checked_users[user_id] = None
+        if len(self._checked_users) > self.max_versioned_users:
+            del self._checked_users[next(iter(self._checked_users))]
+        # Every legacy write updated the meta hash, so it marks a user with old data
+        legacy_meta = f"{self.KEY_PREFIX}meta:{user_id}"
+        try:
+            if not await self.client.exists(legacy_meta):
+                return
+            legacy_context = f"{self.KEY_PREFIX}context:{user_id}"
+            legacy_sessions = f"{self.KEY_PREFIX}lecture:{user_id}:sessions"
+            await self._merge_entries(legacy_context, self._get_context_key(user_id))
+            await self._merge_entries(legacy_sessions, self._get_lecture_sessions_key(user_id))
+            
+            meta = await self.client.hgetall(legacy_meta)
+            meta_key = self._get_metadata_key(user_id)
+            current = await self.client.hgetall(meta_key)
+            if meta.get("total_entries"):
+                await self.client.hincrby(meta_key, "total_entries", int(meta["total_entries"]))
+            missing = {k: v for k, v in meta.items() if k != "total_entries" and k not in current}
+            if missing:
+                await self.client.hset(meta_key, values=missing)
+            
+            # Legacy keys live on other cluster slots, so delete them one at a time; meta last,
+            # so an interrupted migration is picked up again
+            for key in (legacy_context, f"{legacy_context}:sorted", legacy_sessions, f"{legacy_sessions}:sorted",
+                        f"{self.KEY_PREFIX}lecture:{user_id}", f"{self.KEY_PREFIX}lecture:{user_id}:sorted",
+                        f"{self.KEY_PREFIX}fingerprint:{user_id}", legacy_meta):
+                await self.client.delete(key)
+            tracer.event("redis.legacy_keys_migrated", user_id=user_id)
+        except Exception as e:
+            # Try again on the next request
+            self._checked_users.pop(user_id, None)
+            tracer.event("redis_error", operation="migrate_legacy_keys", error=str(e))
+    
+    async def _merge_entries(self, legacy_key: str, key: str) -> None:
+        """Copy a legacy entry hash and its :sorted index, keeping entries already in the new layout"""
+        entries = await self.client.hgetall(legacy_key)
+        if not entries:
+            return
+        current = await self.client.hgetall(key)
+        missing = {k: v for k, v in entries.items() if k not in current}
+        if not missing:
+            return
+        scores = dict(await self.client.zrange(f"{legacy_key}:sorted", 0, -1, withscores=True))
+        await self.client.hset(key, values=missing)
+        await self.client.zadd(f"{key}:sorted", {k: scores.get(k, 0.0) for k in missing})
     
+    @tracer.traced("redis_client.store_context")
     async def store_context(self, context: str, user_id: str = "default", context_type: str = "general") -> bool:
         """Store learning context with timestamp and type"""
         try:
+            await self._ensure_migrated(user_id)
             timestamp = time.time()
             context_data = {
                 "content": context,
@@ -70,50 +200,48 @@ class ThynkRedisClient:
             meta_key = self._get_metadata_key(user_id)
             await self.client.hincrby(meta_key, "total_entries", 1)
             await self.client.hset(meta_key, "last_updated", timestamp)
+            self._context_written(user_id)
             
             return True
             
         except Exception as e:
-            print(f"Error storing context: {e}")
+            tracer.event("redis_error", operation="store_context", error=str(e))
             return False
     
-    async def store_lecture_transcription(self, transcription: str, user_id: str = "default", confidence: float = 0.8) -> bool:
-        """Store lecture transcription with timestamp and confidence"""
+    @tracer.traced("redis_client.get_lecture_session")
+    async def get_lecture_session(self, session_id: str, user_id: str = "default") -> Optional[Dict[str, Any]]:
+        """Get the rolling summary state for a lecture session"""
         try:
-            timestamp = time.time()
-            lecture_data = {
-                "content": transcription,
-                "timestamp": timestamp,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-                "type": "lecture",
-                "confidence": confidence
-            }
-            
-            # Store in lecture-specific key
-            lecture_key = self._get_lecture_key(user_id)
-            lecture_id = f"lec_{int(timestamp * 1000)}"  # Unique ID with millisecond precision
-            
-            # Store the lecture data
-            await self.client.hset(lecture_key, lecture_id, json.dumps(lecture_data))
-            
-            # Also maintain a sorted set for easy time-based queries
-            sorted_key = f"{lecture_key}:sorted"
-            await self.client.zadd(sorted_key, {lecture_id: timestamp})
+            await self._ensure_migrated(user_id)
+            session_json = await self.client.hget(self._get_lecture_sessions_key(user_id), session_id)
+            return json.loads(session_json) if session_json else None
+        except Exception as e:
+            tracer.event("redis_error", operation="get_lecture_session", error=str(e))
+            return None
+    
+    @tracer.traced("redis_client.store_lecture_session")
+    async def store_lecture_session(self, session_id: str, state: Dict[str, Any], user_id: str = "default") -> bool:
+        """Replace the rolling summary state for a lecture session"""
+        try:
+            await self._ensure_migrated(user_id)
+            timestamp = state.get("timestamp", time.time())
+            sessions_key = self._get_lecture_sessions_key(user_id)
+            await self.client.hset(sessions_key, session_id, json.dumps(state))
+            await self.client.zadd(f"{sessions_key}:sorted", {session_id: timestamp})
             
-            # Update metadata
             meta_key = self._get_metadata_key(user_id)
-            await self.client.hincrby(meta_key, "lecture_entries", 1)
             await self.client.hset(meta_key, "last_lecture_updated", timestamp)
-            
+            self._context_written(user_id)
             return True
-            
         except Exception as e:
-            print(f"Error storing lecture transcription: {e}")
+            tracer.event("redis_error", operation="store_lecture_session", error=str(e))
             return False
     
+    @tracer.traced("redis_client.get_weighted_context")
     async def get_weighted_context(self, user_id: str = "default", max_entries: int = 50, include_lectures: bool = True, lecture_base_weight: float = 0.3, decay_factor: float = 0.1) -> List[Dict[str, Any]]:
         """Get context entries with exponential decay weighting based on recency"""
         try:
+            await self._ensure_migrated(user_id)
             all_context = []
             current_time = time.time()
             
@@ -137,33 +265,39 @@ class ThynkRedisClient:
                     ctx['position'] = i
                     all_context.append(ctx)
             
-            # Get lecture transcriptions if requested
+            # Get lecture summaries if requested (one rolling summary per session)
             if include_lectures:
-                lecture_key = self._get_lecture_key(user_id)
-                lecture_sorted_key = f"{lecture_key}:sorted"
+                sessions_key = self._get_lecture_sessions_key(user_id)
                 
-                # Get lecture entries (remaining 30% of max entries)
+                # Get lecture sessions (remaining 30% of max entries)
                 lecture_limit = max_entries - len(all_context)
-                lecture_ids = await self.client.zrevrange(lecture_sorted_key, 0, lecture_limit - 1)
+                session_ids = await self.client.zrevrange(f"{sessions_key}:sorted", 0, lecture_limit - 1)
                 
-                # Retrieve lecture data with exponential decay + base weight reduction
-                for i, lec_id in enumerate(lecture_ids):
-                    lec_json = await self.client.hget(lecture_key, lec_id)
-                    if lec_json:
-                        lec = json.loads(lec_json)
+                # Retrieve session summaries with exponential decay + base weight reduction
+                for i, session_id in enumerate(session_ids):
+                    session_json = await self.client.hget(sessions_key, session_id)
+                    if session_json:
+                        session = json.loads(session_json)
+                        if not session.get("summary"):
+                            continue
                         # Apply both exponential decay and lecture base weight
                         decay_weight = math.exp(-decay_factor * i)
-                        lec['weight'] = decay_weight * lecture_base_weight
-                        lec['source'] = 'lecture'
-                        lec['position'] = i
-                        all_context.append(lec)
+                        all_context.append({
+                            "content": session["summary"],
+                            "timestamp": session.get("timestamp", current_time),
+                            "type": "lecture",
+                            "session_id": session_id,
+                            "weight": decay_weight * lecture_base_weight,
+                            "source": "lecture",
+                            "position": i,
+                        })
             
             # Sort by weight (highest first), then by timestamp for ties
             all_context.sort(key=lambda x: (x['weight'], x['timestamp']), reverse=True)
             return all_context[:max_entries]
             
         except Exception as e:
-            print(f"Error retrieving weighted context: {e}")
+            tracer.event("redis_error", operation="get_weighted_context", error=str(e))
             return []
     
     async def get_recent_context(self, user_id: str = "default", max_entries: int = 10) -> List[Dict[str, Any]]:
@@ -173,6 +307,7 @@ class ThynkRedisClient:
     async def get_context_summary(self, user_id: str = "default") -> Dict[str, Any]:
         """Get summary of stored context"""
         try:
+            await self._ensure_migrated(user_id)
             meta_key = self._get_metadata_key(user_id)
             metadata = await self.client.hgetall(meta_key)
             
@@ -186,12 +321,34 @@ class ThynkRedisClient:
             }
             
         except Exception as e:
-            print(f"Error getting context summary: {e}")
+            tracer.event("redis_error", operation="get_context_summary", error=str(e))
             return {"total_entries": 0, "last_updated": None, "user_id": user_id}
     
+    async def get_fingerprint(self, user_id: str = "default") -> Optional[str]:
+        """Get the change-detection fingerprint shared by all replicas.
+
+        None means no baseline is stored; Redis errors are re-raised so the
+        caller can tell an unreachable store from a missing entry.
+        """
+        try:
+            return await self.client.get(self._get_fingerprint_key(user_id))
+        except Exception as e:
+            tracer.event("redis_error", operation="get_fingerprint", error=str(e))
+            raise
+    
+    async def store_fingerprint(self, user_id: str, fingerprint: str, ttl_seconds: int) -> bool:
+        """Store the change-detection fingerprint with an expiry"""
+        try:
+            await self.client.set(self._get_fingerprint_key(user_id), fingerprint, ex=ttl_seconds)
+            return True
+        except Exception as e:
+            tracer.event("redis_error", operation="store_fingerprint", error=str(e))
+            return False
+    
     async def clear_context(self, user_id: str = "default", clear_lectures: bool = False) -> bool:
         """Clear context for a user (useful for testing)"""
         try:
+            await self._ensure_migrated(user_id)
             context_key = self._get_context_key(user_id)
             sorted_key = f"{context_key}:sorted"
             meta_key = self._get_metadata_key(user_id)
@@ -200,17 +357,19 @@ class ThynkRedisClient:
             await self.client.delete(sorted_key)
             
             if clear_lectures:
-                lecture_key = self._get_lecture_key(user_id)
-                lecture_sorted_key = f"{lecture_key}:sorted"
-                await self.client.delete(lecture_key)
-                await self.client.delete(lecture_sorted_key)
+                sessions_key = self._get_lecture_sessions_key(user_id)
+                await self.client.delete(sessions_key)
+                await self.client.delete(f"{sessions_key}:sorted")
             
             await self.client.delete(meta_key)
+            # Without this, the next page would still be compared against the old baseline
+            await self.client.delete(self._get_fingerprint_key(user_id))
+            self._context_written(user_id)
             
             return True
             
         except Exception as e:
-            print(f"Error clearing context: {e}")
+            tracer.event("redis_error", operation="clear_context", error=str(e))
             return False
 
 # Global Redis client instance
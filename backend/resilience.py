@@ -0,0 +1,271 @@
+# Created for Thynk: Always Ask Y
+# Circuit breakers and hedged requests for OCR and LLM backends
+
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from metrics import metrics
+from tracing import tracer
+
+CallFactory = Callable[[], Awaitable[Any]]
+
+# Seconds the backend call running in this task spent queued (see Resilience.exclude_wait)
+_queued_s: contextvars.ContextVar[Optional[List[float]]] = contextvars.ContextVar("thynk_queued_s", default=None)
+
+
+class BackendUnavailable(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with half-open probing.
+
+    closed: calls pass. After failure_threshold consecutive failures the
+    breaker opens and calls are refused for reset_timeout_s. Then it goes
+    half-open and lets a single probe through: success closes it, failure
+    opens it again for another reset_timeout_s.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout_s: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout_s = float(reset_timeout_s)
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be made now (claims the probe slot when half-open)"""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout_s:
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    metrics.inc("breaker_open_total", backend=self.name)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Give back an unused half-open probe slot (the call was cancelled)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class LatencyTracker:
+    """Recent successful call latencies for one backend"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=max(1, int(window)))
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q-th percentile in seconds, or None with no samples"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(round(q / 100.0 * (len(samples) - 1))))
+        return samples[index]
+
+
+class Resilience:
+    """Per-backend circuit breakers, latency tracking and request hedging.
+
+    Backends are named by the caller ("claude", "cerebras", "claude_aggregation", ...).
+    call() guards a single call; hedged() races a primary against alternates,
+    launching each alternate once the previous call has run past its observed
+    p95 latency (or failed), and returns the first success.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout_s: float = 30.0,
+        hedge_enabled: bool = True,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        hedge_default_ms: int = 3000,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = float(hedge_percentile)
+        self.hedge_min_samples = int(hedge_min_samples)
+        self.hedge_default_ms = int(hedge_default_ms)
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        if name not in self._breakers:
+            self._breakers[name] = CircuitBreaker(name, self.failure_threshold, self.reset_timeout_s)
+        return self._breakers[name]
+
+    def latency(self, name: str) -> LatencyTracker:
+        if name not in self._latencies:
+            self._latencies[name] = LatencyTracker()
+        return self._latencies[name]
+
+    def is_open(self, name: str) -> bool:
+        """Whether a backend is currently being skipped"""
+        breaker = self._breakers.get(name)
+        return breaker is not None and breaker.state == CircuitBreaker.OPEN and \
+            time.monotonic() - breaker.opened_at < breaker.reset_timeout_s
+
+    def hedge_delay(self, name: str) -> float:
+        """Seconds to wait on a backend before hedging: its observed p95, or the default until warmed up"""
+        tracker = self.latency(name)
+        if len(tracker) < self.hedge_min_samples:
+            return self.hedge_default_ms / 1000.0
+        return tracker.percentile(self.hedge_percentile) or self.hedge_default_ms / 1000.0
+
+    @staticmethod
+    def exclude_wait(seconds: float) -> None:
+        """Leave time the current call spent queued (e.g. for a provider slot) out of its latency"""
+        queued = _queued_s.get()
+        if queued is not None:
+            queued[0] += seconds
+
+    async def call(self, name: str, factory: CallFactory) -> Any:
+        """Run one backend call through its circuit breaker, recording latency and outcome"""
+        breaker = self.breaker(name)
+        if not breaker.allow():
+            metrics.inc("breaker_skips_total", backend=name)
+            raise BackendUnavailable(f"{name} circuit breaker is open")
+        queued = [0.0]
+        queued_token = _queued_s.set(queued)
+        started = time.perf_counter()
+        try:
+            with tracer.span("backend_call", backend=name):
+                result = await factory()
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except Exception:
+            breaker.record_failure()
+            metrics.inc("backend_failures_total", backend=name)
+            metrics.observe("backend_call_seconds", time.perf_counter() - started - queued[0], backend=name, outcome="error")
+            raise
+        finally:
+            _queued_s.reset(queued_token)
+        elapsed = time.perf_counter() - started - queued[0]
+        breaker.record_success()
+        self.latency(name).record(elapsed)
+        metrics.observe("backend_call_seconds", elapsed, backend=name, outcome="ok")
+        return result
+
+    async def hedged(self, calls: List[Tuple[str, CallFactory]]) -> Any:
+        """
+        Race a primary call against alternates and return the first success.
+
+        calls[0] starts immediately. The next one starts when every running call
+        has exceeded its hedge delay or failed. Backends with an open breaker are
+        skipped. Losing calls are cancelled. Raises the last error if all fail.
+        """
+        pending = [(name, factory) for name, factory in calls if not self.is_open(name)]
+        if not pending:
+            metrics.inc("breaker_skips_total", backend=calls[0][0] if calls else "none")
+            raise BackendUnavailable("all backends have open circuit breakers")
+
+        running: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> Optional[float]:
+            name, factory = pending.pop(0)
+            if running:
+                metrics.inc("backend_hedges_total", backend=name)
+                tracer.event("hedge", backend=name)
+            running[asyncio.ensure_future(self.call(name, factory))] = name
+            return self.hedge_delay(name) if self.hedge_enabled else None
+
+        try:
+            deadline = launch()
+            while running:
+                timeout = deadline if pending else None
+                done, _ = await asyncio.wait(set(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Straggler: hedge with the next backend
+                    deadline = launch()
+                    continue
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if name != calls[0][0]:
+                            metrics.inc("backend_hedge_wins_total", backend=name)
+                        return task.result()
+                    last_error = task.exception()
+                if pending and not running:
+                    # Everything in flight failed: fall back right away
+                    deadline = launch()
+            raise last_error or BackendUnavailable("no backend call succeeded")
+        finally:
+            for task in running:
+                task.cancel()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state and latency percentiles per backend"""
+        result = {}
+        for name in sorted(set(self._breakers) | set(self._latencies)):
+            tracker = self.latency(name)
+            breaker = self.breaker(name)
+            p50, p95 = tracker.percentile(50), tracker.percentile(95)
+            result[name] = {
+                "state": breaker.state,
+                "consecutive_failures": breaker.failures,
+                "samples": len(tracker),
+                "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                "hedge_after_ms": round(self.hedge_delay(name) * 1000, 1),
+            }
+        return result
+
+
+def create_resilience() -> Resilience:
+    """Build the resilience layer from THYNK_BREAKER_* and THYNK_HEDGE_* environment variables"""
+    return Resilience(
+        failure_threshold=int(os.getenv("THYNK_BREAKER_FAILURES", "5")),
+        reset_timeout_s=float(os.getenv("THYNK_BREAKER_RESET_S", "30")),
+        hedge_enabled=os.getenv("THYNK_HEDGE", "1").lower() not in ("0", "false", "no"),
+        hedge_percentile=float(os.getenv("THYNK_HEDGE_PERCENTILE", "95")),
+        hedge_min_samples=int(os.getenv("THYNK_HEDGE_MIN_SAMPLES", "20")),
+        hedge_default_ms=int(os.getenv("THYNK_HEDGE_DEFAULT_MS", "3000")),
+    )
+
+
+# Global resilience layer shared by all backend call sites
+resilience = create_resilience()
@@ -0,0 +1,90 @@
+# Created for Thynk: Always Ask Y
+# Wire protocol and per-connection state for the /ws/session WebSocket
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+
+# Binary messages: 1 type byte, 4-byte big-endian request id, then the raw payload
+# (image or audio bytes, no base64). Replies are JSON text messages echoing the id.
+FRAME_PHOTO = 0x01
+FRAME_AUDIO = 0x02
+FRAME_KINDS = {FRAME_PHOTO: "photo", FRAME_AUDIO: "audio"}
+_HEADER = struct.Struct(">BI")
+
+# Typed JSON messages accepted from the client
+MESSAGE_TYPES = ("hello", "hint", "context", "ping")
+
+_connection_ids = itertools.count(1)
+
+
+def parse_binary_frame(data: bytes) -> Tuple[str, int, bytes]:
+    """Split a binary message into (kind, request_id, payload)"""
+    if len(data) <= _HEADER.size:
+        raise ValueError("binary frame too short")
+    kind, request_id = _HEADER.unpack_from(data)
+    if kind not in FRAME_KINDS:
+        raise ValueError(f"unknown binary frame type {kind:#04x}")
+    return FRAME_KINDS[kind], request_id, data[_HEADER.size:]
+
+
+def build_binary_frame(kind: int, request_id: int, payload: bytes) -> bytes:
+    """Encode a binary message (used by clients and benchmarks)"""
+    return _HEADER.pack(kind, request_id) + payload
+
+
+def frame_digest(data: bytes) -> str:
+    """Exact content digest of a frame's bytes, for spotting a resent identical frame"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def parse_text_message(text: str) -> Dict[str, Any]:
+    """Decode and validate a typed JSON message"""
+    message = json.loads(text)
+    if not isinstance(message, dict) or message.get("type") not in MESSAGE_TYPES:
+        raise ValueError("expected a JSON object with a known 'type'")
+    return message
+
+
+class SessionState:
+    """Hot per-user data kept on the socket for the lifetime of a connection.
+
+    The last frame's content digest and its OCR text let a byte-identical
+    resend be answered without another OCR call, and context_version counts context writes made
+    over this connection so clients can tell whether a hint saw their latest
+    page.
+    """
+
+    def __init__(self, user_id: str = "default", session_id: Optional[str] = None, max_inflight: int = 4):
+        self.user_id = user_id
+        self.session_id = session_id or user_id
+        self.connection_id = next(_connection_ids)
+        self.last_frame_digest: Optional[str] = None
+        self.last_text: str = ""
+        self.context_version = 0
+        self.messages = 0
+        self.connected_at = time.time()
+        self.send_lock = asyncio.Lock()
+        self.inflight = asyncio.Semaphore(max(1, int(max_inflight)))
+
+    def is_repeat_frame(self, digest: str) -> bool:
+        """Whether a frame has exactly the same bytes as the last analyzed frame"""
+        return self.last_frame_digest is not None and digest == self.last_frame_digest
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "user_id": self.user_id,
+            "session_id": self.session_id,
+            "context_version": self.context_version,
+            "messages": self.messages,
+        }
+
+
+def create_session_state(user_id: str = "default", session_id: Optional[str] = None) -> SessionState:
+    """Build connection state using THYNK_WS_MAX_INFLIGHT"""
+    return SessionState(user_id, session_id, max_inflight=int(os.getenv("THYNK_WS_MAX_INFLIGHT", "4")))
@@ -0,0 +1,96 @@
+# Created for Thynk: Always Ask Y
+# Linear-time text similarity using character shingles and MinHash signatures
+
+import re
+from typing import Optional
+
+import numpy as np
+
+# Character n-gram size used for shingling OCR text
+SHINGLE_SIZE = 9
+
+# Number of hash functions in each MinHash signature
+NUM_PERM = 128
+
+# Fixed seed so every process (and every replica) derives the same hash family
+_SEED = 0x7468796E6B  # "thynk"
+
+# Polynomial base for the rolling shingle hash
+_BASE = np.uint64(1099511628211)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so OCR layout jitter does not count as change"""
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+class MinHasher:
+    """Builds fixed-size MinHash signatures over character shingles.
+
+    Shingle hashing and the permutation step are vectorized with NumPy, so
+    building a signature is linear in the text length and comparing two
+    signatures is O(num_perm) regardless of how long the texts were.
+    """
+
+    def __init__(self, num_perm: int = NUM_PERM, shingle_size: int = SHINGLE_SIZE, seed: int = _SEED):
+        self.num_perm = max(1, int(num_perm))
+        self.shingle_size = max(1, int(shingle_size))
+
+        # Multiply-shift hash family: h(x) = (a * x + b) mod 2^64 >> 32, with odd a
+        rng = np.random.default_rng(seed)
+        self._a = (rng.integers(1, 2**63, size=self.num_perm, dtype=np.uint64) << np.uint64(1)) | np.uint64(1)
+        self._b = rng.integers(0, 2**63, size=self.num_perm, dtype=np.uint64)
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        """Hash every character n-gram of the text with a deterministic rolling hash"""
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        n = self.shingle_size
+        if codes.size <= n:
+            n = codes.size
+
+        count = codes.size - n + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for offset in range(n):
+            hashes = hashes * _BASE + codes[offset:offset + count]
+        return hashes
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Return the MinHash signature of the text, or None for empty text"""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        shingles = np.unique(self._shingle_hashes(normalized))
+        with np.errstate(over="ignore"):
+            permuted = (self._a[:, None] * shingles[None, :] + self._b[:, None]) >> np.uint64(32)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: Optional[np.ndarray], second: Optional[np.ndarray]) -> float:
+        """Estimate similarity in [0.0, 1.0] between two signatures.
+
+        The fraction of matching slots estimates the Jaccard index J of the two
+        shingle sets. It is reported as the Dice coefficient 2J / (1 + J), which
+        has the same shape as difflib's ratio (2 * matches / total), so existing
+        thresholds keep their meaning.
+        """
+        if first is None or second is None or first.shape != second.shape:
+            return 0.0
+        jaccard = float(np.count_nonzero(first == second)) / first.size
+        return 2.0 * jaccard / (1.0 + jaccard)
+
+
+# Shared hasher instance
+default_hasher = MinHasher()
+
+
+def text_signature(text: str) -> Optional[np.ndarray]:
+    """Signature of text using the shared hasher"""
+    return default_hasher.signature(text)
+
+
+def signature_similarity(first: Optional[np.ndarray], second: Optional[np.ndarray]) -> float:
+    """Similarity of two signatures produced by the shared hasher"""
+    return MinHasher.similarity(first, second)
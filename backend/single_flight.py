@@ -0,0 +1,83 @@
+# Created for Thynk: Always Ask Y
+# Single-flight coalescing of concurrent identical requests
+
+import asyncio
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from metrics import metrics
+from tracing import tracer
+
+CallFactory = Callable[[], Awaitable[Any]]
+
+
+def content_digest(data: str) -> str:
+    """Short, stable digest of request content (e.g. an image's base64) for flight keys"""
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent duplicates share its outcome.
+
+    The first caller for a key (the leader) starts the call as a task; callers
+    arriving while it runs (followers) await the same task. Everyone gets the
+    same result, or the same exception. A caller that is cancelled only stops
+    waiting; the shared call is cancelled once every waiter has gone. Results
+    are not cached: the key is free again as soon as the call finishes, so a
+    later identical request makes a fresh call.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    async def run(self, key: Hashable, call: CallFactory) -> Any:
+        """Await call(), or the identical call already in flight for key"""
+        if not self.enabled:
+            return await call()
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _, key=key, flight=flight: self._finished(key, flight))
+            metrics.inc("single_flight_calls_total", flight=self.name, role="leader")
+        else:
+            metrics.inc("single_flight_calls_total", flight=self.name, role="follower")
+            tracer.event("single_flight.joined", flight=self.name, waiters=flight.waiters)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                # Last one waiting: nobody wants the result any more, and new
+                # callers must not join a call that is being cancelled
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                metrics.inc("single_flight_abandoned_total", flight=self.name)
+            raise
+        finally:
+            flight.waiters -= 1
+
+
+def create_single_flight(name: str) -> SingleFlight:
+    """Build a coalescer; THYNK_SINGLE_FLIGHT=0 turns coalescing off everywhere"""
+    return SingleFlight(name, enabled=os.getenv("THYNK_SINGLE_FLIGHT", "1").lower() not in ("0", "false", "no"))
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Unit tests for latest-wins frame superseding (frame_superseder.py)
+Run from backend/: python -m pytest test_frame_superseder.py
+"""
+
+import asyncio
+
+import pytest
+
+from frame_superseder import FrameSuperseded, FrameSuperseder
+
+
+def ocr_call(text, delay, log):
+    async def call():
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            log.append(f"{text} cancelled")
+            raise
+        log.append(f"{text} finished")
+        return text
+    return call
+
+
+def test_cancel_mode_cancels_the_older_frame():
+    async def scenario():
+        superseder = FrameSuperseder("cancel")
+        log = []
+        first = superseder.begin("alice")
+        older = asyncio.ensure_future(superseder.run(first, ocr_call("page 1", 10, log)))
+        await asyncio.sleep(0.01)
+        second = superseder.begin("alice")
+        assert await superseder.run(second, ocr_call("page 2", 0.01, log)) == "page 2"
+        with pytest.raises(FrameSuperseded):
+            await older
+        assert "page 1 cancelled" in log
+        assert not superseder.is_latest(first) and superseder.is_latest(second)
+
+    asyncio.run(scenario())
+
+
+def test_cancel_mode_skips_a_frame_superseded_before_it_started():
+    async def scenario():
+        superseder = FrameSuperseder("cancel")
+        log = []
+        first = superseder.begin("alice")
+        superseder.begin("alice")
+        with pytest.raises(FrameSuperseded):
+            await superseder.run(first, ocr_call("page 1", 0, log))
+        assert log == []
+
+    asyncio.run(scenario())
+
+
+def test_demote_mode_lets_the_older_frame_finish():
+    async def scenario():
+        superseder = FrameSuperseder("demote")
+        log = []
+        first = superseder.begin("alice")
+        older = asyncio.ensure_future(superseder.run(first, ocr_call("page 1", 0.05, log)))
+        await asyncio.sleep(0.01)
+        second = superseder.begin("alice")
+        assert await older == "page 1"
+        assert await superseder.run(second, ocr_call("page 2", 0.01, log)) == "page 2"
+        # Only the newest frame's result is kept
+        assert not superseder.is_latest(first) and superseder.is_latest(second)
+        assert "page 1 cancelled" not in log
+
+    asyncio.run(scenario())
+
+
+def test_other_users_and_anonymous_frames_are_independent():
+    async def scenario():
+        superseder = FrameSuperseder("cancel")
+        log = []
+        alice = superseder.begin("alice")
+        anonymous = superseder.begin(None)
+        tasks = [
+            asyncio.ensure_future(superseder.run(alice, ocr_call("alice", 0.05, log))),
+            asyncio.ensure_future(superseder.run(anonymous, ocr_call("anonymous 1", 0.05, log))),
+        ]
+        await asyncio.sleep(0.01)
+        superseder.begin("bob")
+        superseder.begin(None)
+        assert await asyncio.gather(*tasks) == ["alice", "anonymous 1"]
+        assert superseder.is_latest(alice) and superseder.is_latest(anonymous)
+
+    asyncio.run(scenario())
+
+
+def test_finished_frame_is_not_superseded():
+    async def scenario():
+        superseder = FrameSuperseder("cancel")
+        first = superseder.begin("alice")
+        await superseder.run(first, ocr_call("page 1", 0, []))
+        superseder.begin("alice")
+        assert superseder.is_latest(first)
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_request_is_not_reported_as_superseded():
+    async def scenario():
+        superseder = FrameSuperseder("cancel")
+        ticket = superseder.begin("alice")
+        request = asyncio.ensure_future(superseder.run(ticket, ocr_call("page 1", 10, [])))
+        await asyncio.sleep(0.01)
+        request.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await request
+
+    asyncio.run(scenario())
+
+
+def test_off_mode_keeps_every_frame():
+    async def scenario():
+        superseder = FrameSuperseder("off")
+        first = superseder.begin("alice")
+        older = asyncio.ensure_future(superseder.run(first, ocr_call("page 1", 0.02, [])))
+        second = superseder.begin("alice")
+        assert await older == "page 1"
+        assert superseder.is_latest(first) and superseder.is_latest(second)
+
+    asyncio.run(scenario())
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        FrameSuperseder("latest")
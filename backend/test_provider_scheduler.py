@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Unit tests for per-provider scheduling of LLM calls (provider_scheduler.py)
+Run from backend/: python -m pytest test_provider_scheduler.py
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from provider_scheduler import PRIORITIES, ProviderLimiter, ProviderScheduler, estimate_tokens, parse_limits
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(headers={"retry-after": retry_after})
+
+
+def test_concurrency_cap_and_priority_order():
+    async def scenario():
+        limiter = ProviderLimiter("test", concurrency=1)
+        order = []
+
+        async def call(priority, name):
+            await limiter.acquire(PRIORITIES[priority], 1)
+            try:
+                order.append(name)
+                await asyncio.sleep(0.01)
+            finally:
+                limiter.release()
+
+        await limiter.acquire(PRIORITIES["hint"], 1)
+        waiters = [
+            asyncio.ensure_future(call("background", "summary")),
+            asyncio.ensure_future(call("ocr", "ocr 1")),
+            asyncio.ensure_future(call("hint", "hint")),
+            asyncio.ensure_future(call("ocr", "ocr 2")),
+        ]
+        await asyncio.sleep(0.01)
+        assert limiter.in_flight == 1 and order == []
+        limiter.release()
+        await asyncio.gather(*waiters)
+        # Priority first, FIFO within a priority
+        assert order == ["hint", "ocr 1", "ocr 2", "summary"]
+        assert limiter.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_small_high_priority_call_overtakes_a_head_waiting_on_tokens():
+    async def scenario():
+        limiter = ProviderLimiter("test", tpm=600)
+        limiter.tokens.level = 0.0
+        admitted = {}
+
+        async def call(priority, tokens, name):
+            started = time.perf_counter()
+            await limiter.acquire(PRIORITIES[priority], tokens)
+            admitted[name] = time.perf_counter() - started
+            limiter.release()
+
+        # 600 tpm refills 10 tokens a second: the summary needs 10s, the hint 0.5s
+        summary = asyncio.ensure_future(call("background", 100, "summary"))
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(call("hint", 5, "hint"), timeout=2.0)
+        assert admitted["hint"] < 1.0 and not summary.done()
+        summary.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_requests_per_minute_bucket_delays_the_next_call():
+    async def scenario():
+        limiter = ProviderLimiter("test", rpm=600)
+        limiter.requests.level = 0.0
+        started = time.perf_counter()
+        await limiter.acquire(PRIORITIES["hint"], 1)
+        # 600 rpm refills one request every 0.1s
+        assert 0.05 < time.perf_counter() - started < 0.5
+        limiter.release()
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_is_settled_from_actual_usage():
+    limiter = ProviderLimiter("test", tpm=10000)
+    limiter._start(1000)
+    limiter.settle(estimated=1000, actual=400)
+    assert limiter.tokens.level == pytest.approx(10000 - 400, abs=1)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        limiter = ProviderLimiter("test", concurrency=1)
+        await limiter.acquire(PRIORITIES["ocr"], 1)
+        waiter = asyncio.ensure_future(limiter.acquire(PRIORITIES["ocr"], 1))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release()
+        assert limiter.in_flight == 0
+        # The slot is free again for the next caller
+        await asyncio.wait_for(limiter.acquire(PRIORITIES["ocr"], 1), timeout=0.5)
+        assert limiter.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_measures_queue_wait_and_releases():
+    async def scenario():
+        scheduler = ProviderScheduler({"test": {"concurrency": 1}})
+        async with scheduler.slot("test", "ocr", 10) as first:
+            assert first.wait_s < 0.05
+            second = scheduler.slot("test", "hint", 10)
+            entered = asyncio.ensure_future(second.__aenter__())
+            await asyncio.sleep(0.05)
+            assert not entered.done()
+        await entered
+        assert second.wait_s >= 0.04
+        await second.__aexit__(None, None, None)
+        assert scheduler.limiter("test").in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_rate_limited_call_pauses_the_provider():
+    async def scenario():
+        scheduler = ProviderScheduler({"test": {"concurrency": 4}})
+        with pytest.raises(RateLimited):
+            async with scheduler.slot("test", "ocr", 10):
+                raise RateLimited("0.2")
+        started = time.perf_counter()
+        async with scheduler.slot("test", "hint", 10):
+            pass
+        assert time.perf_counter() - started >= 0.15
+
+    asyncio.run(scenario())
+
+
+def test_error_recorded_inside_the_slot_still_pauses():
+    async def scenario():
+        scheduler = ProviderScheduler({"test": {"concurrency": 4}})
+        async with scheduler.slot("test", "ocr", 10) as slot:
+            # e.g. a hedge backend won after Claude answered 429
+            slot.record_error(RateLimited("0.2"))
+        assert scheduler.limiter("test").snapshot()["paused_s"] > 0.1
+
+    asyncio.run(scenario())
+
+
+def test_disabled_scheduler_does_not_limit():
+    async def scenario():
+        scheduler = ProviderScheduler({"test": {"concurrency": 1}}, enabled=False)
+        async with scheduler.slot("test", "ocr", 10):
+            async with scheduler.slot("test", "ocr", 10):
+                pass
+        assert scheduler.snapshot() == {}
+
+    asyncio.run(scenario())
+
+
+def test_parse_limits_and_estimate():
+    assert parse_limits("concurrency=8, rpm=50,tpm=40000,bogus=1") == {"concurrency": 8, "rpm": 50, "tpm": 40000}
+    assert estimate_tokens("a" * 400, max_tokens=100, images=1) == 100 + 100 + 1600
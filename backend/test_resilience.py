@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Unit tests for circuit breakers and hedged calls (resilience.py)
+Run from backend/: python -m pytest test_resilience.py
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from resilience import BackendUnavailable, CircuitBreaker, Resilience
+from ocr_models.stub_model import StubOCRModel
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout_s=60)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_allows_one_probe_and_success_closes():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout_s=0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_breaker_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout_s=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_cancelled_probe_gives_the_slot_back():
+    async def scenario():
+        layer = Resilience(failure_threshold=1, reset_timeout_s=0.05)
+        breaker = layer.breaker("slow")
+        breaker.record_failure()
+        await asyncio.sleep(0.06)
+        probe = asyncio.ensure_future(layer.call("slow", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.allow()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # The next caller gets the probe instead of waiting out another reset
+        assert breaker.allow()
+
+    asyncio.run(scenario())
+
+
+def test_call_refused_while_open():
+    async def scenario():
+        layer = Resilience(failure_threshold=1, reset_timeout_s=60)
+        layer.breaker("down").record_failure()
+        with pytest.raises(BackendUnavailable):
+            await layer.call("down", lambda: asyncio.sleep(0))
+
+    asyncio.run(scenario())
+
+
+def test_hedge_wins_and_cancels_the_straggler():
+    async def scenario():
+        layer = Resilience(hedge_default_ms=20, hedge_min_samples=1000)
+        primary_cancelled = asyncio.Event()
+
+        async def straggler():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+
+        alternate = StubOCRModel(name="alternate", latency_ms=10, jitter_ms=0, text="from alternate")
+        started = time.perf_counter()
+        result = await layer.hedged([
+            ("primary", straggler),
+            ("alternate", lambda: alternate.extract_text_from_image("")),
+        ])
+        assert result.full_text == "from alternate"
+        assert time.perf_counter() - started < 1.0
+        await asyncio.wait_for(primary_cancelled.wait(), timeout=1.0)
+        assert alternate.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_no_hedge_when_primary_is_fast():
+    async def scenario():
+        layer = Resilience(hedge_default_ms=500, hedge_min_samples=1000)
+        primary = StubOCRModel(name="primary", latency_ms=10, jitter_ms=0, text="from primary")
+        alternate = StubOCRModel(name="alternate", latency_ms=10, jitter_ms=0)
+        result = await layer.hedged([
+            ("primary", lambda: primary.extract_text_from_image("")),
+            ("alternate", lambda: alternate.extract_text_from_image("")),
+        ])
+        assert result.full_text == "from primary"
+        assert alternate.calls == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelling_hedged_cancels_every_running_call():
+    async def scenario():
+        layer = Resilience(hedge_default_ms=10, hedge_min_samples=1000)
+        cancelled = []
+
+        def slow(name):
+            async def call():
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.append(name)
+                    raise
+            return call
+
+        race = asyncio.ensure_future(layer.hedged([("a", slow("a")), ("b", slow("b"))]))
+        await asyncio.sleep(0.05)
+        race.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await race
+        await asyncio.sleep(0)
+        assert sorted(cancelled) == ["a", "b"]
+        # Cancellation is not a backend failure
+        assert layer.breaker("a").failures == 0 and layer.breaker("b").failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_excluded_queue_wait_is_not_recorded_as_latency():
+    async def scenario():
+        layer = Resilience()
+
+        async def queued_call():
+            await asyncio.sleep(0.1)
+            layer.exclude_wait(0.1)
+            return "done"
+
+        assert await layer.call("queued", queued_call) == "done"
+        assert layer.latency("queued").percentile(50) < 0.05
+
+    asyncio.run(scenario())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Unit tests for single-flight coalescing (single_flight.py)
+Run from backend/: python -m pytest test_single_flight.py
+"""
+
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight, content_digest
+
+
+def counting_call(calls, result="done", delay=0.05, error=None):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+    return call
+
+
+def test_concurrent_duplicates_share_one_call():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+        results = await asyncio.gather(*(flight.run("key", counting_call(calls)) for _ in range(8)))
+        assert results == ["done"] * 8
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_do_not_coalesce():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+        await asyncio.gather(flight.run("a", counting_call(calls)), flight.run("b", counting_call(calls)))
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_error_is_shared_by_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+        results = await asyncio.gather(
+            *(flight.run("key", counting_call(calls, error=ValueError("backend down"))) for _ in range(3)),
+            return_exceptions=True,
+        )
+        assert len(calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_results_are_not_cached():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+        await flight.run("key", counting_call(calls))
+        await flight.run("key", counting_call(calls))
+        assert len(calls) == 2
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_follower_leaves_the_call_running():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = []
+        leader = asyncio.ensure_future(flight.run("key", counting_call(calls, delay=0.1)))
+        follower = asyncio.ensure_future(flight.run("key", counting_call(calls, delay=0.1)))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert await leader == "done"
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_call_cancelled_once_every_waiter_left():
+    async def scenario():
+        flight = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def call():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flight.run("key", call)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1.0)
+        # A new caller starts a fresh call instead of joining the cancelled one
+        calls = []
+        assert await flight.run("key", counting_call(calls, delay=0)) == "done"
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_disabled_runs_every_call():
+    async def scenario():
+        flight = SingleFlight("test", enabled=False)
+        calls = []
+        await asyncio.gather(*(flight.run("key", counting_call(calls)) for _ in range(3)))
+        assert len(calls) == 3
+
+    asyncio.run(scenario())
+
+
+def test_content_digest_is_stable():
+    assert content_digest("abc") == content_digest("abc")
+    assert content_digest("abc") != content_digest("abd")
@@ -3,24 +3,40 @@
 
 import json
 import time
-import difflib
+import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
-import anthropic
 import os
 from dotenv import load_dotenv
 
 from redis_client import redis_client
+from similarity import text_signature, signature_similarity
+from change_store import create_change_store
+from compression_batcher import create_compression_batcher
+from metrics import metrics
+from tracing import tracer
+from provider_scheduler import scheduler, estimate_tokens
+from lecture_summary import create_lecture_summarizer
+from prompts import COMPRESSION_PROMPT, BATCH_COMPRESSION_PROMPT, LECTURE_SUMMARY_PROMPT, HINT_PROMPT, prompt_cache_stats
 
 load_dotenv()
 
-# Initialize Anthropic async client
-anthropic_client = anthropic.AsyncAnthropic(api_key=os.getenv("CLAUDE_KEY"))
+# Anthropic async client, created on first use (importing the SDK is slow)
+anthropic_client = None
 
-# Store previous content for comparison
-_previous_content: Dict[str, str] = {}
+def get_anthropic_client():
+    """Get or initialize the Anthropic async client (lazy loading)"""
+    global anthropic_client
+    if anthropic_client is None:
+        import anthropic
+        anthropic_client = anthropic.AsyncAnthropic(api_key=os.getenv("CLAUDE_KEY"))
+    return anthropic_client
 
-def is_different(current_content: Dict[str, str], user_id: str = "default", threshold: float = 0.3) -> Dict[str, Any]:
+# Bounded store of each user's previous content signature, shared across replicas via Redis
+change_store = create_change_store(redis_client)
+
+@tracer.traced()
+async def is_different(current_content: Dict[str, str], user_id: str = "default", threshold: float = 0.3) -> Dict[str, Any]:
     """
     Determine if current content is different enough from previous content to warrant processing.
     
@@ -32,39 +48,109 @@ def is_different(current_content: Dict[str, str], user_id: str = "default", thre
     Returns:
         Dictionary with "text" key and "learned" value containing the content
     """
-    global _previous_content
-    
     try:
         current_text = current_content.get("text", "")
-        previous_text = _previous_content.get(user_id, "")
         
         if not current_text.strip():
+            metrics.inc("is_different_total", result="empty")
             return {"text": ""}
         
-        if not previous_text:
+        current_signature = text_signature(current_text)
+        previous_signature = await change_store.get(user_id)
+        
+        if previous_signature is None:
             # First time seeing content for this user
-            _previous_content[user_id] = current_text
+            await change_store.set(user_id, current_signature)
+            metrics.inc("is_different_total", result="first")
             return {"text": current_text}
         
-        # Calculate similarity using difflib
-        similarity = difflib.SequenceMatcher(None, previous_text, current_text).ratio()
+        # Estimate similarity from precomputed MinHash signatures (O(signature size))
+        similarity = signature_similarity(previous_signature, current_signature)
         
         # If content is different enough, update and return it
         if similarity < (1.0 - threshold):
-            _previous_content[user_id] = current_text
+            await change_store.set(user_id, current_signature)
+            metrics.inc("is_different_total", result="changed")
             return {"text": current_text}
         else:
             # Content too similar, return empty
+            metrics.inc("is_different_total", result="skipped")
             return {"text": ""}
             
     except Exception as e:
-        print(f"Error in is_different: {e}")
+        metrics.inc("is_different_total", result="error")
+        tracer.record_exception(e)
         return {"text": ""}
 
+async def _compress_one(learned_content: str) -> str:
+    """Compress a single piece of learned content with Claude"""
+    async with scheduler.slot("anthropic", "background", estimate_tokens(learned_content, max_tokens=150)) as slot:
+        with tracer.span("llm_call", provider="anthropic", prompt=COMPRESSION_PROMPT.name), \
+                metrics.timer("llm_call_seconds", provider="anthropic", prompt=COMPRESSION_PROMPT.name):
+            response = await get_anthropic_client().messages.create(
+                model="claude-opus-4-1-20250805",
+                max_tokens=150,
+                temperature=0.3,
+                system=COMPRESSION_PROMPT.system_blocks(),
+                messages=[
+                    {"role": "user", "content": f"Content to analyze:\n{learned_content}"}
+                ]
+            )
+        slot.record(response)
+    prompt_cache_stats.record(COMPRESSION_PROMPT.name, response)
+    return response.content[0].text.strip()
+
+async def _compress_batch(learned_contents: List[str]) -> List[Optional[str]]:
+    """
+    Compress several pieces of learned content in a single Claude call.
+    
+    Returns one summary per input, in order. Items missing from the response
+    (or the whole batch, if the response is not valid JSON) are None so the
+    batcher can fall back to single calls for them.
+    """
+    items = "\n\n".join(
+        f"<item id=\"{i}\">\n{content}\n</item>" for i, content in enumerate(learned_contents)
+    )
+    async with scheduler.slot("anthropic", "background", estimate_tokens(items, max_tokens=150 * len(learned_contents))) as slot:
+        with tracer.span("llm_call", provider="anthropic", prompt=BATCH_COMPRESSION_PROMPT.name, items=len(learned_contents)), \
+                metrics.timer("llm_call_seconds", provider="anthropic", prompt=BATCH_COMPRESSION_PROMPT.name):
+            response = await get_anthropic_client().messages.create(
+                model="claude-opus-4-1-20250805",
+                max_tokens=150 * len(learned_contents),
+                temperature=0.3,
+                system=BATCH_COMPRESSION_PROMPT.system_blocks(),
+                messages=[
+                    {"role": "user", "content": f"Items to analyze:\n{items}"}
+                ]
+            )
+        slot.record(response)
+    prompt_cache_stats.record(BATCH_COMPRESSION_PROMPT.name, response)
+    
+    summaries: List[Optional[str]] = [None] * len(learned_contents)
+    try:
+        raw = response.content[0].text.strip()
+        # Tolerate markdown code fences around the JSON
+        raw = raw[raw.index("["):raw.rindex("]") + 1]
+        for entry in json.loads(raw):
+            idx = int(entry.get("id", -1))
+            summary = entry.get("summary")
+            if 0 <= idx < len(summaries) and isinstance(summary, str) and summary.strip():
+                summaries[idx] = summary.strip()
+    except Exception as parse_error:
+        tracer.event("compression.batch_unparsed", items=len(learned_contents), error=str(parse_error))
+    return summaries
+
+# Groups compression jobs that arrive close together into one Claude call
+compression_batcher = create_compression_batcher(_compress_batch, _compress_one)
+
+@tracer.traced()
 async def context_compression(content_data: Dict[str, str], user_id: str = "default") -> None:
     """
     Compress and store relevant learning information using Claude.
     
+    Requests are micro-batched, so a burst of frames costs one Claude call
+    instead of one per frame.
+    
     Args:
         content_data: Dictionary with "text" key containing learned content
         user_id: User identifier for context storage
@@ -76,57 +162,104 @@ async def context_compression(content_data: Dict[str, str], user_id: str = "defa
             return
         
         # Use Claude to extract and compress relevant educational information
-        compression_prompt = f"""You are an AI tutor assistant analyzing student work and learning materials. 
-
-Your task is to extract and summarize only the most important and educationally relevant information from the following content. This content comes from images of student work, textbooks, or study materials.
-
-Focus on:
-- Mathematical problems, equations, and solution steps
-- Key concepts, theorems, or formulas being studied
-- Student's work progress and problem-solving approaches
-- Educational content that would be useful for providing hints or guidance
-
-Ignore:
-- Irrelevant background objects or text
-- Non-educational content
-- Unclear or garbled text from OCR errors
-- Personal information or distracting elements
-
-Content to analyze:
-{learned_content}
-
-Provide a concise summary (2-3 sentences max) of the most educationally relevant information, or respond with "No relevant educational content found" if there's nothing useful for tutoring purposes."""
-
         try:
-            response = await anthropic_client.messages.create(
-                model="claude-opus-4-1-20250805",
-                max_tokens=150,
-                temperature=0.3,
-                messages=[
-                    {"role": "user", "content": compression_prompt}
-                ]
-            )
-            
-            compressed_content = response.content[0].text.strip()
+            compressed_content = await compression_batcher.submit(learned_content, user_id)
             
             # Only store if Claude found relevant educational content
             if compressed_content and not compressed_content.lower().startswith("no relevant"):
                 success = await redis_client.store_context(compressed_content, user_id)
-                if success:
-                    print(f"Stored compressed context for user {user_id}: {compressed_content[:100]}...")
-                else:
-                    print(f"Failed to store context for user {user_id}")
+                tracer.event("context.stored" if success else "context.store_failed", user_id=user_id, chars=len(compressed_content))
             else:
-                print(f"No relevant educational content found for user {user_id}")
+                tracer.event("context.not_relevant", user_id=user_id)
                 
         except Exception as claude_error:
-            print(f"Error calling Claude API: {claude_error}")
+            tracer.record_exception(claude_error)
             # Fallback: store original content if Claude fails
             await redis_client.store_context(learned_content[:200], user_id)
             
     except Exception as e:
-        print(f"Error in context_compression: {e}")
+        tracer.record_exception(e)
 
+# Bounded rolling summary per lecture session
+lecture_summarizer = create_lecture_summarizer()
+# Per-session locks with a count of holders and waiters, dropped when unused
+_lecture_locks: Dict[str, List[Any]] = {}
+
+@tracer.traced()
+async def lecture_context_compression(transcript: str, session_id: str = "default", user_id: str = "default") -> Dict[str, Any]:
+    """
+    Fold a new lecture transcript chunk into the session's rolling summary.
+    
+    Sentences already covered by the recent tail of the session (chunk overlap,
+    repetition) are dropped first, then Claude updates the running summary with
+    what is new. The summary is bounded and stored as a single Redis entry per
+    session, so storage does not grow with lecture length.
+    
+    Args:
+        transcript: Newly transcribed lecture text
+        session_id: Lecture session identifier
+        user_id: User identifier for context storage
+    
+    Returns:
+        Dictionary with "success", "compressed_content" (the updated summary) and size stats
+    """
+    lock_key = f"{user_id}:{session_id}"
+    entry = _lecture_locks.setdefault(lock_key, [asyncio.Lock(), 0])
+    entry[1] += 1
+    lock = entry[0]
+    try:
+        # Chunks of one session are folded in strictly one at a time
+        async with lock:
+            state = await redis_client.get_lecture_session(session_id, user_id) or lecture_summarizer.empty_state(session_id)
+            novel, duplicates = lecture_summarizer.prepare(state, transcript)
+            
+            summary = state.get("summary", "")
+            if novel:
+                new_text = " ".join(novel)
+                max_words = lecture_summarizer.max_chars // 6
+                try:
+                    async with scheduler.slot("anthropic", "background", estimate_tokens(summary, new_text, max_tokens=max(150, lecture_summarizer.max_chars // 3))) as slot:
+                        with tracer.span("llm_call", provider="anthropic", prompt=LECTURE_SUMMARY_PROMPT.name), \
+                                metrics.timer("llm_call_seconds", provider="anthropic", prompt=LECTURE_SUMMARY_PROMPT.name):
+                            response = await get_anthropic_client().messages.create(
+                                model="claude-opus-4-1-20250805",
+                                max_tokens=max(150, lecture_summarizer.max_chars // 3),
+                                temperature=0.3,
+                                system=LECTURE_SUMMARY_PROMPT.system_blocks(),
+                                messages=[
+                                    {"role": "user", "content": f"Word limit: {max_words}\n\nCurrent summary:\n{summary or '(empty)'}\n\nNew transcript excerpt:\n{new_text}"}
+                                ]
+                            )
+                        slot.record(response)
+                    prompt_cache_stats.record(LECTURE_SUMMARY_PROMPT.name, response)
+                    summary = response.content[0].text.strip()
+                except Exception as claude_error:
+                    tracer.record_exception(claude_error)
+                    summary = lecture_summarizer.fallback_summary(state, novel)
+            
+            new_state = lecture_summarizer.apply(state, transcript, novel, summary)
+            if not await redis_client.store_lecture_session(session_id, new_state, user_id):
+                return {"success": False, "error": "Failed to store lecture summary"}
+        
+        return {
+            "success": True,
+            "compressed_content": new_state["summary"],
+            "original_length": len(transcript),
+            "compressed_length": len(new_state["summary"]),
+            "new_sentences": len(novel),
+            "duplicate_sentences": duplicates,
+            "chunks": new_state["chunks"],
+        }
+        
+    except Exception as e:
+        tracer.record_exception(e)
+        return {"success": False, "error": str(e)}
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _lecture_locks.pop(lock_key, None)
+
+@tracer.traced()
 async def get_context(user_id: str = "default", max_entries: int = 10) -> Dict[str, Any]:
     """
     Retrieve and weight context based on recency for providing educational hints.
@@ -180,16 +313,18 @@ async def get_context(user_id: str = "default", max_entries: int = 10) -> Dict[s
         }
         
     except Exception as e:
-        print(f"Error in get_context: {e}")
+        tracer.record_exception(e)
         return {"entries": 0, "context": "Error retrieving context."}
 
-async def give_hint(learned_context: str, user_question: str = "") -> str:
+@tracer.traced()
+async def give_hint(learned_context: str, user_question: str = "", user_id: str = "default") -> str:
     """
     Generate a helpful hint using the learned context and Claude.
     
     Args:
         learned_context: Context from user's learning session
         user_question: Optional specific question from the user
+        user_id: User whose stored context the hint is based on
     
     Returns:
         Markdown-formatted hint string for display on frontend
@@ -197,7 +332,7 @@ async def give_hint(learned_context: str, user_question: str = "") -> str:
     try:
         # Get weighted context including lecture transcriptions with exponential decay
         weighted_context = await redis_client.get_weighted_context(
-            user_id="default", 
+            user_id=user_id, 
             max_entries=50, 
             include_lectures=True, 
             lecture_base_weight=0.3,
@@ -229,33 +364,26 @@ async def give_hint(learned_context: str, user_question: str = "") -> str:
         # Combine stored context with any immediate context
         full_context = f"{stored_context}{context_summary}\n\n[CURRENT SESSION]: {learned_context}" if learned_context else f"{stored_context}{context_summary}"
         
-        # Build the hint generation prompt
-        hint_prompt = f"""You are Thynk, an encouraging AI tutor that helps students learn math step-by-step. Your motto is "Always Ask Y" - meaning you help students discover answers through guided questions rather than giving direct solutions.
-
-Based on the learning context below, provide a helpful hint for the next step. Your hint should:
-
-1. **Be encouraging and supportive**
-2. **Guide rather than solve** - ask leading questions or give gentle nudges
-3. **Focus on the immediate next step**, not the entire solution
-4. **Use clear, student-friendly language**
-5. **Format your response in markdown** for web display
-
-Learning Context:
-{full_context}
-
-{"User's specific question: " + user_question if user_question else ""}
-
-Provide your hint in markdown format, keeping it concise but helpful (2-4 sentences max):"""
+        # Dynamic content goes after the cached static instructions
+        hint_request = f"Learning Context:\n{full_context}"
+        if user_question:
+            hint_request += f"\n\nUser's specific question: {user_question}"
 
         try:
-            response = await anthropic_client.messages.create(
-                model="claude-opus-4-1-20250805",
-                max_tokens=300,
-                temperature=0.7,
-                messages=[
-                    {"role": "user", "content": hint_prompt}
-                ]
-            )
+            async with scheduler.slot("anthropic", "hint", estimate_tokens(hint_request, max_tokens=300)) as slot:
+                with tracer.span("llm_call", provider="anthropic", prompt=HINT_PROMPT.name), \
+                        metrics.timer("llm_call_seconds", provider="anthropic", prompt=HINT_PROMPT.name):
+                    response = await get_anthropic_client().messages.create(
+                        model="claude-opus-4-1-20250805",
+                        max_tokens=300,
+                        temperature=0.7,
+                        system=HINT_PROMPT.system_blocks(),
+                        messages=[
+                            {"role": "user", "content": hint_request}
+                        ]
+                    )
+                slot.record(response)
+            prompt_cache_stats.record(HINT_PROMPT.name, response)
             
             hint_text = response.content[0].text.strip()
             
@@ -266,9 +394,9 @@ Provide your hint in markdown format, keeping it concise but helpful (2-4 senten
             return hint_text
             
         except Exception as claude_error:
-            print(f"Error calling Claude for hint: {claude_error}")
+            tracer.record_exception(claude_error)
             return "💡 **Hint:** I'm having trouble generating a hint right now. Try breaking down the problem into smaller steps and focus on what you know so far!"
             
     except Exception as e:
-        print(f"Error in give_hint: {e}")
+        tracer.record_exception(e)
         return "💡 **Hint:** Keep going! Look at what you've written so far and think about the next logical step."
\ No newline at end of file
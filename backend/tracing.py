@@ -0,0 +1,349 @@
+# Created for Thynk: Always Ask Y
+# Request-scoped tracing: nested spans, span events and JSON / OTLP exporters
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import urllib.request
+import uuid
+from typing import Any, Dict, List, Optional
+
+from metrics import metrics
+
+# Longest string kept in a span attribute (OCR text and prompts can be large)
+MAX_ATTRIBUTE_CHARS = 500
+
+
+def _clean(value: Any) -> Any:
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = value if isinstance(value, str) else str(value)
+    return text if len(text) <= MAX_ATTRIBUTE_CHARS else text[:MAX_ATTRIBUTE_CHARS] + "…"
+
+
+class Span:
+    """One timed stage of a request, with attributes and timestamped events"""
+
+    def __init__(self, name: str, trace_id: str, request_id: str, parent_id: Optional[str] = None, **attributes: Any):
+        self.name = name
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = {key: _clean(value) for key, value in attributes.items()}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update({key: _clean(value) for key, value in attributes.items()})
+
+    def event(self, name: str, **attributes: Any) -> None:
+        self.events.append({
+            "name": name,
+            "time_ns": time.time_ns(),
+            "attributes": {key: _clean(value) for key, value in attributes.items()},
+        })
+
+    def record_exception(self, error: BaseException) -> None:
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+        self.event(
+            "exception",
+            type=type(error).__name__,
+            message=getattr(error, "detail", None) or str(error),
+            stacktrace="".join(traceback.format_exception(type(error), error, error.__traceback__))[-MAX_ATTRIBUTE_CHARS:],
+        )
+
+    def finish(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "type": "span",
+            "name": self.name,
+            "request_id": self.request_id,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "duration_ms": round(self.duration_ms, 3) if self.duration_ms is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class _NoopSpan:
+    """Stands in for spans of unsampled requests"""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def event(self, name: str, **attributes: Any) -> None:
+        pass
+
+    def record_exception(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Innermost open span of the running task. asyncio copies the context into every
+# task it creates, so spans opened inside gather()/ensure_future() nest correctly
+_current_span: contextvars.ContextVar[Optional[Any]] = contextvars.ContextVar("thynk_span", default=None)
+
+
+class _SpanScope:
+    """Context manager that opens a span, makes it current and exports it on exit"""
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any], request_id: Optional[str] = None, root: bool = False):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.request_id = request_id
+        self.root = root
+        self.span: Any = _NOOP_SPAN
+        self._token = None
+
+    def __enter__(self) -> Any:
+        parent = None if self.root else _current_span.get()
+        if parent is _NOOP_SPAN or not self.tracer.enabled:
+            return _NOOP_SPAN
+        if parent is None:
+            if not self.root and not self.tracer.trace_orphans:
+                return _NOOP_SPAN
+            if self.tracer.sample_rate < 1.0 and random.random() >= self.tracer.sample_rate:
+                self._token = _current_span.set(_NOOP_SPAN)
+                return _NOOP_SPAN
+            request_id = self.request_id or uuid.uuid4().hex
+            trace_id = request_id if len(request_id) == 32 and all(c in "0123456789abcdef" for c in request_id) else uuid.uuid4().hex
+            self.span = Span(self.name, trace_id, request_id, **self.attributes)
+        else:
+            self.span = Span(self.name, parent.trace_id, parent.request_id, parent.span_id, **self.attributes)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._token is not None:
+            _current_span.reset(self._token)
+        if isinstance(self.span, Span):
+            if isinstance(exc, asyncio.CancelledError):
+                self.span.set(cancelled=True)
+            elif exc is not None and not isinstance(exc, GeneratorExit):
+                self.span.record_exception(exc)
+            self.span.finish()
+            self.tracer.export(self.span)
+
+
+class JsonLogExporter:
+    """Writes every finished span (and orphan events) as one JSON line"""
+
+    def __init__(self, stream: Any = None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def export(self, span: Span) -> None:
+        self.write(span.to_dict())
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": "" if value is None else str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OTLPExporter:
+    """Batches spans to an OTLP/HTTP JSON endpoint (e.g. a local collector on :4318).
+
+    Spans are queued and posted from a background thread, so exporting never
+    blocks a request; when the queue is full or the collector is down, spans
+    are dropped and counted in trace_spans_dropped_total.
+    """
+
+    def __init__(self, endpoint: str, service_name: str = "thynk-backend", batch_size: int = 256, flush_interval_s: float = 2.0, max_queue: int = 4096):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval_s = float(flush_interval_s)
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            metrics.inc("trace_spans_dropped_total", exporter="otlp")
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._post(batch)
+
+    def _post(self, batch: List[Span]) -> None:
+        try:
+            request = urllib.request.Request(
+                self.endpoint,
+                data=json.dumps(self.payload(batch)).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            urllib.request.urlopen(request, timeout=5).close()
+            metrics.inc("trace_spans_exported_total", len(batch), exporter="otlp")
+        except Exception:
+            metrics.inc("trace_spans_dropped_total", len(batch), exporter="otlp")
+
+    def payload(self, batch: List[Span]) -> Dict[str, Any]:
+        """ExportTraceServiceRequest in OTLP JSON encoding"""
+        spans = []
+        for span in batch:
+            attributes = dict(span.attributes, request_id=span.request_id)
+            if span.error:
+                attributes["error"] = span.error
+            spans.append({
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.start_ns + int((span.duration_ms or 0) * 1e6)),
+                "attributes": _otlp_attributes(attributes),
+                "events": [
+                    {"timeUnixNano": str(e["time_ns"]), "name": e["name"], "attributes": _otlp_attributes(e["attributes"])}
+                    for e in span.events
+                ],
+                "status": {"code": 2 if span.status == "error" else 1, "message": span.error or ""},
+            })
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": "thynk"}, "spans": spans}],
+            }]
+        }
+
+
+class Tracer:
+    """Opens spans, tracks the current one per task and hands finished spans to exporters.
+
+    request() opens the root span of a request (one per HTTP request or
+    WebSocket message); span() opens a child of the current span. Outside a
+    request, span() is a no-op unless trace_orphans is set, and event() is
+    logged on its own so nothing said outside a request is lost.
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None, enabled: bool = True, sample_rate: float = 1.0, trace_orphans: bool = False):
+        self.exporters = list(exporters or [])
+        self.enabled = enabled
+        self.sample_rate = float(sample_rate)
+        self.trace_orphans = trace_orphans
+
+    def request(self, name: str, request_id: Optional[str] = None, **attributes: Any) -> _SpanScope:
+        """Root span for one request; request_id (e.g. from X-Request-ID) is generated if missing"""
+        return _SpanScope(self, name, attributes, request_id=request_id, root=True)
+
+    def span(self, name: str, **attributes: Any) -> _SpanScope:
+        """Child span of the current span"""
+        return _SpanScope(self, name, attributes)
+
+    def traced(self, name: Optional[str] = None):
+        """Decorator that runs an async function inside a child span named after it"""
+        def decorate(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def current(self) -> Any:
+        """The innermost open span (a no-op span outside a request)"""
+        return _current_span.get() or _NOOP_SPAN
+
+    def request_id(self) -> Optional[str]:
+        span = _current_span.get()
+        return span.request_id if isinstance(span, Span) else None
+
+    def event(self, name: str, **attributes: Any) -> None:
+        """Add an event to the current span, or log it on its own outside a request"""
+        span = _current_span.get()
+        if span is not None:
+            span.event(name, **attributes)
+            return
+        if not self.enabled:
+            return
+        record = {"type": "event", "name": name, "time_ns": time.time_ns(),
+                  "attributes": {key: _clean(value) for key, value in attributes.items()}}
+        for exporter in self.exporters:
+            if isinstance(exporter, JsonLogExporter):
+                exporter.write(record)
+
+    def record_exception(self, error: BaseException) -> None:
+        self.current().record_exception(error)
+
+    def export(self, span: Span) -> None:
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception:
+                metrics.inc("trace_spans_dropped_total", exporter=type(exporter).__name__)
+
+
+def create_tracer() -> Tracer:
+    """Build the tracer from THYNK_TRACE* and THYNK_OTLP_* environment variables"""
+    names = [n.strip().lower() for n in os.getenv("THYNK_TRACE_EXPORTERS", "json").split(",") if n.strip()]
+    exporters: List[Any] = []
+    if "json" in names:
+        exporters.append(JsonLogExporter())
+    if "otlp" in names:
+        exporters.append(OTLPExporter(
+            os.getenv("THYNK_OTLP_ENDPOINT", "http://localhost:4318/v1/traces"),
+            service_name=os.getenv("THYNK_TRACE_SERVICE", "thynk-backend"),
+        ))
+    return Tracer(
+        exporters,
+        enabled=os.getenv("THYNK_TRACE", "1").lower() not in ("0", "false", "no"),
+        sample_rate=float(os.getenv("THYNK_TRACE_SAMPLE_RATE", "1.0")),
+    )
+
+
+# Global tracer shared by all modules
+tracer = create_tracer()
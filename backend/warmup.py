@@ -0,0 +1,113 @@
+# Created for Thynk: Always Ask Y
+# Startup warmup and readiness gating
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from metrics import metrics
+from tracing import tracer
+
+
+class Warmup:
+    """Runs the startup warmup steps and tracks readiness.
+
+    Steps are named async callables (load a model, build a client, run one
+    throwaway inference). They run concurrently in the background once the app
+    has started; the app reports ready only after every step has finished, so a
+    load balancer gating on /ready never sends a request that would pay the cold
+    start. A failed or timed-out step is reported but does not block readiness:
+    that backend is then loaded by its first request, as without warmup.
+
+    The throwaway inference runs on local backends only by default
+    (inference="local"); "all" also pays one API call per remote backend, and
+    "off" only loads models and clients.
+    """
+
+    INFERENCE_MODES = ("local", "all", "off")
+
+    def __init__(self, enabled: bool = True, backends: Optional[List[str]] = None, inference: str = "local", timeout_s: float = 120.0):
+        if inference not in self.INFERENCE_MODES:
+            raise ValueError(f"Unsupported warmup inference mode: {inference}. Allowed: {list(self.INFERENCE_MODES)}")
+        self.enabled = enabled
+        # None means "the OCR backends the selector can choose from"
+        self.backends = backends
+        self.inference = inference
+        self.timeout_s = float(timeout_s)
+        self._steps: Dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._status: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self.ready = not enabled
+
+    def runs_inference(self, local: bool) -> bool:
+        """Whether a backend gets a throwaway inference after loading"""
+        return self.inference == "all" or (self.inference == "local" and local)
+
+    def add(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        """Register a step; steps added after run() starts are ignored"""
+        self._steps[name] = step
+        self._status[name] = {"status": "pending", "ms": None, "error": None}
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        status = self._status[name]
+        status["status"] = "running"
+        started = time.perf_counter()
+        try:
+            with tracer.span("warmup.step", step=name):
+                await asyncio.wait_for(step(), timeout=self.timeout_s)
+            status["status"] = "ok"
+        except asyncio.TimeoutError:
+            status["status"], status["error"] = "timeout", f"did not finish within {self.timeout_s:g}s"
+        except Exception as e:
+            status["status"], status["error"] = "failed", str(getattr(e, "detail", None) or e)
+        elapsed = time.perf_counter() - started
+        status["ms"] = round(elapsed * 1000, 1)
+        metrics.observe("warmup_step_seconds", elapsed, step=name, outcome=status["status"])
+        if status["error"]:
+            tracer.event("warmup.step_failed", step=name, outcome=status["status"], error=status["error"])
+
+    async def run(self) -> None:
+        """Run every registered step, then mark the app ready"""
+        self._started_at = time.time()
+        if self.enabled:
+            await asyncio.gather(*(self._run_step(name, step) for name, step in list(self._steps.items())))
+        self._finished_at = time.time()
+        self.ready = True
+        tracer.event("warmup.finished", ms=round((self._finished_at - self._started_at) * 1000, 1), failed=",".join(self.snapshot()["failed"]))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Readiness, per-step status and timings"""
+        duration_ms = None
+        if self._started_at is not None:
+            duration_ms = round(((self._finished_at or time.time()) - self._started_at) * 1000, 1)
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "inference": self.inference,
+            "duration_ms": duration_ms,
+            "failed": sorted(name for name, status in self._status.items() if status["status"] in ("failed", "timeout")),
+            "steps": {name: dict(status) for name, status in self._status.items()},
+        }
+
+
+def _inference_mode(value: str) -> str:
+    """THYNK_WARMUP_INFERENCE: local, all or off (1/0 read as all/off)"""
+    value = value.strip().lower()
+    if value in ("1", "true", "yes"):
+        return "all"
+    if value in ("0", "false", "no"):
+        return "off"
+    return value
+
+
+def create_warmup() -> Warmup:
+    """Build the warmup plan from THYNK_WARMUP_* environment variables"""
+    backends = os.getenv("THYNK_WARMUP_BACKENDS")
+    return Warmup(
+        enabled=os.getenv("THYNK_WARMUP", "1").lower() not in ("0", "false", "no"),
+        backends=None if backends is None else [name.strip().lower() for name in backends.split(",") if name.strip()],
+        inference=_inference_mode(os.getenv("THYNK_WARMUP_INFERENCE", "local")),
+        timeout_s=float(os.getenv("THYNK_WARMUP_TIMEOUT_S", "120")),
+    )
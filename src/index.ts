@@ -19,6 +19,14 @@ interface StoredPhoto {
 const PACKAGE_NAME = process.env.PACKAGE_NAME ?? (() => { throw new Error('PACKAGE_NAME is not set in .env file'); })();
 const MENTRAOS_API_KEY = process.env.MENTRAOS_API_KEY ?? (() => { throw new Error('MENTRAOS_API_KEY is not set in .env file'); })();
 const PORT = parseInt(process.env.PORT || '3000');
+const BACKEND_URL = process.env.BACKEND_URL || 'http://localhost:8000';
+
+// Binary frame types on the backend /ws/session channel (1 type byte + 4-byte request id + payload)
+const FRAME_PHOTO = 0x01;
+const SOCKET_REPLY_TIMEOUT_MS = 30000;
+// Reconnect a dropped session socket with exponential backoff (plus jitter) between these bounds
+const SOCKET_RECONNECT_MIN_MS = 1000;
+const SOCKET_RECONNECT_MAX_MS = 30000;
 
 /**
  * Photo Taker App with webview functionality for displaying photos
@@ -30,6 +38,10 @@ class ExampleMentraOSApp extends AppServer {
   private isStreamingPhotos: Map<string, boolean> = new Map(); // Track if we are streaming photos for a user
   private nextPhotoTime: Map<string, number> = new Map(); // Track next photo time for a user
   private displayText: string = ''; // Store text to display
+  private backendSockets: Map<string, WebSocket> = new Map(); // Persistent backend session channel per user
+  private pendingReplies: Map<number, { socket: WebSocket, resolve: (reply: any) => void }> = new Map(); // Socket replies awaited by request id
+  private socketReconnects: Map<string, { attempts: number, timer?: ReturnType<typeof setTimeout> }> = new Map(); // Backoff state per user
+  private nextRequestId: number = 1;
 
   constructor() {
     super({
@@ -51,6 +63,7 @@ class ExampleMentraOSApp extends AppServer {
     // set the initial state of the user
     this.isStreamingPhotos.set(userId, false);
     this.nextPhotoTime.set(userId, Date.now());
+    this.openBackendSocket(userId, sessionId);
 
     // Welcome message for voice commands
     await session.audio.speak("Say 'start streaming' to begin, 'stop streaming' to end, or 'help' for hints.", {
@@ -120,20 +133,26 @@ class ExampleMentraOSApp extends AppServer {
         } else if (command.includes("give hint") || command.includes("hint") || command.includes("help")) {
           session.layouts.showTextWall("Voice command: Giving hint...", {durationMs: 3000});
           try {
-            // Call the give_hint endpoint with the user's command
-            const response = await fetch(`${process.env.BACKEND_URL || 'http://localhost:8000'}/give-hint`, {
-              method: 'POST',
-              headers: {
-                'Content-Type': 'application/json',
-              },
-              body: JSON.stringify({
-                learned: command,
-                question: command + "\n\n Ensure that your output consists mostly of words, as it will be read aloud."
-              })
-            });
+            const hintRequest = {
+              learned: command,
+              question: command + "\n\n Ensure that your output consists mostly of words, as it will be read aloud.",
+              user_id: userId
+            };
+            // Prefer the open session socket; fall back to the give_hint endpoint
+            const requestId = this.nextRequestId++;
+            let result = await this.requestOverSocket(userId, requestId, JSON.stringify({ type: 'hint', id: requestId, ...hintRequest }));
+            if (!result) {
+              const response = await fetch(`${BACKEND_URL}/give-hint`, {
+                method: 'POST',
+                headers: {
+                  'Content-Type': 'application/json',
+                },
+                body: JSON.stringify(hintRequest)
+              });
+              result = response.ok ? await response.json() : null;
+            }
 
-            if (response.ok) {
-              const result = await response.json();
+            if (result && result.type !== 'error') {
               const hintText = result.hint || "Here's a hint to help you with your problem!";
               // Speak the hint response from the backend (strip markdown formatting for speech)
               const speechText = hintText.replace(/[*#`]/g, '').replace(/💡/g, '');
@@ -212,13 +231,11 @@ class ExampleMentraOSApp extends AppServer {
           // actually take the photo
           const photo = await session.camera.requestPhoto();
 
-          // set the next photo time to now, since we are ready to take another photo
-          this.nextPhotoTime.set(userId, Date.now());
-
-          // cache the photo for display
+          // cache the photo for display; the backend response sets the next photo time
           this.cachePhoto(photo, userId);
         } catch (error) {
           this.logger.error(`Error auto-taking photo: ${error}`);
+          this.nextPhotoTime.set(userId, Date.now());
         }
       }
     }, 1000);
@@ -228,33 +245,159 @@ class ExampleMentraOSApp extends AppServer {
     // clean up the user's state
     this.isStreamingPhotos.set(userId, false);
     this.nextPhotoTime.delete(userId);
+    // Forget the socket before closing it so its close handler does not reconnect
+    const socket = this.backendSockets.get(userId);
+    this.backendSockets.delete(userId);
+    clearTimeout(this.socketReconnects.get(userId)?.timer);
+    this.socketReconnects.delete(userId);
+    socket?.close();
     this.logger.info(`Session stopped for user ${userId}, reason: ${reason}`);
   }
 
+  /**
+   * Open the persistent backend session channel for a user. Photos and hints go over it
+   * while it is open; otherwise requests fall back to plain HTTP. A dropped socket is
+   * reopened with backoff until the session stops.
+   */
+  private openBackendSocket(userId: string, sessionId: string) {
+    try {
+      const socketUrl = `${BACKEND_URL.replace(/^http/, 'ws')}/ws/session?user_id=${encodeURIComponent(userId)}&session_id=${encodeURIComponent(sessionId)}`;
+      const socket = new WebSocket(socketUrl);
+      socket.binaryType = 'arraybuffer';
+      socket.onopen = () => {
+        this.socketReconnects.delete(userId);
+      };
+      socket.onmessage = (event) => {
+        const reply = JSON.parse(event.data as string);
+        const pending = this.pendingReplies.get(reply.id);
+        if (pending) {
+          this.pendingReplies.delete(reply.id);
+          pending.resolve(reply);
+        }
+      };
+      socket.onclose = () => {
+        // Requests still waiting on this socket fall back to HTTP now, not after the reply timeout
+        for (const [requestId, pending] of this.pendingReplies) {
+          if (pending.socket === socket) {
+            this.pendingReplies.delete(requestId);
+            pending.resolve(null);
+          }
+        }
+        if (this.backendSockets.get(userId) === socket) {
+          this.backendSockets.delete(userId);
+          this.scheduleSocketReconnect(userId, sessionId);
+        }
+      };
+      socket.onerror = (error) => {
+        // Always followed by a close event, which reconnects
+        this.logger.error(`Backend session socket error for user ${userId}: ${error}`);
+      };
+      this.backendSockets.set(userId, socket);
+    } catch (error) {
+      this.logger.error(`Could not open backend session socket for user ${userId}: ${error}`);
+      this.scheduleSocketReconnect(userId, sessionId);
+    }
+  }
+
+  private scheduleSocketReconnect(userId: string, sessionId: string) {
+    const state = this.socketReconnects.get(userId) ?? { attempts: 0 };
+    const backoffMs = Math.min(SOCKET_RECONNECT_MAX_MS, SOCKET_RECONNECT_MIN_MS * 2 ** state.attempts);
+    const delayMs = backoffMs / 2 + Math.random() * backoffMs / 2;
+    state.attempts += 1;
+    clearTimeout(state.timer);
+    state.timer = setTimeout(() => {
+      state.timer = undefined;
+      if (this.socketReconnects.get(userId) === state) {
+        this.openBackendSocket(userId, sessionId);
+      }
+    }, delayMs);
+    this.socketReconnects.set(userId, state);
+    this.logger.info(`Backend session socket closed for user ${userId}; reconnecting in ${Math.round(delayMs)} ms`);
+  }
+
+  /**
+   * Send a message over the user's session socket and wait for the reply with the same id.
+   * Resolves to null if the socket is not open or the reply times out.
+   */
+  private requestOverSocket(userId: string, requestId: number, message: string | Uint8Array): Promise<any | null> {
+    const socket = this.backendSockets.get(userId);
+    if (!socket || socket.readyState !== WebSocket.OPEN) {
+      return Promise.resolve(null);
+    }
+    return new Promise((resolve) => {
+      const timer = setTimeout(() => {
+        this.pendingReplies.delete(requestId);
+        resolve(null);
+      }, SOCKET_REPLY_TIMEOUT_MS);
+      this.pendingReplies.set(requestId, {
+        socket,
+        resolve: (reply) => {
+          clearTimeout(timer);
+          resolve(reply);
+        },
+      });
+      socket.send(message);
+    });
+  }
+
   private async makeBackendRequest(photo: PhotoData, userId: string) {
+    // wait this long before the next streaming capture; the backend recommends a value
+    // based on how fast the page is changing (static pages back off, active writing stays fast)
+    let nextCaptureMs = 0;
     try {
+      // Raw JPEG bytes over the session socket: no base64, JSON framing or per-request connection
+      const requestId = this.nextRequestId++;
+      const frame = Buffer.alloc(5 + photo.buffer.length);
+      frame.writeUInt8(FRAME_PHOTO, 0);
+      frame.writeUInt32BE(requestId, 1);
+      photo.buffer.copy(frame, 5);
+      const reply = await this.requestOverSocket(userId, requestId, frame);
+      if (reply) {
+        if (reply.type === 'ocr') {
+          this.logger.info(`OCR analysis completed for user ${userId}: ${reply.full_text}`);
+        } else if (reply.type === 'frame_rejected') {
+          this.logger.info(`Frame rejected for user ${userId}: ${reply.reason}`);
+        } else {
+          this.logger.error(`OCR analysis failed: ${reply.error}`);
+        }
+        nextCaptureMs = reply.next_capture_ms ?? 0;
+        return;
+      }
+
       const base64Image = photo.buffer.toString('base64');
-      const backendUrl = process.env.BACKEND_URL || 'http://localhost:8000';
       
-      const response = await fetch(`${backendUrl}/analyze-photo`, {
+      const response = await fetch(`${BACKEND_URL}/analyze-photo`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-          image_base64: base64Image
+          image_base64: base64Image,
+          user_id: userId
         })
       });
 
       if (response.ok) {
         const ocrResult = await response.json();
-        this.logger.info(`OCR analysis completed for user ${userId}: ${ocrResult.full_text}`);
-        // You can store the OCR result or use it as needed
+        if (ocrResult.error === 'frame_rejected') {
+          // The backend's quality gate rejected the frame (blurry or badly exposed) before OCR
+          this.logger.info(`Frame rejected for user ${userId}: ${ocrResult.reason}`);
+        } else {
+          this.logger.info(`OCR analysis completed for user ${userId}: ${ocrResult.full_text}`);
+          // You can store the OCR result or use it as needed
+        }
+        nextCaptureMs = ocrResult.next_capture_ms ?? 0;
       } else {
-        this.logger.error(`OCR analysis failed: ${response.statusText}`);
+        // 503 while the backend is shedding load: wait at least as long as it asks
+        const failure = await response.json().catch(() => ({}));
+        const retryAfterS = Number(response.headers.get('Retry-After'));
+        nextCaptureMs = Math.max(failure.next_capture_ms ?? 0, Number.isFinite(retryAfterS) ? retryAfterS * 1000 : 0);
+        this.logger.error(`OCR analysis failed: ${failure.error ?? response.statusText}`);
       }
     } catch (error) {
       this.logger.error(`Error sending photo to backend: ${error}`);
+    } finally {
+      this.nextPhotoTime.set(userId, Date.now() + nextCaptureMs);
     }
   }
   